@@ -3,6 +3,7 @@ from __future__ import annotations
 import logging
 from typing import Any, Mapping
 
+import httpx
 import requests
 
 logger = logging.getLogger(__name__)
@@ -111,3 +112,82 @@ def send_screening(url: str, shared_secret: str, payload: Mapping[str, Any]) ->
         )
         return False
 
+
+
+class BackendClient:
+    """Cliente assíncrono do dashboard com pool de conexões keep-alive."""
+
+    def __init__(
+        self,
+        url: str,
+        shared_secret: str,
+        *,
+        pool_size: int = 10,
+        timeout: float = 6.0,
+        connect_timeout: float = 3.0,
+        keepalive_expiry: float = 30.0,
+    ) -> None:
+        self.url = str(url)
+        self.shared_secret = shared_secret
+        self.timeout = timeout
+        self._limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._client: httpx.AsyncClient | None = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=self._limits,
+                timeout=self._timeout,
+                headers={
+                    "Content-Type": "application/json",
+                    "X-Bot-Secret": self.shared_secret,
+                },
+            )
+        return self._client
+
+    async def send_screening(self, payload: Mapping[str, Any]) -> bool:
+        logger.debug("sending_payload", extra={"event": "backend_payload", "payload": payload})
+        try:
+            response = await self._get_client().post(self.url, json=dict(payload))
+        except httpx.ConnectError as exc:
+            logger.error(
+                "Screening POST failed - Connection Error",
+                extra={"event": "backend_post_error", "error": str(exc), "url": self.url},
+            )
+            return False
+        except httpx.TimeoutException as exc:
+            logger.error(
+                "Screening POST failed - Timeout",
+                extra={"event": "backend_post_error", "error": str(exc), "url": self.url},
+            )
+            return False
+        except httpx.HTTPError as exc:
+            logger.error(
+                "Screening POST failed",
+                extra={"event": "backend_post_error", "error": str(exc), "url": self.url},
+            )
+            return False
+
+        logger.info(f"Screening POST status: {response.status_code}")
+        if not response.is_success:
+            logger.error(
+                "Backend retornou erro",
+                extra={
+                    "event": "backend_post_error",
+                    "status_code": response.status_code,
+                    "text": response.text[:500],
+                },
+            )
+            return False
+        logger.info("✅ Triagem enviada com sucesso para o backend")
+        return True
+
+    async def aclose(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
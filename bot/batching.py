@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """Agrupa pedidos que chegam dentro de uma janela curta em uma única chamada.
+
+    `run_batch` devolve um resultado por item, na mesma ordem; `None` em uma posição
+    faz aquele item ser refeito sozinho com `run_single`. Exceções de `run_batch`
+    são repassadas a todos os pedidos do lote.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run_batch: Callable[[List[T]], Awaitable[Sequence[Optional[R]]]],
+        run_single: Callable[[T], Awaitable[R]],
+        *,
+        window_seconds: float = 0.03,
+        max_batch: int = 16,
+    ) -> None:
+        self.name = name
+        self.run_batch = run_batch
+        self.run_single = run_single
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self._pending: List[Tuple[T, "asyncio.Future[R]"]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, item: T) -> R:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Pedidos pendentes de outro loop (ex.: testes) não podem ser resolvidos aqui
+            self._pending = []
+            self._timer = None
+            self._loop = loop
+        future: asyncio.Future[R] = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        batch = [(item, future) for item, future in batch if not future.done()]
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[T, "asyncio.Future[R]"]]) -> None:
+        items = [item for item, _future in batch]
+        metrics.observe(f"{self.name}.batch_size", len(items))
+        if len(batch) == 1:
+            await self._run_single(*batch[0])
+            return
+        try:
+            results = await self.run_batch(items)
+        except Exception as exc:  # pylint: disable=broad-except
+            for _item, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        retry = [(item, future) for (item, future), result in zip(batch, results) if result is None]
+        retry += batch[len(results):]
+        for (_item, future), result in zip(batch, results):
+            if result is not None and not future.done():
+                future.set_result(result)
+        if retry:
+            metrics.incr(f"{self.name}.single_fallbacks", len(retry))
+            logger.info(
+                "lote parcial, refazendo itens individualmente",
+                extra={"event": "batch_partial", "batch": self.name, "retried": len(retry), "size": len(batch)},
+            )
+            await asyncio.gather(*(self._run_single(item, future) for item, future in retry))
+
+    async def _run_single(self, item: T, future: "asyncio.Future[R]") -> None:
+        try:
+            result = await self.run_single(item)
+        except Exception as exc:  # pylint: disable=broad-except
+            if not future.done():
+                future.set_exception(exc)
+            return
+        if not future.done():
+            future.set_result(result)
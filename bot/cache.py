@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Iterable, Optional, Tuple, TypeVar
+
+from . import metrics
+
+V = TypeVar("V")
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCT = re.compile(r"[\s.!?…,;:]+$")
+
+
+def normalize_text(text: str | None) -> str:
+    """Minúsculas, sem acentos, espaços colapsados e sem pontuação final."""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    collapsed = _WHITESPACE.sub(" ", stripped.casefold()).strip()
+    return _TRAILING_PUNCT.sub("", collapsed)
+
+
+def conversation_key(message: str, history: Iterable[str], window: int = 6) -> Tuple[str, ...]:
+    recent = list(history)[-window:] if window > 0 else []
+    return tuple(normalize_text(item) for item in recent) + (normalize_text(message),)
+
+
+class TTLCache(Generic[V]):
+    """LRU com expiração por tempo; contadores em `cache.<name>.*` no módulo de métricas."""
+
+    def __init__(
+        self,
+        name: str,
+        max_size: int,
+        ttl_seconds: float,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._items: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[0] <= self._clock():
+                del self._items[key]
+                item = None
+                metrics.incr(f"cache.{self.name}.expired")
+            if item is None:
+                metrics.incr(f"cache.{self.name}.misses")
+                return None
+            self._items.move_to_end(key)
+            metrics.incr(f"cache.{self.name}.hits")
+            return item[1]
+
+    def set(self, key: Hashable, value: V) -> None:
+        if self.max_size <= 0 or self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._items[key] = (self._clock() + self.ttl_seconds, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                metrics.incr(f"cache.{self.name}.evictions")
+            metrics.set_gauge(f"cache.{self.name}.size", len(self._items))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            metrics.set_gauge(f"cache.{self.name}.size", 0)
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(RuntimeError):
+    """Chamada recusada localmente porque o circuito está aberto."""
+
+
+class CircuitBreaker:
+    """Disjuntor por taxa de falhas recentes: aberto, recusa chamadas até a próxima sondagem."""
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        open_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self._clock = clock
+        self._results: Deque[bool] = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        metrics.set_gauge(f"{self.name}.state", _STATE_GAUGE[CLOSED])
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN)
+            if self._state == HALF_OPEN:
+                if self._probe_in_flight:
+                    metrics.incr(f"{self.name}.short_circuited")
+                    return False
+                self._probe_in_flight = True
+                return True
+            if self._state == OPEN:
+                metrics.incr(f"{self.name}.short_circuited")
+                return False
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probe_in_flight = False
+                self._results.clear()
+                self._transition(CLOSED)
+                return
+            self._results.append(True)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            metrics.incr(f"{self.name}.failures")
+            if self._state == HALF_OPEN:
+                self._probe_in_flight = False
+                self._open()
+                return
+            self._results.append(False)
+            if self._state == CLOSED and len(self._results) >= self.min_calls:
+                failures = self._results.count(False)
+                if failures / len(self._results) >= self.failure_rate:
+                    self._open()
+
+    def release(self) -> None:
+        """Libera a sondagem sem registrar resultado (chamada cancelada pelo próprio bot)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _open(self) -> None:
+        self._opened_at = self._clock()
+        self._results.clear()
+        self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        previous, self._state = self._state, state
+        metrics.set_gauge(f"{self.name}.state", _STATE_GAUGE[state])
+        metrics.incr(f"{self.name}.transitions.{state}")
+        log = logger.warning if state == OPEN else logger.info
+        log(
+            "circuito %s: %s -> %s",
+            self.name,
+            previous,
+            state,
+            extra={"event": "circuit_breaker", "from_state": previous, "to_state": state},
+        )
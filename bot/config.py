@@ -3,9 +3,10 @@ from __future__ import annotations
 import logging
 import os
 from functools import lru_cache
+from typing import Literal
 
 from dotenv import load_dotenv
-from pydantic import BaseModel, HttpUrl, ValidationError, field_validator
+from pydantic import BaseModel, Field, HttpUrl, ValidationError, field_validator
 
 load_dotenv()
 
@@ -15,6 +16,66 @@ class Settings(BaseModel):
     gemini_api_key: str | None = None
     bot_shared_secret: str = "dev_secret"
     backend_url: HttpUrl = "http://localhost:4000/api/screenings"  # type: ignore[assignment]
+    backend_pool_size: int = Field(default=10, ge=1)
+    backend_timeout: float = Field(default=6.0, gt=0)
+    backend_connect_timeout: float = Field(default=3.0, gt=0)
+    outbox_path: str = "data/outbox.sqlite3"
+    outbox_batch_size: int = Field(default=10, ge=1)
+    outbox_retry_base: float = Field(default=2.0, gt=0)
+    outbox_retry_max: float = Field(default=300.0, gt=0)
+    outbox_poll_interval: float = Field(default=5.0, gt=0)
+    llm_combined_mode: bool = False
+    llm_max_concurrency: int = Field(default=8, ge=1)
+    llm_max_queue: int = Field(default=200, ge=0)
+    telegram_edit_interval: float = Field(default=1.5, ge=1.0)
+    llm_prompt_cache: bool = True
+    llm_prompt_cache_ttl: int = Field(default=3600, ge=300)
+    llm_response_schema: bool = True
+    llm_prewarm: bool = True
+    classify_cache_size: int = Field(default=512, ge=0)
+    classify_cache_ttl: float = Field(default=900.0, ge=0)
+    triage_rules: bool = True
+    report_max_output_tokens: int = Field(default=2048, ge=256)
+    llm_hedging: bool = False
+    llm_hedge_daily_budget: int = Field(default=200, ge=0)
+    llm_breaker_min_calls: int = Field(default=5, ge=1)
+    llm_breaker_failure_rate: float = Field(default=0.5, gt=0, le=1)
+    llm_breaker_open_seconds: float = Field(default=30.0, gt=0)
+    llm_requests_per_minute: int = Field(default=1000, ge=0)
+    llm_tokens_per_minute: int = Field(default=1_000_000, ge=0)
+    llm_max_retries: int = Field(default=3, ge=0)
+    classify_batching: bool = False
+    classify_batch_window_ms: float = Field(default=30.0, ge=0)
+    classify_batch_max: int = Field(default=16, ge=1)
+    llm_models_classify: str = "gemini-2.5-flash"
+    llm_models_triage: str = "gemini-2.5-flash"
+    llm_models_combined: str = "gemini-2.5-flash"
+    llm_models_report: str = "gemini-2.5-flash"
+    llm_provider: Literal["gemini", "fake"] = "gemini"
+    fake_llm_latency_ms: float = Field(default=400.0, ge=0)
+    fake_llm_latency_sigma: float = Field(default=0.4, ge=0)
+    fake_llm_error_rate: float = Field(default=0.0, ge=0, le=1)
+    fake_llm_timeout_rate: float = Field(default=0.0, ge=0, le=1)
+    fake_llm_seed: int = 0
+    session_persistence: bool = True
+    session_db_path: str = "data/sessions.sqlite3"
+    session_flush_interval: float = Field(default=5.0, gt=0)
+    session_max_age_hours: float = Field(default=168.0, gt=0)
+    session_max_loaded: int = Field(default=20_000, ge=1)
+    session_store: Literal["local", "memory", "kv"] = "local"
+    session_kv_host: str = "127.0.0.1"
+    session_kv_port: int = Field(default=7379, ge=1, le=65535)
+    session_kv_pool_size: int = Field(default=10, ge=1)
+    session_kv_timeout: float = Field(default=2.0, gt=0)
+    telegram_concurrent_updates: int = Field(default=64, ge=1)
+    telegram_max_pending_updates: int = Field(default=1024, ge=1)
+    telegram_mode: Literal["polling", "webhook"] = "polling"
+    webhook_url: str = ""
+    webhook_path: str = "/telegram"
+    webhook_secret: str = ""
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = Field(default=8080, ge=1, le=65535)
+    webhook_max_connections: int = Field(default=40, ge=1, le=100)
 
     @field_validator("telegram_token")
     @classmethod
@@ -35,6 +96,66 @@ def get_settings() -> Settings:
             gemini_api_key=os.getenv("GEMINI_API_KEY"),
             bot_shared_secret=os.getenv("BOT_SHARED_SECRET", "dev_secret"),
             backend_url=backend_url,
+            backend_pool_size=os.getenv("BACKEND_POOL_SIZE", "10"),
+            backend_timeout=os.getenv("BACKEND_TIMEOUT", "6"),
+            backend_connect_timeout=os.getenv("BACKEND_CONNECT_TIMEOUT", "3"),
+            outbox_path=os.getenv("OUTBOX_PATH", "data/outbox.sqlite3"),
+            outbox_batch_size=os.getenv("OUTBOX_BATCH_SIZE", "10"),
+            outbox_retry_base=os.getenv("OUTBOX_RETRY_BASE", "2"),
+            outbox_retry_max=os.getenv("OUTBOX_RETRY_MAX", "300"),
+            outbox_poll_interval=os.getenv("OUTBOX_POLL_INTERVAL", "5"),
+            llm_combined_mode=os.getenv("LLM_COMBINED_MODE", "false"),
+            llm_max_concurrency=os.getenv("LLM_MAX_CONCURRENCY", "8"),
+            llm_max_queue=os.getenv("LLM_MAX_QUEUE", "200"),
+            telegram_edit_interval=os.getenv("TELEGRAM_EDIT_INTERVAL", "1.5"),
+            llm_prompt_cache=os.getenv("LLM_PROMPT_CACHE", "true"),
+            llm_prompt_cache_ttl=os.getenv("LLM_PROMPT_CACHE_TTL", "3600"),
+            llm_response_schema=os.getenv("LLM_RESPONSE_SCHEMA", "true"),
+            llm_prewarm=os.getenv("LLM_PREWARM", "true"),
+            classify_cache_size=os.getenv("CLASSIFY_CACHE_SIZE", "512"),
+            classify_cache_ttl=os.getenv("CLASSIFY_CACHE_TTL", "900"),
+            triage_rules=os.getenv("TRIAGE_RULES", "true"),
+            report_max_output_tokens=os.getenv("REPORT_MAX_OUTPUT_TOKENS", "2048"),
+            llm_hedging=os.getenv("LLM_HEDGING", "false"),
+            llm_hedge_daily_budget=os.getenv("LLM_HEDGE_DAILY_BUDGET", "200"),
+            llm_breaker_min_calls=os.getenv("LLM_BREAKER_MIN_CALLS", "5"),
+            llm_breaker_failure_rate=os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5"),
+            llm_breaker_open_seconds=os.getenv("LLM_BREAKER_OPEN_SECONDS", "30"),
+            llm_requests_per_minute=os.getenv("LLM_REQUESTS_PER_MINUTE", "1000"),
+            llm_tokens_per_minute=os.getenv("LLM_TOKENS_PER_MINUTE", "1000000"),
+            llm_max_retries=os.getenv("LLM_MAX_RETRIES", "3"),
+            classify_batching=os.getenv("CLASSIFY_BATCHING", "false"),
+            classify_batch_window_ms=os.getenv("CLASSIFY_BATCH_WINDOW_MS", "30"),
+            classify_batch_max=os.getenv("CLASSIFY_BATCH_MAX", "16"),
+            llm_models_classify=os.getenv("LLM_MODELS_CLASSIFY", "gemini-2.5-flash"),
+            llm_models_triage=os.getenv("LLM_MODELS_TRIAGE", "gemini-2.5-flash"),
+            llm_models_combined=os.getenv("LLM_MODELS_COMBINED", "gemini-2.5-flash"),
+            llm_models_report=os.getenv("LLM_MODELS_REPORT", "gemini-2.5-flash"),
+            llm_provider=os.getenv("LLM_PROVIDER", "gemini"),
+            fake_llm_latency_ms=os.getenv("FAKE_LLM_LATENCY_MS", "400"),
+            fake_llm_latency_sigma=os.getenv("FAKE_LLM_LATENCY_SIGMA", "0.4"),
+            fake_llm_error_rate=os.getenv("FAKE_LLM_ERROR_RATE", "0"),
+            fake_llm_timeout_rate=os.getenv("FAKE_LLM_TIMEOUT_RATE", "0"),
+            fake_llm_seed=os.getenv("FAKE_LLM_SEED", "0"),
+            session_persistence=os.getenv("SESSION_PERSISTENCE", "true"),
+            session_db_path=os.getenv("SESSION_DB_PATH", "data/sessions.sqlite3"),
+            session_flush_interval=os.getenv("SESSION_FLUSH_INTERVAL", "5"),
+            session_max_age_hours=os.getenv("SESSION_MAX_AGE_HOURS", "168"),
+            session_max_loaded=os.getenv("SESSION_MAX_LOADED", "20000"),
+            session_store=os.getenv("SESSION_STORE", "local"),
+            session_kv_host=os.getenv("SESSION_KV_HOST", "127.0.0.1"),
+            session_kv_port=os.getenv("SESSION_KV_PORT", "7379"),
+            session_kv_pool_size=os.getenv("SESSION_KV_POOL_SIZE", "10"),
+            session_kv_timeout=os.getenv("SESSION_KV_TIMEOUT", "2"),
+            telegram_concurrent_updates=os.getenv("TELEGRAM_CONCURRENT_UPDATES", "64"),
+            telegram_max_pending_updates=os.getenv("TELEGRAM_MAX_PENDING_UPDATES", "1024"),
+            telegram_mode=os.getenv("TELEGRAM_MODE", "polling"),
+            webhook_url=os.getenv("WEBHOOK_URL", ""),
+            webhook_path=os.getenv("WEBHOOK_PATH", "/telegram"),
+            webhook_secret=os.getenv("WEBHOOK_SECRET", ""),
+            webhook_host=os.getenv("WEBHOOK_HOST", "0.0.0.0"),
+            webhook_port=os.getenv("WEBHOOK_PORT", "8080"),
+            webhook_max_connections=os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"),
         )
     except ValidationError as exc:
         logging.getLogger(__name__).error("config validation error: %s", exc)
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+# Strings completas (com escapes) viram um único token; aspas sem fechamento indicam saída truncada
+_TOKENS = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\],"]', re.DOTALL)
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class JsonCandidate(NamedTuple):
+    text: str
+    repaired: bool
+
+
+def _join(text: str, start: int, end: int, drop: List[int]) -> str:
+    if not drop:
+        return text[start:end]
+    parts = []
+    pos = start
+    for idx in drop:
+        if idx >= end:
+            break
+        parts.append(text[pos:idx])
+        pos = idx + 1
+    parts.append(text[pos:end])
+    return "".join(parts)
+
+
+def _close(body: str, stack: Tuple[str, ...] | List[str]) -> str:
+    body = body.rstrip()
+    if body.endswith(","):
+        body = body[:-1]
+    return body + "".join(reversed(stack))
+
+
+def json_candidates(text: str) -> List[JsonCandidate]:
+    """Localiza o primeiro objeto JSON do texto em uma única passada, sem regex guloso.
+
+    Vírgulas sobrando antes de `}`/`]` são removidas. Se a resposta terminar no meio
+    do objeto (saída truncada), devolve até duas reconstruções em ordem de preferência:
+    fechando a string e os blocos abertos, e cortando no último membro completo.
+    """
+    if not text:
+        return []
+    fence = text.find("```")
+    start = text.find("{", fence) if fence >= 0 else -1
+    if start < 0:
+        start = text.find("{")
+    if start < 0:
+        return []
+
+    stack: List[str] = []
+    drop: List[int] = []
+    pending_comma = -1
+    last_cut: Optional[Tuple[int, Tuple[str, ...]]] = None
+    for match in _TOKENS.finditer(text, start):
+        idx = match.start()
+        char = text[idx]
+        if char == '"':
+            if match.end() - idx > 1:
+                pending_comma = -1
+                continue
+            # String aberta até o fim do texto
+            body = _join(text, start, len(text), drop)
+            if body.endswith("\\") and not body.endswith("\\\\"):
+                body = body[:-1]
+            candidates = [JsonCandidate(_close(body + '"', stack), True)]
+            if last_cut is not None:
+                cut, snapshot = last_cut
+                candidates.append(JsonCandidate(_close(_join(text, start, cut, drop), snapshot), True))
+            return candidates
+        if char in _CLOSERS:
+            stack.append(_CLOSERS[char])
+            pending_comma = -1
+        elif char == ",":
+            pending_comma = idx
+            last_cut = (idx, tuple(stack))
+        else:
+            if pending_comma >= 0 and not text[pending_comma + 1 : idx].strip():
+                drop.append(pending_comma)
+            pending_comma = -1
+            if stack:
+                stack.pop()
+            if not stack:
+                return [JsonCandidate(_join(text, start, idx + 1, drop), bool(drop))]
+
+    # Texto acabou com blocos abertos
+    candidates = [JsonCandidate(_close(_join(text, start, len(text), drop), stack), True)]
+    if last_cut is not None:
+        cut, snapshot = last_cut
+        candidates.append(JsonCandidate(_close(_join(text, start, cut, drop), snapshot), True))
+    return candidates
+
+
+def first_json_block(text: str) -> str:
+    candidates = json_candidates(text)
+    return candidates[0].text if candidates else "{}"
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Optional
+
+from .session_store import MemoryKV, VersionConflict
+
+logger = logging.getLogger(__name__)
+
+
+class KVServer:
+    """Servidor local de chave-valor versionado, um JSON por linha sobre TCP.
+
+    Substituto de um serviço compartilhado (Redis, etcd) para rodar vários
+    processos do bot na mesma máquina e nos testes. Operações:
+    `{"op": "get", "key", "known"}` e `{"op": "cas", "key", "version", "value"}`.
+    """
+
+    def __init__(self, kv: Optional[MemoryKV] = None) -> None:
+        self.kv = kv or MemoryKV()
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get("op")
+        if op == "get":
+            version, value = self.kv.get_nowait(request["key"], int(request.get("known", 0)))
+            return {"version": version, "value": value}
+        if op == "cas":
+            try:
+                version = self.kv.cas_nowait(request["key"], int(request["version"]), request["value"])
+            except VersionConflict:
+                return {"ok": False, "version": self.kv.get_nowait(request["key"])[0]}
+            return {"ok": True, "version": version}
+        return {"error": f"operação desconhecida: {op}"}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                try:
+                    response = self.dispatch(json.loads(line))
+                except (ValueError, KeyError, TypeError) as exc:
+                    response = {"error": f"requisição inválida: {exc!r}"}
+                writer.write((json.dumps(response, ensure_ascii=False) + "\n").encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host: str, port: int) -> None:
+    server = KVServer()
+    port = await server.start(host, port)
+    logger.info("Servidor de sessões em %s:%s", host, port, extra={"event": "kv_server_started"})
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local de sessões compartilhadas")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7379)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
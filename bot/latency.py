@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import math
+import threading
+from collections import deque
+from datetime import date
+from typing import Callable, Deque, Optional
+
+from . import metrics
+
+
+class LatencyTracker:
+    """Janela móvel de latências de um tipo de chamada, usada para derivar timeout e atraso de hedge.
+
+    As amostras medem só a requisição ao modelo, depois da vaga na fila do LLM e da
+    cota; o timeout derivado vale para cada tentativa, e o teto cobre a chamada inteira.
+    """
+
+    def __init__(
+        self,
+        call_type: str,
+        *,
+        window: int = 200,
+        min_samples: int = 20,
+        timeout_multiplier: float = 1.5,
+        min_timeout: float = 5.0,
+    ) -> None:
+        self.call_type = call_type
+        self.min_samples = min_samples
+        self.timeout_multiplier = timeout_multiplier
+        self.min_timeout = min_timeout
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+        metrics.observe(f"llm.{self.call_type}.latency_seconds", seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def timeout(self, ceiling: float) -> float:
+        """Margem sobre o p99 observado, limitada ao teto configurado; sem amostras suficientes usa o teto."""
+        p99 = self.percentile(99)
+        if p99 is None:
+            value = ceiling
+        else:
+            value = min(ceiling, max(self.min_timeout, p99 * self.timeout_multiplier))
+        metrics.set_gauge(f"llm.{self.call_type}.timeout_seconds", value)
+        return value
+
+    def hedge_delay(self) -> Optional[float]:
+        return self.percentile(95)
+
+
+class HedgeBudget:
+    """Limita quantas requisições duplicadas podem ser disparadas por dia."""
+
+    def __init__(self, max_per_day: int, *, today: Callable[[], date] = date.today) -> None:
+        self.max_per_day = max_per_day
+        self._today = today
+        self._day = today()
+        self._used = 0
+        self._lock = threading.Lock()
+
+    @property
+    def used(self) -> int:
+        with self._lock:
+            return self._used
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            day = self._today()
+            if day != self._day:
+                self._day = day
+                self._used = 0
+            if self._used >= self.max_per_day:
+                metrics.incr("llm.hedge.budget_exhausted")
+                return False
+            self._used += 1
+        metrics.incr("llm.hedge.sent")
+        return True
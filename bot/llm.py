@@ -3,32 +3,344 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
-import re
-from typing import Any, Dict, Iterable, Optional
+import threading
+import time
+import weakref
+from functools import lru_cache
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Type, TypeVar
 
-import google.generativeai as genai
+from pydantic import ValidationError
 
+from . import metrics
+from .batching import MicroBatcher
+from .cache import TTLCache, conversation_key
+from .circuit import CircuitBreaker, CircuitOpenError
+from .json_extract import first_json_block, json_candidates
+from .latency import HedgeBudget, LatencyTracker
 from .config import get_settings
-from .models import ClassifyOut, TriageOut, safe_parse
-from .prompts import CLASSIFY_PROMPT, RELATORIO_PROMPT, TRIAGE_PROMPT
+from .models import ClassifyBatchOut, ClassifyOut, TModel, TriageOut, TriageReportOut, response_schema
+from .prompt_builder import (
+    build_classify_batch_prompt,
+    build_classify_prompt,
+    build_combined_prompt,
+    build_report_prompt,
+    build_triage_prompt,
+)
+from .prompt_cache import record_usage
+from .prompts import CLASSIFY_LOTE_PROMPT, CLASSIFY_PROMPT, RELATORIO_NARRATIVA_PROMPT, TRIAGE_PROMPT, TRIAGE_RELATORIO_PROMPT
+from .providers import LLMProvider, create_provider
+from .ratelimit import PRIORITY_CRISIS, PRIORITY_NORMAL, RateLimiter, estimate_tokens, retry_delay
+from .router import ModelRouter, parse_model_list
+from .report import render_report, render_report_header
+from .safety import has_crisis_terms
+from .scheduler import FairScheduler, LLMOverloaded, llm_user
+from .triage_rules import decide_triage
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 _settings = get_settings()
 
-if _settings.gemini_api_key:
-    genai.configure(api_key=_settings.gemini_api_key)
-    _json_model = genai.GenerativeModel(
-        "gemini-2.5-flash",
-        generation_config={"response_mime_type": "application/json"},
+GEMINI_MODEL = "gemini-2.5-flash"
+JSON_CONFIG = {"response_mime_type": "application/json"}
+TEXT_CONFIG = {"response_mime_type": "text/plain"}
+# O modelo só escreve as seções 2 e 3 do relatório; o restante é montado localmente
+REPORT_CONFIG = {**TEXT_CONFIG, "max_output_tokens": _settings.report_max_output_tokens}
+
+
+def _json_config(output_model: Type[Any]) -> Dict[str, Any]:
+    # Com o schema a decodificação fica restrita ao formato do modelo pydantic
+    if not _settings.llm_response_schema:
+        return JSON_CONFIG
+    return {**JSON_CONFIG, "response_schema": response_schema(output_model)}
+
+
+CALL_TYPES = (
+    ("classify", CLASSIFY_PROMPT, _json_config(ClassifyOut)),
+    ("classify_batch", CLASSIFY_LOTE_PROMPT, _json_config(ClassifyBatchOut)),
+    ("triage", TRIAGE_PROMPT, _json_config(TriageOut)),
+    ("combined", TRIAGE_RELATORIO_PROMPT, _json_config(TriageReportOut)),
+    ("report", RELATORIO_NARRATIVA_PROMPT, REPORT_CONFIG),
+)
+
+# Modelos aceitos por tipo de chamada, em ordem de preferência de qualidade
+MODEL_CANDIDATES: Dict[str, List[str]] = {
+    "classify": parse_model_list(_settings.llm_models_classify, GEMINI_MODEL),
+    "classify_batch": parse_model_list(_settings.llm_models_classify, GEMINI_MODEL),
+    "triage": parse_model_list(_settings.llm_models_triage, GEMINI_MODEL),
+    "combined": parse_model_list(_settings.llm_models_combined, GEMINI_MODEL),
+    "report": parse_model_list(_settings.llm_models_report, GEMINI_MODEL),
+}
+_routers: Dict[str, ModelRouter] = {
+    call_type: ModelRouter(call_type, candidates) for call_type, candidates in MODEL_CANDIDATES.items()
+}
+
+# Gemini em produção; LLM_PROVIDER=fake troca por respostas simuladas em processo.
+# Criado na primeira chamada (ou no pré-aquecimento) para o import do SDK não pesar na inicialização.
+_UNSET: Any = object()
+_provider: Any = _UNSET
+_provider_lock = threading.Lock()
+
+
+def _get_provider() -> Optional[LLMProvider]:
+    global _provider
+    if _provider is _UNSET:
+        with _provider_lock:
+            if _provider is _UNSET:
+                started = time.perf_counter()
+                _provider = create_provider(_settings, CALL_TYPES, MODEL_CANDIDATES)
+                metrics.observe("llm.provider_init_seconds", time.perf_counter() - started)
+    return _provider
+
+
+_provider_futures: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Future]" = weakref.WeakKeyDictionary()
+
+
+async def _load_provider() -> Optional[LLMProvider]:
+    """Cria o provedor numa thread; chamadas simultâneas esperam a mesma criação sem travar o loop."""
+    if _provider is not _UNSET:
+        return _provider
+    loop = asyncio.get_running_loop()
+    future = _provider_futures.get(loop)
+    if future is None:
+        # Se o pré-aquecimento já está criando o provedor, a espera pelo lock fica nessa thread
+        future = _provider_futures[loop] = asyncio.ensure_future(asyncio.to_thread(_get_provider))
+    try:
+        # shield: cancelar uma chamada (timeout do handler) não interrompe a criação que as outras esperam
+        return await asyncio.shield(future)
+    finally:
+        if future.done():
+            _provider_futures.pop(loop, None)
+
+
+def _get_model(call_type: str) -> Any:
+    # As chamadas assíncronas esperam _load_provider antes; aqui o provedor já existe
+    router = _routers.get(call_type)
+    provider = _get_provider()
+    if router is None or provider is None:
+        return None
+    return provider.model(call_type, router.choose())
+
+
+async def prewarm() -> None:
+    """Cria o provedor fora do loop de eventos e aquece o cache de prompts dos modelos preferidos."""
+    provider = await _load_provider()
+    if provider is None:
+        return
+    # Só o modelo preferido de cada tipo é aquecido; os alternativos criam o cache no primeiro uso
+    await provider.warm((call_type, MODEL_CANDIDATES[call_type][0]) for call_type, _, _ in CALL_TYPES)
+
+
+# Teto dos timeouts; com amostras suficientes cada tipo de chamada usa uma margem sobre o próprio p99
+LLM_TIMEOUT_SECONDS = 20.0
+
+_latency: Dict[str, LatencyTracker] = {}
+_hedge_budget = HedgeBudget(_settings.llm_hedge_daily_budget)
+
+# Cota da API (requisições e tokens por minuto), compartilhada por todas as chamadas
+_rate_limiter = RateLimiter(_settings.llm_requests_per_minute, _settings.llm_tokens_per_minute)
+# Tokens fixos de cada chamada (instrução de sistema) e saída esperada, para reservar cota
+_static_tokens = {call_type: estimate_tokens(system_instruction) for call_type, system_instruction, _ in CALL_TYPES}
+_output_tokens = {
+    "classify": 300,
+    "classify_batch": 300 * _settings.classify_batch_max,
+    "triage": 600,
+    "combined": _settings.report_max_output_tokens + 600,
+    "report": _settings.report_max_output_tokens,
+}
+
+
+@lru_cache(maxsize=1)
+def _retryable_errors() -> Tuple[type, ...]:
+    # google.api_core (grpc, requests) só é carregado quando alguma chamada já falhou
+    from google.api_core import exceptions as google_exceptions
+
+    return (
+        google_exceptions.TooManyRequests,
+        google_exceptions.ResourceExhausted,
+        google_exceptions.InternalServerError,
+        google_exceptions.BadGateway,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.GatewayTimeout,
     )
-    _text_model = genai.GenerativeModel("gemini-2.5-flash")
-else:
-    logger.warning("Gemini API key ausente; utilizando apenas fallbacks seguros.")
-    _json_model = None
-    _text_model = None
 
-JSON_BLOCK_PATTERN = re.compile(r"\{.*\}", re.DOTALL)
+
+def _quota_cost(call_type: str, prompt: str) -> int:
+    return _static_tokens.get(call_type, 0) + estimate_tokens(prompt) + _output_tokens.get(call_type, 0)
+
+
+# Um único circuito para o Gemini: em queda ou sem cota, as chamadas caem direto nos fallbacks
+_breaker = CircuitBreaker(
+    "llm.circuit",
+    min_calls=_settings.llm_breaker_min_calls,
+    failure_rate=_settings.llm_breaker_failure_rate,
+    open_seconds=_settings.llm_breaker_open_seconds,
+)
+
+
+def _get_tracker(call_type: str) -> LatencyTracker:
+    tracker = _latency.get(call_type)
+    if tracker is None:
+        tracker = _latency[call_type] = LatencyTracker(call_type)
+    return tracker
+
+_concurrency_limit = _settings.llm_max_concurrency
+_max_queue = _settings.llm_max_queue
+_schedulers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, FairScheduler]" = weakref.WeakKeyDictionary()
+
+
+def _get_scheduler() -> FairScheduler:
+    loop = asyncio.get_running_loop()
+    scheduler = _schedulers.get(loop)
+    if scheduler is None:
+        scheduler = _schedulers[loop] = FairScheduler("llm.scheduler", _concurrency_limit, _max_queue)
+    return scheduler
+
+
+def _overloaded(call_type: str) -> None:
+    metrics.incr(f"llm.{call_type}.overloaded")
+    logger.warning(
+        "Fila do LLM cheia; %s segue pelo fallback",
+        call_type,
+        extra={"event": "llm_overloaded", "call_type": call_type, "queued": _get_scheduler().queued},
+    )
+
+
+async def _generate(
+    model: Any,
+    prompt: str,
+    call_type: str,
+    *,
+    priority: int = PRIORITY_NORMAL,
+    **kwargs: Any,
+) -> Any:
+    # Chamada assíncrona nativa: no timeout a requisição gRPC é cancelada de fato,
+    # sem deixar threads do executor presas esperando a resposta.
+    tracker = _get_tracker(call_type)
+    # Timeout adaptativo vale para cada requisição ao modelo; o teto cobre fila, cota e novas tentativas
+    attempt_timeout = tracker.timeout(LLM_TIMEOUT_SECONDS)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + LLM_TIMEOUT_SECONDS
+    cost = _quota_cost(call_type, prompt)
+
+    router = _routers.get(call_type)
+    model_name = str(getattr(model, "model_name", "") or "")
+    # Só falhas depois de a requisição sair contam para o circuito; esperas locais (fila, cota) não
+    sent = False
+
+    async def _attempt() -> Any:
+        nonlocal sent
+        # Cada tentativa (inclusive as novas, após erro) volta para a fila do próprio aluno
+        async with _get_scheduler().slot(priority=priority):
+            timeout = min(attempt_timeout, max(0.0, deadline - loop.time()))
+            started = loop.time()
+            sent = True
+            try:
+                response = await asyncio.wait_for(
+                    model.generate_content_async(prompt, request_options={"timeout": max(0.1, timeout)}, **kwargs),
+                    timeout=timeout,
+                )
+            except asyncio.TimeoutError:
+                # Conta o timeout como amostra para o p99 não ser puxado para baixo pelos cortes
+                tracker.record(timeout)
+                if router:
+                    router.record(model_name, timeout, ok=False)
+                raise
+            except Exception:
+                if router:
+                    router.record(model_name, loop.time() - started, ok=False)
+                raise
+            elapsed = loop.time() - started
+            tracker.record(elapsed)
+            if router:
+                router.record(model_name, elapsed, ok=True)
+            return response
+
+    async def _call() -> Any:
+        attempt = 0
+        while True:
+            await _rate_limiter.acquire(cost, priority, timeout=max(0.0, deadline - loop.time()))
+            try:
+                return await _attempt()
+            except Exception as exc:
+                if not isinstance(exc, _retryable_errors()):
+                    raise
+                # 429/5xx: nova tentativa com backoff apenas se couber no prazo da chamada
+                delay = retry_delay(attempt)
+                attempt += 1
+                if attempt > _settings.llm_max_retries or loop.time() + delay >= deadline:
+                    raise
+                metrics.incr(f"llm.{call_type}.retries")
+                logger.warning(
+                    "Gemini %s: %s; nova tentativa em %.2fs",
+                    call_type,
+                    exc.__class__.__name__,
+                    delay,
+                    extra={"event": "llm_retry", "call_type": call_type, "attempt": attempt},
+                )
+                await asyncio.sleep(delay)
+
+    if not _breaker.allow():
+        raise CircuitOpenError(call_type)
+    hedge_after = tracker.hedge_delay() if _settings.llm_hedging else None
+    try:
+        if hedge_after is None or hedge_after >= attempt_timeout:
+            response = await asyncio.wait_for(_call(), timeout=LLM_TIMEOUT_SECONDS)
+        else:
+            response = await _hedged(_call, call_type, hedge_after, LLM_TIMEOUT_SECONDS)
+    except asyncio.CancelledError:
+        _breaker.release()
+        raise
+    except LLMOverloaded:
+        # Recusa local: não diz nada sobre a saúde do Gemini
+        _breaker.release()
+        _overloaded(call_type)
+        raise
+    except Exception:
+        if sent:
+            _breaker.record_failure()
+        else:
+            # Prazo esgotado na fila do LLM ou na cota antes de qualquer requisição ao Gemini
+            _breaker.release()
+            metrics.incr(f"llm.{call_type}.local_timeouts")
+        raise
+    _breaker.record_success()
+    return response
+
+
+async def _hedged(call: Callable[[], Awaitable[Any]], call_type: str, hedge_after: float, timeout: float) -> Any:
+    """Dispara uma cópia da requisição se a primeira passar do p95; fica com a primeira resposta válida."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    primary = asyncio.ensure_future(call())
+    tasks = [primary]
+    try:
+        done, _pending = await asyncio.wait(tasks, timeout=hedge_after)
+        if not done and _hedge_budget.try_acquire():
+            metrics.incr(f"llm.{call_type}.hedged")
+            tasks.append(asyncio.ensure_future(call()))
+        pending = set(tasks)
+        error: BaseException | None = None
+        while pending:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                raise asyncio.TimeoutError()
+            for task in done:
+                if task.exception() is None:
+                    if task is not primary:
+                        metrics.incr(f"llm.{call_type}.hedge_wins")
+                    return task.result()
+                error = task.exception()
+        raise error  # type: ignore[misc]
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
 
 def _extract_text(response: Any) -> str:
@@ -48,71 +360,287 @@ def _extract_text(response: Any) -> str:
 
 
 def _extract_first_json_block(text: str) -> str:
-    if not text:
-        return "{}"
-    fenced = re.search(r"```(?:json)?\s*(\{.*?\})```", text, re.DOTALL | re.IGNORECASE)
-    if fenced:
-        return fenced.group(1)
-    match = JSON_BLOCK_PATTERN.search(text)
-    if match:
-        return match.group(0)
-    return "{}"
-
-
-async def _invoke_json(prompt: str) -> Optional[Dict[str, Any]]:
-    if not _json_model:
+    return first_json_block(text)
+
+
+def _first_valid_json(raw_text: str, call_type: str, load: Callable[[str], T]) -> Optional[T]:
+    """Primeira leitura de JSON da resposta que ``load`` aceita; None (e json_defaulted) se nenhuma servir."""
+    text = raw_text or ""
+    start, end = text.find("{"), text.rfind("}")
+    if 0 <= start < end:
+        # Caso comum: um único objeto bem formado, lido sem passar pelo scanner
+        try:
+            return load(text[start : end + 1])
+        except ValueError:
+            pass
+    for candidate in json_candidates(text):
+        try:
+            parsed = load(candidate.text)
+        except ValueError:
+            continue
+        if candidate.repaired:
+            metrics.incr(f"llm.{call_type}.json_repaired")
+        return parsed
+    metrics.incr(f"llm.{call_type}.json_defaulted")
+    return None
+
+
+def _parse_output(model: Type[TModel], raw_text: str, call_type: str) -> Optional[TModel]:
+    """Valida a resposta direto no modelo, sem passar por dict; None se nenhuma leitura validar."""
+    # ValidationError é subclasse de ValueError: JSON malformado e schema inválido caem no mesmo except
+    parsed = _first_valid_json(raw_text, call_type, model.model_validate_json)
+    if parsed is None:
+        logger.warning(
+            "Resposta %s fora do formato esperado",
+            call_type,
+            extra={"event": "llm_output_invalid", "call_type": call_type, "chars": len(raw_text or "")},
+        )
+    return parsed
+
+
+async def _invoke_raw(prompt: str, call_type: str, priority: int = PRIORITY_NORMAL) -> Optional[str]:
+    """Texto bruto da resposta JSON; None quando a chamada não responde, LLMOverloaded com a fila cheia."""
+    await _load_provider()
+    model = _get_model(call_type)
+    if not model:
         return None
     try:
-        # Timeout reduzido para 20 segundos (era 30)
-        response = await asyncio.wait_for(
-            asyncio.to_thread(_json_model.generate_content, prompt),
-            timeout=20.0
-        )
-        raw_text = _extract_text(response)
-        json_payload = _extract_first_json_block(raw_text)
-        return json.loads(json_payload or "{}")
+        response = await _generate(model, prompt, call_type, priority=priority)
+        record_usage(call_type, response)
+        return _extract_text(response)
+    except LLMOverloaded:
+        # Fila cheia: o chamador recebe o sinal explícito em vez do mesmo fallback de circuito aberto
+        raise
+    except CircuitOpenError:
+        return None
     except asyncio.TimeoutError:
-        logger.error("Gemini JSON call timeout após 20 segundos")
+        logger.error("Gemini JSON call timeout (%s)", call_type)
         return None
     except Exception as exc:  # pylint: disable=broad-except
         logger.error("Gemini JSON call failed: %s", exc)
         return None
 
 
-async def _invoke_text(prompt: str) -> str:
-    if not _text_model:
+async def _invoke_json(prompt: str, call_type: str, priority: int = PRIORITY_NORMAL) -> Optional[Dict[str, Any]]:
+    raw_text = await _invoke_raw(prompt, call_type, priority=priority)
+    if raw_text is None:
+        return None
+    return _first_valid_json(raw_text, call_type, json.loads) or {}
+
+
+async def _invoke_text(prompt: str, call_type: str = "report") -> str:
+    await _load_provider()
+    model = _get_model(call_type)
+    if not model:
         return ""
     try:
-        # Timeout reduzido para 20 segundos (era 30)
-        response = await asyncio.wait_for(
-            asyncio.to_thread(
-                _text_model.generate_content,
-                prompt,
-                generation_config={"response_mime_type": "text/plain"},
-            ),
-            timeout=20.0
-        )
+        response = await _generate(model, prompt, call_type)
+        record_usage(call_type, response)
         return _extract_text(response).strip()
+    except LLMOverloaded:
+        # Fila cheia: o chamador recebe o sinal explícito em vez do mesmo fallback de circuito aberto
+        raise
+    except CircuitOpenError:
+        return ""
     except asyncio.TimeoutError:
-        logger.error("Gemini text call timeout após 20 segundos")
+        logger.error("Gemini text call timeout (%s)", call_type)
         return ""
     except Exception as exc:  # pylint: disable=broad-except
         logger.error("Gemini text call failed: %s", exc)
         return ""
 
 
-async def classify_msg(message: str, history: Iterable[str]) -> ClassifyOut:
-    prompt = (
-        f"{CLASSIFY_PROMPT}\n\n"
-        f"Histórico recente: {list(history)[-6:]}\n"
-        f"Mensagem atual: {message}\n"
-        "Responda apenas com o JSON especificado."
+async def _invoke_text_stream(prompt: str, call_type: str = "report") -> AsyncIterator[str]:
+    await _load_provider()
+    model = _get_model(call_type)
+    if not model:
+        return
+    # Streams não são duplicados (hedge): o progresso já é exibido ao aluno durante a geração
+    tracker = _get_tracker(call_type)
+    loop = asyncio.get_running_loop()
+    ceiling = loop.time() + LLM_TIMEOUT_SECONDS
+    if not _breaker.allow():
+        return
+    scheduler = _get_scheduler()
+    try:
+        await _rate_limiter.acquire(_quota_cost(call_type, prompt), timeout=LLM_TIMEOUT_SECONDS)
+        await asyncio.wait_for(scheduler.acquire(llm_user.get()), timeout=max(0.0, ceiling - loop.time()))
+    except LLMOverloaded:
+        _breaker.release()
+        _overloaded(call_type)
+        raise
+    except asyncio.TimeoutError:
+        # Esperou cota ou vaga na fila; o Gemini nem foi chamado
+        _breaker.release()
+        metrics.incr(f"llm.{call_type}.local_timeouts")
+        logger.error("Gemini stream call timeout (%s)", call_type)
+        return
+    except asyncio.CancelledError:
+        _breaker.release()
+        raise
+    router = _routers.get(call_type)
+    model_name = str(getattr(model, "model_name", "") or "")
+    started = loop.time()
+    timeout = min(tracker.timeout(LLM_TIMEOUT_SECONDS), max(0.0, ceiling - started))
+    deadline = started + timeout
+    outcome_recorded = False
+    try:
+        response = await asyncio.wait_for(
+            model.generate_content_async(
+                prompt,
+                stream=True,
+                request_options={"timeout": timeout},
+            ),
+            timeout=max(0.0, deadline - loop.time()),
+        )
+        chunks = response.__aiter__()
+        chunk = None
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), timeout=max(0.0, deadline - loop.time()))
+            except StopAsyncIteration:
+                # O último fragmento traz o uso de tokens acumulado da resposta
+                record_usage(call_type, chunk)
+                tracker.record(loop.time() - started)
+                if router:
+                    router.record(model_name, loop.time() - started, ok=True)
+                _breaker.record_success()
+                outcome_recorded = True
+                break
+            try:
+                text = _extract_text(chunk)
+            except ValueError:
+                continue
+            if text:
+                yield text
+    except asyncio.TimeoutError:
+        tracker.record(timeout)
+        if router:
+            router.record(model_name, timeout, ok=False)
+        _breaker.record_failure()
+        outcome_recorded = True
+        logger.error("Gemini stream call timeout (%s)", call_type)
+    except Exception as exc:  # pylint: disable=broad-except
+        if router:
+            router.record(model_name, loop.time() - started, ok=False)
+        _breaker.record_failure()
+        outcome_recorded = True
+        logger.error("Gemini stream call failed: %s", exc)
+    finally:
+        if not outcome_recorded:
+            # Consumidor abandonou o stream ou a tarefa foi cancelada
+            _breaker.release()
+        scheduler.release()
+
+
+async def _stream_report(prompt: str, on_chunk: Callable[[str], Awaitable[None]]) -> str:
+    start = time.perf_counter()
+    first_chunk_at: float | None = None
+    parts: list[str] = []
+    async for chunk in _invoke_text_stream(prompt):
+        if first_chunk_at is None:
+            first_chunk_at = time.perf_counter() - start
+            metrics.observe("llm.report.time_to_first_chunk_seconds", first_chunk_at)
+        parts.append(chunk)
+        try:
+            await on_chunk("".join(parts))
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.debug("Falha ao renderizar progresso do relatório (ignorado): %s", exc)
+    total = time.perf_counter() - start
+    metrics.observe("llm.report.generation_seconds", total)
+    logger.info(
+        "report_stream",
+        extra={
+            "event": "report_stream",
+            "time_to_first_chunk_seconds": round(first_chunk_at, 3) if first_chunk_at is not None else None,
+            "generation_seconds": round(total, 3),
+        },
     )
-    payload = await _invoke_json(prompt)
-    default = ClassifyOut()
+    return "".join(parts).strip()
+
+
+# Respostas de classify para mensagens recorrentes ("estou bem", "cansado"...)
+_classify_cache: TTLCache[ClassifyOut] = TTLCache(
+    "classify",
+    max_size=_settings.classify_cache_size,
+    ttl_seconds=_settings.classify_cache_ttl,
+)
+
+
+async def _classify_single(
+    item: Tuple[str, List[str]],
+    priority: int = PRIORITY_NORMAL,
+) -> Optional[ClassifyOut]:
+    message, history = item
+    prompt = build_classify_prompt(message, history)
+    raw_text = await _invoke_raw(prompt, "classify", priority=priority)
+    if raw_text is None:
+        return None
+    return _parse_output(ClassifyOut, raw_text, "classify")
+
+
+class ClassifyBatchError(RuntimeError):
+    """A chamada em lote não respondeu; os pedidos do lote caem no fallback padrão."""
+
+
+async def _classify_batch(items: List[Tuple[str, List[str]]]) -> List[Optional[ClassifyOut]]:
+    prompt = build_classify_batch_prompt(items)
+    # O lote atende vários alunos de uma vez: ocupa uma fila própria no rodízio
+    token = llm_user.set("classify_batch")
+    try:
+        payload = await _invoke_json(prompt, "classify_batch")
+    finally:
+        llm_user.reset(token)
     if payload is None:
-        return default
-    return safe_parse(ClassifyOut, payload, default)
+        raise ClassifyBatchError(f"lote de {len(items)} sem resposta")
+    results: List[Optional[ClassifyOut]] = [None] * len(items)
+    entries = payload.get("resultados") if isinstance(payload, dict) else None
+    for entry in entries if isinstance(entries, list) else []:
+        idx = entry.get("id") if isinstance(entry, dict) else None
+        if not isinstance(idx, int) or not 0 <= idx < len(items) or results[idx] is not None:
+            continue
+        try:
+            results[idx] = ClassifyOut.model_validate(entry)
+        except ValidationError:
+            continue
+    return results
+
+
+_classify_batcher: MicroBatcher[Tuple[str, List[str]], Optional[ClassifyOut]] = MicroBatcher(
+    "llm.classify_batch",
+    _classify_batch,
+    _classify_single,
+    window_seconds=_settings.classify_batch_window_ms / 1000,
+    max_batch=_settings.classify_batch_max,
+)
+
+
+async def classify_msg(message: str, history: Iterable[str]) -> ClassifyOut:
+    """Classificação da mensagem; ClassifyOut() padrão se o modelo falhar, LLMOverloaded com a fila cheia."""
+    history = list(history)[-6:]
+    # Mensagens com termos de risco sempre vão ao modelo
+    cacheable = not has_crisis_terms(message)
+    key = conversation_key(message, history)
+    if cacheable:
+        cached = _classify_cache.get(key)
+        if cached is not None:
+            return cached.model_copy(deep=True)
+
+    if _settings.classify_batching and cacheable:
+        try:
+            result = await _classify_batcher.submit((message, history))
+        except ClassifyBatchError:
+            result = None
+    else:
+        # Mensagens com termos de risco não esperam lote e furam a fila da cota
+        result = await _classify_single((message, history), PRIORITY_NORMAL if cacheable else PRIORITY_CRISIS)
+    if result is None:
+        return ClassifyOut()
+    # Não guarda o fallback padrão (uma resposta "{}" também valida como ClassifyOut())
+    # nem resultados com sinal de crise
+    if cacheable and not result.possivel_crise and result != ClassifyOut():
+        _classify_cache.set(key, result.model_copy(deep=True))
+    return result
 
 
 async def triage_summary(
@@ -121,60 +649,71 @@ async def triage_summary(
     gad7_respostas: Iterable[int],
     texto_livre: Iterable[str],
 ) -> TriageOut:
-    from .instruments import phq9_score, gad7_score, phq9_bucket, gad7_bucket, phq9_item9_flag
-    
-    # Calcula scores e níveis para dar mais contexto à IA
-    phq9_total = phq9_score(phq9_respostas) if phq9_respostas else 0
-    gad7_total = gad7_score(gad7_respostas) if gad7_respostas else 0
-    phq9_level = phq9_bucket(phq9_total)
-    gad7_level = gad7_bucket(gad7_total)
-    q9_positive = phq9_item9_flag(phq9_respostas) if phq9_respostas and len(list(phq9_respostas)) >= 9 else False
-    
-    # Identifica itens mais preocupantes
+    """Triagem por regras ou pelo modelo; TriageOut() padrão se o modelo falhar, LLMOverloaded com a fila cheia."""
+    phq9_respostas = list(phq9_respostas)
+    gad7_respostas = list(gad7_respostas)
+    texto_livre = list(texto_livre)
+    if _settings.triage_rules:
+        decision = decide_triage(phq9_respostas, gad7_respostas, texto_livre)
+        if decision is not None:
+            metrics.incr("triage.llm_calls_avoided")
+            metrics.incr(f"triage.rules.{decision.reason}")
+            logger.info(
+                "triagem resolvida por regras",
+                extra={"event": "triage_rules", "reason": decision.reason, "urgency": decision.triage.nivel_urgencia},
+            )
+            return decision.triage
+
+    metrics.incr("triage.llm_calls")
+    prompt = build_triage_prompt(dados_pessoais, phq9_respostas, gad7_respostas, texto_livre)
+    raw_text = await _invoke_raw(prompt, "triage")
+    if raw_text is None:
+        return TriageOut()
+    return _parse_output(TriageOut, raw_text, "triage") or TriageOut()
+
+
+async def triage_and_report(
+    dados_pessoais: Dict[str, str],
+    phq9_respostas: Iterable[int],
+    gad7_respostas: Iterable[int],
+    texto_livre: Iterable[str],
+    contexto: Dict[str, Any],
+) -> Tuple[TriageOut, str]:
+    """Gera análise e relatório em uma única chamada; volta ao caminho de duas chamadas se a resposta não validar."""
     phq9_list = list(phq9_respostas)
     gad7_list = list(gad7_respostas)
-    phq9_high_items = [f"Q{i+1}({score})" for i, score in enumerate(phq9_list) if score >= 2]
-    gad7_high_items = [f"Q{i+1}({score})" for i, score in enumerate(gad7_list) if score >= 2]
-    
-    prompt = (
-        f"{TRIAGE_PROMPT}\n\n"
-        f"DADOS PESSOAIS: {dados_pessoais}\n\n"
-        f"PHQ-9 (Depressão):\n"
-        f"  - Respostas: {phq9_list}\n"
-        f"  - Score total: {phq9_total}/27 ({phq9_level})\n"
-        f"  - Itens com pontuação ≥2: {', '.join(phq9_high_items) if phq9_high_items else 'Nenhum'}\n"
-        f"  - ⚠️ Item 9 (pensamentos de morte/autolesão): {'POSITIVO (≥1) - RISCO CRÍTICO' if q9_positive else 'Negativo'}\n\n"
-        f"GAD-7 (Ansiedade):\n"
-        f"  - Respostas: {gad7_list}\n"
-        f"  - Score total: {gad7_total}/21 ({gad7_level})\n"
-        f"  - Itens com pontuação ≥2: {', '.join(gad7_high_items) if gad7_high_items else 'Nenhum'}\n\n"
-        f"RELATOS LIVRES (últimas 6 mensagens):\n"
-        f"{chr(10).join(f'  - {texto}' for texto in list(texto_livre)[-6:] if texto.strip())}\n\n"
-        f"Responda apenas com o JSON especificado, sendo preciso e baseado nos dados fornecidos."
-    )
-    payload = await _invoke_json(prompt)
-    default = TriageOut()
-    if payload is None:
-        return default
-    return safe_parse(TriageOut, payload, default)
-
-
-async def gen_report_text(contexto: str) -> str:
-    prompt = (
-        f"{RELATORIO_PROMPT}\n\n"
-        f"DADOS DA TRIAGEM (JSON):\n{contexto}\n\n"
-        "IMPORTANTE: Substitua todos os {{placeholders}} pelos valores reais dos dados fornecidos acima. "
-        "Gere o relatório completo seguindo EXATAMENTE a estrutura especificada, preenchendo todas as seções. "
-        "Use os dados do JSON para extrair nome, matrícula, scores, classificações, etc. "
-        "Produza apenas o texto do relatório formatado, sem JSON."
-    )
-    text = await _invoke_text(prompt)
-    if not text:
-        return (
-            "📌 RELATÓRIO DE TRIAGEM — PSICOFLOW\n\n"
-            "Triagem registrada. Recomenda-se buscar apoio profissional. "
-            "A equipe fará contato o quanto antes."
-        )
-    # Aumenta limite para relatório completo (até 3000 caracteres)
-    return text[:3000]
+    texto_list = list(texto_livre)
+    prompt = build_combined_prompt(dados_pessoais, phq9_list, gad7_list, texto_list, contexto)
+    raw_text = await _invoke_raw(prompt, "combined")
+    if raw_text is None:
+        # Falha de chamada (sem chave, timeout ou erro): relatório com as seções 2 e 3 montadas localmente
+        return TriageOut(), render_report(contexto, "")
+    combined = _parse_output(TriageReportOut, raw_text, "combined")
+    if combined is not None:
+        return combined.triage, render_report({**contexto, "triage": combined.triage.model_dump()}, combined.relatorio)
+    logger.warning("Resposta combinada inválida, usando duas chamadas")
+
+    triage = await triage_summary(dados_pessoais, phq9_list, gad7_list, texto_list)
+    report = await gen_report_text({**contexto, "triage": triage.model_dump()})
+    return triage, report
+
+
+async def gen_report_text(
+    contexto: Dict[str, Any],
+    on_chunk: Callable[[str], Awaitable[None]] | None = None,
+) -> str:
+    """Relatório completo (seções 2 e 3 locais se o modelo falhar); LLMOverloaded com a fila cheia."""
+    prompt = build_report_prompt(contexto)
+    if on_chunk is None:
+        text = await _invoke_text(prompt)
+    else:
+        header = render_report_header(contexto)
+
+        async def on_narrative(partial: str) -> None:
+            await on_chunk(f"{header}\n{partial}")
+
+        text = await _stream_report(prompt, on_narrative)
+    # Sem resposta do modelo, as seções 2 e 3 saem da análise de triagem (fallback_narrative);
+    # o resumo determinístico do compose_report_text fica só para exceções fora do LLM
+    return render_report(contexto, text or "")
 
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict, Sequence, Tuple
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = {}
+_gauges: Dict[str, float] = {}
+_summaries: Dict[str, Dict[str, float]] = {}
+_histograms: Dict[str, Tuple[Tuple[float, ...], list]] = {}
+
+LATENCY_BUCKETS: Tuple[float, ...] = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0)
+
+
+def incr(name: str, value: float = 1) -> None:
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name: str, value: float) -> None:
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name: str, value: float) -> None:
+    with _lock:
+        summary = _summaries.setdefault(name, {"count": 0, "sum": 0.0, "min": value, "max": value, "last": value})
+        summary["count"] += 1
+        summary["sum"] += value
+        summary["min"] = min(summary["min"], value)
+        summary["max"] = max(summary["max"], value)
+        summary["last"] = value
+
+
+def observe_histogram(name: str, value: float, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+    """Contagem por faixa (limite superior inclusivo); a última posição é o excedente (+Inf)."""
+    with _lock:
+        bounds, counts = _histograms.setdefault(name, (tuple(buckets), [0] * (len(buckets) + 1)))
+        for idx, bound in enumerate(bounds):
+            if value <= bound:
+                counts[idx] += 1
+                break
+        else:
+            counts[-1] += 1
+
+
+def _histogram_dict(bounds: Sequence[float], counts: Sequence[int]) -> Dict[str, int]:
+    return dict(zip([f"le_{bound:g}" for bound in bounds] + ["inf"], counts))
+
+
+def get_histogram(name: str) -> Dict[str, int]:
+    with _lock:
+        if name not in _histograms:
+            return {}
+        return _histogram_dict(*_histograms[name])
+
+
+def get(name: str) -> float:
+    with _lock:
+        if name in _gauges:
+            return _gauges[name]
+        return _counters.get(name, 0)
+
+
+def get_summary(name: str) -> Dict[str, float]:
+    with _lock:
+        return dict(_summaries.get(name, {}))
+
+
+def snapshot() -> Dict[str, Dict[str, object]]:
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "summaries": {name: dict(summary) for name, summary in _summaries.items()},
+            "histograms": {name: _histogram_dict(*histogram) for name, histogram in _histograms.items()},
+        }
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _summaries.clear()
+        _histograms.clear()
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import List, Literal, Sequence, Type, TypeVar
+from typing import Any, Dict, List, Literal, Sequence, Type, TypeVar
 
 from pydantic import BaseModel, Field, ValidationError, field_validator
 
@@ -51,6 +51,24 @@ class TriageOut(BaseModel):
         return clean_items[:6]
 
 
+class ClassifyBatchItem(ClassifyOut):
+    id: int
+
+
+class ClassifyBatchOut(BaseModel):
+    resultados: List[ClassifyBatchItem] = Field(default_factory=list)
+
+
+class TriageReportOut(BaseModel):
+    triage: TriageOut
+    relatorio: str = Field(min_length=100)
+
+    @field_validator("relatorio")
+    @classmethod
+    def trim_report(cls, value: str) -> str:
+        return value.strip()[:3000]
+
+
 class ReportBundle(BaseModel):
     deterministic_summary: str
     llm_observation: str
@@ -70,3 +88,36 @@ def safe_parse(model: Type[TModel], payload: object, default: TModel) -> TModel:
     except ValidationError:
         return default
 
+
+
+# Subconjunto OpenAPI aceito em response_schema pelo Gemini
+_SCHEMA_KEYS = frozenset({"type", "format", "description", "nullable", "enum", "items", "properties", "required"})
+
+
+def response_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """Converte o JSON Schema do modelo para o formato de ``response_schema``.
+
+    Referências são expandidas e limites/defaults descartados (continuam validados
+    localmente); todos os campos viram obrigatórios para a resposta vir completa.
+    """
+    schema = model.model_json_schema()
+    defs = schema.get("$defs", {})
+
+    def convert(node: Dict[str, Any]) -> Dict[str, Any]:
+        if "$ref" in node:
+            node = defs[node["$ref"].rsplit("/", 1)[-1]]
+        out: Dict[str, Any] = {}
+        for key, value in node.items():
+            if key == "properties":
+                out[key] = {name: convert(prop) for name, prop in value.items()}
+            elif key == "items":
+                out[key] = convert(value)
+            elif key in _SCHEMA_KEYS:
+                out[key] = value
+        if "enum" in out:
+            out["format"] = "enum"
+        if "properties" in out:
+            out["required"] = list(out["properties"])
+        return out
+
+    return convert(schema)
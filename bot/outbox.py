@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Protocol
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_next_attempt ON outbox (next_attempt_at);
+"""
+
+
+@dataclass
+class OutboxEntry:
+    id: int
+    payload: Dict[str, Any]
+    created_at: float
+    attempts: int
+
+
+@dataclass
+class OutboxStats:
+    depth: int
+    oldest_age_seconds: float
+
+
+class ScreeningSender(Protocol):
+    async def send_screening(self, payload: Mapping[str, Any]) -> bool: ...
+
+
+class Outbox:
+    """Fila local em SQLite: a triagem é gravada antes do POST e só sai após confirmação do backend."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        if str(path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(_SCHEMA)
+
+    def enqueue(self, payload: Mapping[str, Any]) -> int:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO outbox (payload, created_at, next_attempt_at) VALUES (?, ?, ?)",
+                (json.dumps(dict(payload), ensure_ascii=False), now, now),
+            )
+        metrics.incr("outbox.enqueued")
+        return int(cursor.lastrowid)
+
+    def due(self, limit: int, now: float | None = None) -> List[OutboxEntry]:
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, payload, created_at, attempts FROM outbox "
+                "WHERE next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (now, limit),
+            ).fetchall()
+        return [OutboxEntry(id=row[0], payload=json.loads(row[1]), created_at=row[2], attempts=row[3]) for row in rows]
+
+    def mark_sent(self, entry_ids: List[int]) -> None:
+        if not entry_ids:
+            return
+        with self._lock:
+            self._conn.executemany("DELETE FROM outbox WHERE id = ?", [(entry_id,) for entry_id in entry_ids])
+
+    def mark_failed(self, entry_id: int, next_attempt_at: float, error: str = "") -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                (next_attempt_at, error[:500], entry_id),
+            )
+
+    def stats(self, now: float | None = None) -> OutboxStats:
+        now = time.time() if now is None else now
+        with self._lock:
+            depth, oldest = self._conn.execute("SELECT COUNT(*), MIN(created_at) FROM outbox").fetchone()
+        return OutboxStats(depth=int(depth), oldest_age_seconds=max(0.0, now - oldest) if oldest else 0.0)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class OutboxWorker:
+    """Drena o outbox em segundo plano, com lotes e backoff exponencial por triagem."""
+
+    def __init__(
+        self,
+        outbox: Outbox,
+        sender: ScreeningSender,
+        *,
+        batch_size: int = 10,
+        retry_base: float = 2.0,
+        retry_max: float = 300.0,
+        poll_interval: float = 5.0,
+    ) -> None:
+        self.outbox = outbox
+        self.sender = sender
+        self.batch_size = batch_size
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.poll_interval = poll_interval
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.retry_max, self.retry_base * (2 ** attempts))
+        return delay * random.uniform(0.5, 1.0)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="outbox-worker")
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def drain_once(self) -> int:
+        entries = await asyncio.to_thread(self.outbox.due, self.batch_size)
+        if not entries:
+            return 0
+        results = await asyncio.gather(
+            *(self.sender.send_screening(entry.payload) for entry in entries),
+            return_exceptions=True,
+        )
+        sent: List[int] = []
+        now = time.time()
+        for entry, result in zip(entries, results):
+            if result is True:
+                sent.append(entry.id)
+                continue
+            error = str(result) if isinstance(result, BaseException) else "backend_rejected"
+            await asyncio.to_thread(self.outbox.mark_failed, entry.id, now + self.backoff(entry.attempts), error)
+            metrics.incr("outbox.retries")
+            logger.warning(
+                "outbox_send_failed",
+                extra={"event": "outbox_send_failed", "outbox_id": entry.id, "attempts": entry.attempts + 1},
+            )
+        await asyncio.to_thread(self.outbox.mark_sent, sent)
+        metrics.incr("outbox.sent", len(sent))
+        return len(sent)
+
+    async def refresh_metrics(self) -> OutboxStats:
+        stats = await asyncio.to_thread(self.outbox.stats)
+        metrics.set_gauge("outbox.depth", stats.depth)
+        metrics.set_gauge("outbox.oldest_age_seconds", stats.oldest_age_seconds)
+        return stats
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                while await self.drain_once() >= self.batch_size:
+                    pass
+                stats = await self.refresh_metrics()
+                if stats.depth:
+                    logger.info(
+                        "outbox_pending",
+                        extra={
+                            "event": "outbox_pending",
+                            "depth": stats.depth,
+                            "oldest_age_seconds": round(stats.oldest_age_seconds, 1),
+                        },
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.error("Outbox worker falhou: %s", exc)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
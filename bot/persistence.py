@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+from . import metrics
+from .session import SessionData
+from .states import ConversationState
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    user_id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at);
+CREATE TABLE IF NOT EXISTS conversations (
+    name TEXT NOT NULL,
+    conv_key TEXT NOT NULL,
+    state TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (name, conv_key)
+);
+"""
+
+_SESSION_TAG = "__session__"
+
+ConversationKey = Tuple[str, str]
+
+
+def _encode_user_data(data: Dict[str, Any]) -> str:
+    encoded = {
+        key: {_SESSION_TAG: value.to_dict()} if isinstance(value, SessionData) else value
+        for key, value in data.items()
+    }
+    return json.dumps(encoded, ensure_ascii=False, default=str)
+
+
+def _decode_object(obj: Dict[str, Any]) -> Any:
+    if _SESSION_TAG in obj and len(obj) == 1:
+        return SessionData.from_dict(obj[_SESSION_TAG])
+    return obj
+
+
+def _encode_state(state: object) -> str:
+    return json.dumps(state.name if isinstance(state, ConversationState) else state)
+
+
+def _decode_state(text: str) -> object:
+    state = json.loads(text)
+    if isinstance(state, str) and state in ConversationState.__members__:
+        return ConversationState[state]
+    return state
+
+
+class SQLitePersistence(BasePersistence):
+    """Persiste as sessões dos alunos e o estado das conversas em SQLite (WAL).
+
+    O Application marca como sujos os alunos que receberam updates e, a cada
+    `update_interval`, entrega os dados via `update_user_data`/`update_conversation`;
+    aqui eles só são acumulados e gravados juntos numa única transação. Na carga,
+    as expiradas (`max_age_seconds`) são apagadas e no máximo `max_loaded` sessões
+    recentes voltam para a memória; as demais são lidas uma a uma no primeiro
+    update do aluno (`refresh_user_data`). Os estados de conversa, pequenos, são
+    carregados todos, para nenhuma sessão perder a etapa em que estava.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        update_interval: float = 5.0,
+        max_age_seconds: float = 7 * 24 * 3600,
+        max_loaded: int = 20_000,
+    ) -> None:
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.path = Path(path)
+        if str(path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_age_seconds = max_age_seconds
+        self.max_loaded = max_loaded
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Gravação em lote a cada intervalo: NORMAL basta, o WAL protege contra queda do processo
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._pending_users: Dict[int, Optional[Dict[str, Any]]] = {}
+        self._pending_conversations: Dict[ConversationKey, object] = {}
+        self._flush_task: asyncio.Task | None = None
+        # Alunos cuja sessão já está na memória ou já foi procurada no banco
+        self._known_users: set[int] = set()
+
+    # --- SQLite (executado em thread) ---
+
+    def _cutoff(self) -> float:
+        return time.time() - self.max_age_seconds
+
+    def load_user_data(self) -> Dict[int, Dict[str, Any]]:
+        cutoff = self._cutoff()
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,))
+            self._conn.execute("DELETE FROM conversations WHERE updated_at < ?", (cutoff,))
+            rows = self._conn.execute(
+                "SELECT user_id, data FROM sessions ORDER BY updated_at DESC LIMIT ?", (self.max_loaded,)
+            ).fetchall()
+        return {int(user_id): json.loads(data, object_hook=_decode_object) for user_id, data in rows}
+
+    def load_session(self, user_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM sessions WHERE user_id = ? AND updated_at >= ?", (user_id, self._cutoff())
+            ).fetchone()
+        return json.loads(row[0], object_hook=_decode_object) if row else None
+
+    def load_conversations(self, name: str) -> Dict[tuple, object]:
+        with self._lock:
+            rows = self._conn.execute("SELECT conv_key, state FROM conversations WHERE name = ?", (name,)).fetchall()
+        return {tuple(json.loads(key)): _decode_state(state) for key, state in rows}
+
+    def write_batch(
+        self,
+        users: Dict[int, Optional[Dict[str, Any]]],
+        conversations: Dict[ConversationKey, object],
+    ) -> None:
+        now = time.time()
+        upserts = [(user_id, _encode_user_data(data), now) for user_id, data in users.items() if data is not None]
+        drops = [(user_id,) for user_id, data in users.items() if data is None]
+        states = [
+            (name, key, _encode_state(state), now) for (name, key), state in conversations.items() if state is not None
+        ]
+        ended = [(name, key) for (name, key), state in conversations.items() if state is None]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO sessions (user_id, data, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT (user_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                    upserts,
+                )
+                self._conn.executemany("DELETE FROM sessions WHERE user_id = ?", drops)
+                self._conn.executemany(
+                    "INSERT INTO conversations (name, conv_key, state, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (name, conv_key) "
+                    "DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+                    states,
+                )
+                self._conn.executemany("DELETE FROM conversations WHERE name = ? AND conv_key = ?", ended)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # --- Escrita adiada ---
+
+    def _schedule_flush(self) -> None:
+        # O Application entrega todos os alunos sujos de uma vez; a task roda depois deles
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_pending(), name="session-flush")
+
+    async def _flush_pending(self) -> None:
+        while self._pending_users or self._pending_conversations:
+            users, self._pending_users = self._pending_users, {}
+            conversations, self._pending_conversations = self._pending_conversations, {}
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(self.write_batch, users, conversations)
+            except sqlite3.Error as exc:
+                # Devolve o lote; o que chegou durante a tentativa é mais novo e prevalece
+                self._pending_users = {**users, **self._pending_users}
+                self._pending_conversations = {**conversations, **self._pending_conversations}
+                metrics.incr("sessions.flush_errors")
+                logger.warning("Falha ao gravar sessões: %s", exc, extra={"event": "session_flush_failed"})
+                return
+            metrics.observe("sessions.flush_seconds", time.perf_counter() - started)
+            metrics.observe("sessions.flush_batch", len(users) + len(conversations))
+
+    # --- BasePersistence ---
+
+    async def get_user_data(self) -> Dict[int, Dict[str, Any]]:
+        started = time.perf_counter()
+        data = await asyncio.to_thread(self.load_user_data)
+        self._known_users.update(data)
+        elapsed = time.perf_counter() - started
+        metrics.observe("sessions.load_seconds", elapsed)
+        logger.info("%d sessões restauradas em %.2fs", len(data), elapsed, extra={"event": "sessions_loaded"})
+        return data
+
+    async def get_chat_data(self) -> Dict[int, Any]:
+        return {}
+
+    async def get_bot_data(self) -> Dict[Any, Any]:
+        return {}
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def get_conversations(self, name: str) -> Dict[tuple, object]:
+        return await asyncio.to_thread(self.load_conversations, name)
+
+    async def update_conversation(self, name: str, key: tuple, new_state: Optional[object]) -> None:
+        self._pending_conversations[(name, json.dumps(list(key)))] = new_state
+        self._schedule_flush()
+
+    async def update_user_data(self, user_id: int, data: Dict[str, Any]) -> None:
+        self._known_users.add(user_id)
+        self._pending_users[user_id] = data
+        self._schedule_flush()
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._pending_users[user_id] = None
+        self._schedule_flush()
+
+    async def update_chat_data(self, chat_id: int, data: Any) -> None:
+        pass
+
+    async def update_bot_data(self, data: Any) -> None:
+        pass
+
+    async def update_callback_data(self, data: Any) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        pass
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict[str, Any]) -> None:
+        # Sessão que ficou fora do limite da carga inicial: busca no primeiro update do aluno
+        if user_id in self._known_users:
+            return
+        self._known_users.add(user_id)
+        if user_data:
+            return
+        data = await asyncio.to_thread(self.load_session, user_id)
+        if data is not None:
+            user_data.update(data)
+            metrics.incr("sessions.lazy_loaded")
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Any) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: Any) -> None:
+        pass
+
+    async def flush(self) -> None:
+        if self._flush_task is not None:
+            await self._flush_task
+        await self._flush_pending()
+        self.close()
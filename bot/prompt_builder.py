@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+
+from . import metrics
+from .instruments import gad7_bucket, gad7_score, phq9_bucket, phq9_score
+from .ratelimit import estimate_tokens
+from .safety import has_crisis_terms
+
+logger = logging.getLogger(__name__)
+
+# Orçamento de tokens da parte variável de cada prompt (a instrução de sistema fica de fora)
+INPUT_TOKEN_BUDGETS: Dict[str, int] = {
+    "classify": 600,
+    "classify_batch": 6000,
+    "triage": 900,
+    "combined": 1000,
+    "report": 900,
+}
+
+# Dados que o modelo não usa: cabeçalho do relatório é montado localmente e contato/idade não entram na análise
+PII_FIELDS = frozenset({"nome", "matricula", "telefone", "idade"})
+
+MAX_TEXT_CHARS = 500
+HISTORY_ITEMS = 6
+
+
+def compact_json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def strip_pii(dados: Mapping[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in dados.items() if key not in PII_FIELDS and value not in (None, "")}
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    text = " ".join((text or "").split())
+    if len(text) <= max_chars:
+        return text
+    return text[: max(0, max_chars - 1)].rstrip() + "…"
+
+
+def fit_texts(texts: Sequence[str], budget_tokens: int, max_chars: int = MAX_TEXT_CHARS) -> List[str]:
+    """Mantém os relatos que cabem no orçamento: primeiro os com termos de risco, depois os mais recentes.
+
+    A ordem cronológica original é preservada na saída.
+    """
+    items = [(idx, _truncate(text, max_chars)) for idx, text in enumerate(texts) if text and text.strip()]
+    by_priority = sorted(items, key=lambda item: (not has_crisis_terms(item[1]), -item[0]))
+    kept: List[Tuple[int, str]] = []
+    remaining = budget_tokens
+    for idx, text in by_priority:
+        cost = estimate_tokens(text) + 2
+        if cost > remaining:
+            # Corta o relato para caber no que sobrou, se ainda houver espaço útil
+            if remaining > 20:
+                kept.append((idx, _truncate(text, remaining * 4 - 8)))
+            break
+        kept.append((idx, text))
+        remaining -= cost
+    return [text for _idx, text in sorted(kept)]
+
+
+def _answered_items(answers: Sequence[int], prefix: str = "Q") -> Dict[str, int]:
+    return {f"{prefix}{idx + 1}": score for idx, score in enumerate(answers) if score > 0}
+
+
+def _finish(call_type: str, previous: str, prompt: str) -> str:
+    """Registra o tamanho do prompt e a economia em relação ao formato usado antes deste módulo."""
+    before = estimate_tokens(previous)
+    after = estimate_tokens(prompt)
+    budget = INPUT_TOKEN_BUDGETS.get(call_type)
+    metrics.observe(f"llm.{call_type}.prompt_tokens", after)
+    metrics.incr(f"llm.{call_type}.prompt_tokens_saved", max(0, before - after))
+    logger.debug(
+        "prompt %s: ~%d -> ~%d tokens",
+        call_type,
+        before,
+        after,
+        extra={"event": "prompt_tokens", "call_type": call_type, "tokens_before": before, "tokens_after": after, "budget": budget},
+    )
+    if budget is not None and after > budget:
+        metrics.incr(f"llm.{call_type}.prompt_over_budget")
+    return prompt
+
+
+# --- Formato anterior dos prompts: só serve de base para medir a economia ---
+
+
+def _previous_classify(message: str, history: Sequence[str]) -> str:
+    return f"Histórico recente: {list(history)}\nMensagem atual: {message}\nResponda apenas com o JSON especificado."
+
+
+def _previous_classify_batch(items: Sequence[Tuple[str, Sequence[str]]]) -> str:
+    conversas = [{"id": idx, "historico": list(history), "mensagem": message} for idx, (message, history) in enumerate(items)]
+    return (
+        f"CONVERSAS (JSON):\n{json.dumps(conversas, ensure_ascii=False)}\n\n"
+        "Responda apenas com o JSON especificado, um resultado por id."
+    )
+
+
+def _previous_triage_block(
+    dados_pessoais: Mapping[str, Any],
+    phq9: Sequence[int],
+    gad7: Sequence[int],
+    texto_livre: Sequence[str],
+) -> str:
+    phq9_total = phq9_score(phq9) if phq9 else 0
+    gad7_total = gad7_score(gad7) if gad7 else 0
+    q9_positive = len(phq9) >= 9 and phq9[8] >= 1
+    phq9_high = ", ".join(f"Q{i + 1}({s})" for i, s in enumerate(phq9) if s >= 2) or "Nenhum"
+    gad7_high = ", ".join(f"Q{i + 1}({s})" for i, s in enumerate(gad7) if s >= 2) or "Nenhum"
+    relatos = "\n".join(f"  - {texto}" for texto in list(texto_livre)[-HISTORY_ITEMS:] if texto.strip())
+    return (
+        f"DADOS PESSOAIS: {dict(dados_pessoais)}\n\n"
+        f"PHQ-9 (Depressão):\n"
+        f"  - Respostas: {list(phq9)}\n"
+        f"  - Score total: {phq9_total}/27 ({phq9_bucket(phq9_total)})\n"
+        f"  - Itens com pontuação ≥2: {phq9_high}\n"
+        f"  - ⚠️ Item 9 (pensamentos de morte/autolesão): {'POSITIVO (≥1) - RISCO CRÍTICO' if q9_positive else 'Negativo'}\n\n"
+        f"GAD-7 (Ansiedade):\n"
+        f"  - Respostas: {list(gad7)}\n"
+        f"  - Score total: {gad7_total}/21 ({gad7_bucket(gad7_total)})\n"
+        f"  - Itens com pontuação ≥2: {gad7_high}\n\n"
+        f"RELATOS LIVRES (últimas 6 mensagens):\n{relatos}\n\n"
+    )
+
+
+_PREVIOUS_REPORT_KEYS = (
+    "phq9_score", "phq9_classificacao", "gad7_score", "gad7_classificacao", "classificacao_geral",
+    "phq9_respostas", "gad7_respostas", "item_mais_preocupante", "item9_positive", "relatos_livres", "triage",
+)
+
+
+def _previous_report(contexto: Mapping[str, Any]) -> str:
+    data = {key: contexto[key] for key in _PREVIOUS_REPORT_KEYS if key in contexto}
+    return (
+        f"DADOS DA TRIAGEM (JSON):\n{json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+        "Escreva apenas as seções 2 e 3 no formato especificado, baseando-se somente nos dados acima."
+    )
+
+
+def build_classify_prompt(message: str, history: Sequence[str]) -> str:
+    budget = INPUT_TOKEN_BUDGETS["classify"]
+    mensagem = _truncate(message, budget * 2)
+    historico = fit_texts(list(history)[-HISTORY_ITEMS:], budget - estimate_tokens(mensagem) - 30)
+    prompt = (
+        f"Histórico recente: {compact_json(historico)}\n"
+        f"Mensagem atual: {mensagem}\n"
+        "Responda apenas com o JSON especificado."
+    )
+    return _finish("classify", _previous_classify(message, history), prompt)
+
+
+def build_classify_batch_prompt(items: Sequence[Tuple[str, Sequence[str]]]) -> str:
+    per_item = max(100, INPUT_TOKEN_BUDGETS["classify_batch"] // max(1, len(items)))
+    conversas = []
+    for idx, (message, history) in enumerate(items):
+        mensagem = _truncate(message, per_item * 2)
+        historico = fit_texts(list(history)[-HISTORY_ITEMS:], per_item - estimate_tokens(mensagem) - 10)
+        conversas.append({"id": idx, "historico": historico, "mensagem": mensagem})
+    prompt = (
+        f"CONVERSAS (JSON):\n{compact_json(conversas)}\n\n"
+        "Responda apenas com o JSON especificado, um resultado por id."
+    )
+    return _finish("classify_batch", _previous_classify_batch(items), prompt)
+
+
+def _triage_block(
+    call_type: str,
+    dados_pessoais: Mapping[str, Any],
+    phq9: Sequence[int],
+    gad7: Sequence[int],
+    texto_livre: Sequence[str],
+    extra_tokens: int = 0,
+) -> str:
+    phq9_total = phq9_score(phq9) if phq9 else 0
+    gad7_total = gad7_score(gad7) if gad7 else 0
+    q9_positive = len(phq9) >= 9 and phq9[8] >= 1
+    dados = strip_pii(dados_pessoais)
+    fixed = (
+        f"DADOS: {compact_json(dados)}\n"
+        f"PHQ-9 (0-3 por item): {compact_json(list(phq9))} total {phq9_total}/27 ({phq9_bucket(phq9_total)}); "
+        f"itens ≥2: {', '.join(f'Q{i + 1}({s})' for i, s in enumerate(phq9) if s >= 2) or 'nenhum'}; "
+        f"item 9 (morte/autolesão): {'POSITIVO - RISCO CRÍTICO' if q9_positive else 'negativo'}\n"
+        f"GAD-7 (0-3 por item): {compact_json(list(gad7))} total {gad7_total}/21 ({gad7_bucket(gad7_total)}); "
+        f"itens ≥2: {', '.join(f'Q{i + 1}({s})' for i, s in enumerate(gad7) if s >= 2) or 'nenhum'}\n"
+    )
+    budget = INPUT_TOKEN_BUDGETS[call_type] - estimate_tokens(fixed) - extra_tokens - 40
+    relatos = fit_texts(list(texto_livre)[-HISTORY_ITEMS:], budget)
+    return f"{fixed}RELATOS LIVRES: {compact_json(relatos)}\n"
+
+
+def build_triage_prompt(
+    dados_pessoais: Mapping[str, Any],
+    phq9: Sequence[int],
+    gad7: Sequence[int],
+    texto_livre: Sequence[str],
+) -> str:
+    prompt = (
+        f"{_triage_block('triage', dados_pessoais, phq9, gad7, texto_livre)}\n"
+        "Responda apenas com o JSON especificado, sendo preciso e baseado nos dados fornecidos."
+    )
+    previous = (
+        f"{_previous_triage_block(dados_pessoais, phq9, gad7, texto_livre)}"
+        "Responda apenas com o JSON especificado, sendo preciso e baseado nos dados fornecidos."
+    )
+    return _finish("triage", previous, prompt)
+
+
+def _report_data(contexto: Mapping[str, Any]) -> Dict[str, Any]:
+    # Só o que as seções 2 e 3 usam; respostas viram apenas os itens pontuados e a triagem perde listas vazias
+    data: Dict[str, Any] = {
+        key: contexto[key]
+        for key in ("phq9_score", "phq9_classificacao", "gad7_score", "gad7_classificacao", "classificacao_geral", "item_mais_preocupante")
+        if contexto.get(key) not in (None, "")
+    }
+    if contexto.get("phq9_respostas"):
+        data["phq9_itens"] = _answered_items(contexto["phq9_respostas"])
+    if contexto.get("gad7_respostas"):
+        data["gad7_itens"] = _answered_items(contexto["gad7_respostas"])
+    if contexto.get("item9_positive"):
+        data["item9_positive"] = True
+    triage = contexto.get("triage")
+    if isinstance(triage, Mapping):
+        data["triage"] = {key: value for key, value in triage.items() if value not in (None, "", [], {})}
+    return data
+
+
+def build_report_prompt(contexto: Mapping[str, Any]) -> str:
+    data = _report_data(contexto)
+    fixed = compact_json(data)
+    budget = INPUT_TOKEN_BUDGETS["report"] - estimate_tokens(fixed) - 40
+    relatos = list(contexto.get("relatos_livres") or []) + ([contexto["observacao"]] if contexto.get("observacao") else [])
+    data["relatos_livres"] = fit_texts(relatos, budget)
+    prompt = (
+        f"DADOS DA TRIAGEM (JSON):\n{compact_json(data)}\n\n"
+        "Escreva apenas as seções 2 e 3 no formato especificado, baseando-se somente nos dados acima."
+    )
+    return _finish("report", _previous_report(contexto), prompt)
+
+
+def build_combined_prompt(
+    dados_pessoais: Mapping[str, Any],
+    phq9: Sequence[int],
+    gad7: Sequence[int],
+    texto_livre: Sequence[str],
+    contexto: Mapping[str, Any],
+) -> str:
+    extras = {key: contexto[key] for key in ("item_mais_preocupante", "observacao") if contexto.get(key)}
+    extras_text = f"CONTEXTO: {compact_json(extras)}\n" if extras else ""
+    block = _triage_block("combined", dados_pessoais, phq9, gad7, texto_livre, extra_tokens=estimate_tokens(extras_text))
+    prompt = f"{block}{extras_text}\nResponda apenas com o JSON especificado."
+    previous = (
+        f"{_previous_triage_block(dados_pessoais, phq9, gad7, texto_livre)}"
+        f"DADOS DA TRIAGEM (JSON):\n{json.dumps(dict(contexto), ensure_ascii=False, default=str)}\n\n"
+        "Responda apenas com o JSON especificado."
+    )
+    return _finish("combined", previous, prompt)
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+CACHE_REFRESH_MARGIN = dt.timedelta(seconds=60)
+CACHE_RETRY_SECONDS = 600.0
+
+
+class PromptModel:
+    """Modelo de um tipo de chamada com a instrução de sistema fixa.
+
+    O prompt estático vai como ``system_instruction`` (e não concatenado em cada requisição) e,
+    quando habilitado, também como conteúdo em cache no servidor, criado na inicialização e
+    renovado antes de expirar. Se o cache não puder ser criado (por exemplo, prompt abaixo do
+    mínimo de tokens do modelo), as chamadas seguem com a instrução de sistema e uma nova
+    tentativa só acontece após ``CACHE_RETRY_SECONDS``.
+    """
+
+    def __init__(
+        self,
+        genai: Any,
+        call_type: str,
+        model_name: str,
+        system_instruction: str,
+        generation_config: Optional[Dict[str, Any]] = None,
+        *,
+        use_cache: bool = True,
+        cache_ttl_seconds: int = 3600,
+    ) -> None:
+        self._genai = genai
+        self.call_type = call_type
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.generation_config = generation_config or {}
+        self.use_cache = use_cache
+        self.cache_ttl = dt.timedelta(seconds=cache_ttl_seconds)
+        self._base_model = genai.GenerativeModel(
+            model_name,
+            system_instruction=system_instruction,
+            generation_config=self.generation_config,
+        )
+        self._cache: Any = None
+        self._cached_model: Any = None
+        self._refresh_task: asyncio.Task | None = None
+        self._retry_at = 0.0
+
+    def model(self) -> Any:
+        if self.needs_refresh():
+            try:
+                self._start_refresh()
+            except RuntimeError:
+                pass
+        if self._cached_model is not None and not self._expired():
+            return self._cached_model
+        return self._base_model
+
+    def _expired(self, margin: dt.timedelta = dt.timedelta(0)) -> bool:
+        expire_time = getattr(self._cache, "expire_time", None)
+        if expire_time is None:
+            return True
+        if expire_time.tzinfo is None:
+            expire_time = expire_time.replace(tzinfo=dt.timezone.utc)
+        return dt.datetime.now(dt.timezone.utc) >= expire_time - margin
+
+    def _start_refresh(self) -> asyncio.Task:
+        # Uma renovação por vez: duas chamadas a CachedContent.create deixariam um cache órfão no servidor
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.get_running_loop().create_task(self._refresh())
+        return self._refresh_task
+
+    async def refresh(self) -> bool:
+        """Cria ou renova o cache; se já houver uma renovação em andamento, espera por ela."""
+        return await asyncio.shield(self._start_refresh())
+
+    async def _refresh(self) -> bool:
+        try:
+            if self._cache is not None and not self._expired():
+                await asyncio.to_thread(self._cache.update, ttl=self.cache_ttl)
+            else:
+                self._cache = await asyncio.to_thread(
+                    self._genai.caching.CachedContent.create,
+                    model=self.model_name if self.model_name.startswith("models/") else f"models/{self.model_name}",
+                    display_name=f"psicoflow-{self.call_type}",
+                    system_instruction=self.system_instruction,
+                    ttl=self.cache_ttl,
+                )
+                self._cached_model = self._genai.GenerativeModel.from_cached_content(
+                    self._cache,
+                    generation_config=self.generation_config,
+                )
+            metrics.incr(f"llm.{self.call_type}.prompt_cache_refreshes")
+            logger.info(
+                "prompt_cache_ready",
+                extra={"event": "prompt_cache_ready", "call_type": self.call_type, "cache": getattr(self._cache, "name", None)},
+            )
+            return True
+        except Exception as exc:  # pylint: disable=broad-except
+            # Sem cache explícito: segue com system_instruction até a próxima tentativa
+            self._cache = None
+            self._cached_model = None
+            self._retry_at = time.monotonic() + CACHE_RETRY_SECONDS
+            metrics.incr(f"llm.{self.call_type}.prompt_cache_failures")
+            logger.warning("Cache de prompt indisponível para %s: %s", self.call_type, exc)
+            return False
+
+    def needs_refresh(self) -> bool:
+        if not self.use_cache or time.monotonic() < self._retry_at:
+            return False
+        return self._cache is None or self._expired(CACHE_REFRESH_MARGIN)
+
+
+def record_usage(call_type: str, response: Any) -> None:
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    prompt_tokens = int(getattr(usage, "prompt_token_count", 0) or 0)
+    cached_tokens = int(getattr(usage, "cached_content_token_count", 0) or 0)
+    metrics.incr(f"llm.{call_type}.calls")
+    metrics.incr(f"llm.{call_type}.input_tokens", prompt_tokens)
+    metrics.incr(f"llm.{call_type}.cached_input_tokens", cached_tokens)
+    metrics.observe(f"llm.{call_type}.uncached_input_tokens_per_call", prompt_tokens - cached_tokens)
+    logger.debug(
+        "llm_usage",
+        extra={
+            "event": "llm_usage",
+            "call_type": call_type,
+            "input_tokens": prompt_tokens,
+            "cached_input_tokens": cached_tokens,
+        },
+    )
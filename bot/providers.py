@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import re
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, Iterable, List, Mapping, Optional, Protocol, Sequence, Tuple
+
+from .cache import normalize_text
+from .config import Settings
+from .prompt_cache import PromptModel
+from .ratelimit import estimate_tokens
+from .report import NARRATIVE_HEADINGS
+from .safety import has_crisis_terms
+from .triage_rules import GAD7_SIGNALS, MAX_ITEMS, PHQ9_SIGNALS
+
+logger = logging.getLogger(__name__)
+
+# (tipo de chamada, instrução de sistema, generation_config)
+CallSpec = Tuple[str, str, Dict[str, Any]]
+
+
+class GenerativeModel(Protocol):
+    """Interface de modelo usada por bot.llm (a mesma do google.generativeai)."""
+
+    model_name: str
+
+    async def generate_content_async(self, contents: str, **kwargs: Any) -> Any:
+        ...
+
+
+class LLMProvider(Protocol):
+    """Fornece o modelo de cada (tipo de chamada, modelo candidato) para as chamadas JSON e de texto."""
+
+    name: str
+
+    def model(self, call_type: str, model_name: str) -> Optional[GenerativeModel]:
+        ...
+
+    async def warm(self, targets: Iterable[Tuple[str, str]]) -> None:
+        ...
+
+
+class GeminiProvider:
+    name = "gemini"
+
+    def __init__(
+        self,
+        api_key: str,
+        call_types: Sequence[CallSpec],
+        candidates: Mapping[str, Sequence[str]],
+        *,
+        use_cache: bool = True,
+        cache_ttl_seconds: int = 3600,
+    ) -> None:
+        # SDK pesado (grpc/protobuf): só é importado quando o provedor é criado
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        # Um modelo por (tipo de chamada, modelo candidato), cada um com seu prompt estático como instrução de sistema
+        self._models: Dict[Tuple[str, str], PromptModel] = {
+            (call_type, model_name): PromptModel(
+                genai,
+                call_type,
+                model_name,
+                system_instruction,
+                generation_config,
+                use_cache=use_cache,
+                cache_ttl_seconds=cache_ttl_seconds,
+            )
+            for call_type, system_instruction, generation_config in call_types
+            for model_name in candidates.get(call_type, ())
+        }
+
+    def model(self, call_type: str, model_name: str) -> Optional[GenerativeModel]:
+        handle = self._models.get((call_type, model_name))
+        return handle.model() if handle else None
+
+    async def warm(self, targets: Iterable[Tuple[str, str]]) -> None:
+        handles = [self._models[key] for key in targets if key in self._models]
+        await asyncio.gather(*(handle.refresh() for handle in handles if handle.needs_refresh()))
+
+
+# Chamada "pendurada": só termina quando o chamador desiste pelo próprio timeout
+FAKE_TIMEOUT_SECONDS = 3600.0
+
+_EMOTION_KEYWORDS = (
+    ("ansiedade", ("ansios", "nervos", "preocup", "medo", "panico")),
+    ("cansaco", ("cansad", "exaust", "esgotad", "sono", "dormi")),
+    ("raiva", ("raiva", "irritad", "odio", "puto", "puta")),
+    ("tristeza", ("triste", "sozinh", "chor", "vazio", "desanim")),
+    ("alegria", ("feliz", "alegr", "animad", "otimo", "dia bom")),
+)
+_RESPOSTAS = {
+    "tristeza": "Sinto muito que esteja passando por isso. Obrigado por me contar.",
+    "ansiedade": "Parece que a preocupação está pesando. Vamos com calma, um passo de cada vez.",
+    "raiva": "Faz sentido se sentir assim diante disso. Quer me contar mais?",
+    "cansaco": "Imagino o quanto isso cansa. Obrigado por compartilhar.",
+    "alegria": "Que bom ouvir isso! Obrigado por compartilhar.",
+    "neutra": "Obrigado por compartilhar. Estou aqui para te acompanhar passo a passo.",
+}
+
+
+def _digest(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=4).digest(), "big")
+
+
+def fake_classify(message: str) -> Dict[str, Any]:
+    normalized = normalize_text(message)
+    crise = has_crisis_terms(message)
+    emocao = "tristeza" if crise else next(
+        (emotion for emotion, keywords in _EMOTION_KEYWORDS if any(word in normalized for word in keywords)),
+        "neutra",
+    )
+    if crise:
+        intensidade = 9
+    elif emocao == "neutra":
+        intensidade = _digest(normalized) % 3
+    else:
+        intensidade = 3 + _digest(normalized) % 5
+    return {
+        "emocao_principal": emocao,
+        "intensidade": intensidade,
+        "possivel_crise": crise,
+        "resposta_empatica": _RESPOSTAS[emocao],
+    }
+
+
+def _answers(prompt: str, label: str) -> List[int]:
+    match = re.search(rf"{re.escape(label)} \(0-3 por item\): (\[[^\]]*\])", prompt)
+    return json.loads(match.group(1)) if match else []
+
+
+def fake_triage(prompt: str) -> Dict[str, Any]:
+    phq9 = _answers(prompt, "PHQ-9")
+    gad7 = _answers(prompt, "GAD-7")
+    relatos = re.search(r"RELATOS LIVRES: (\[.*\])", prompt)
+    risco = "POSITIVO" in prompt or bool(relatos and has_crisis_terms(relatos.group(1)))
+    if risco or sum(phq9) >= 20 or sum(gad7) >= 15:
+        urgencia = "alta"
+    elif sum(phq9) >= 10 or sum(gad7) >= 10:
+        urgencia = "media"
+    else:
+        urgencia = "baixa"
+    return {
+        "nivel_urgencia": urgencia,
+        "fatores_protecao": ["busca de ajuda"],
+        "impacto_funcional": ["dificuldade de concentração nos estudos"] if len(phq9) > 6 and phq9[6] >= 2 else [],
+        "sinais_depressao": [PHQ9_SIGNALS[i] for i, score in enumerate(phq9[:9]) if score >= 2][:MAX_ITEMS],
+        "sinais_ansiedade": [GAD7_SIGNALS[i] for i, score in enumerate(gad7[:7]) if score >= 2][:MAX_ITEMS],
+    }
+
+
+def fake_narrative(prompt: str) -> str:
+    sinais = re.findall(r"Q\d+\(\d\)", prompt)
+    destaque = "o item 9 (pensamentos de morte ou autolesão)" if "POSITIVO" in prompt or '"item9_positive":true' in prompt else "os itens com maior pontuação"
+    return (
+        f"{NARRATIVE_HEADINGS[0]}\n"
+        "Sintomas predominantes: o estudante relata sintomas compatíveis com as respostas dos questionários, "
+        f"com {len(sinais) or 'poucos'} itens pontuados em nível moderado ou acima.\n"
+        "Impacto funcional: há indicação de impacto nas atividades acadêmicas e na rotina.\n\n"
+        f"{NARRATIVE_HEADINGS[1]}\n"
+        f"Merece atenção {destaque}, a ser explorado no acolhimento."
+    )
+
+
+def fake_output(call_type: str, prompt: str) -> str:
+    """Resposta determinística para o prompt montado em bot.prompt_builder."""
+    if call_type == "classify_batch":
+        conversas = json.loads(prompt.split("\n", 1)[1].rsplit("\n\nResponda", 1)[0])
+        payload: Any = {"resultados": [{"id": item["id"], **fake_classify(item["mensagem"])} for item in conversas]}
+    elif call_type == "classify":
+        match = re.search(r"^Mensagem atual: (.*)$", prompt, re.MULTILINE)
+        payload = fake_classify(match.group(1) if match else prompt)
+    elif call_type == "triage":
+        payload = fake_triage(prompt)
+    elif call_type == "combined":
+        payload = {"triage": fake_triage(prompt), "relatorio": fake_narrative(prompt)}
+    else:
+        return fake_narrative(prompt)
+    return json.dumps(payload, ensure_ascii=False)
+
+
+class _FakeStream:
+    def __init__(self, text: str, latency: float, usage: Any) -> None:
+        self._parts = re.findall(r"\S+\s*", text) or [text]
+        self._latency = latency
+        self._usage = usage
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        # Primeiro fragmento após ~30% da latência; o restante chega em ~8 pedaços
+        await asyncio.sleep(self._latency * 0.3)
+        step = max(1, math.ceil(len(self._parts) / 8))
+        chunks = ["".join(self._parts[i : i + step]) for i in range(0, len(self._parts), step)]
+        for idx, chunk in enumerate(chunks):
+            last = idx == len(chunks) - 1
+            yield SimpleNamespace(text=chunk, usage_metadata=self._usage if last else None)
+            if not last:
+                await asyncio.sleep(self._latency * 0.7 / max(1, len(chunks) - 1))
+
+
+class FakeModel:
+    def __init__(self, provider: "FakeProvider", call_type: str, model_name: str) -> None:
+        self._provider = provider
+        self.call_type = call_type
+        self.model_name = model_name if model_name.startswith("models/") else f"models/{model_name}"
+
+    async def generate_content_async(self, contents: str, *, stream: bool = False, **kwargs: Any) -> Any:
+        latency, outcome = self._provider.sample()
+        if outcome == "timeout":
+            await asyncio.sleep(FAKE_TIMEOUT_SECONDS)
+        prompt = str(contents)
+        text = fake_output(self.call_type, prompt)
+        usage = SimpleNamespace(
+            prompt_token_count=estimate_tokens(prompt),
+            candidates_token_count=estimate_tokens(text),
+            cached_content_token_count=0,
+        )
+        if stream and outcome == "ok":
+            return _FakeStream(text, latency, usage)
+        await asyncio.sleep(latency)
+        if outcome == "error":
+            from google.api_core import exceptions as google_exceptions
+
+            raise google_exceptions.ServiceUnavailable("falha simulada")
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+
+class FakeProvider:
+    """Provedor em processo para desenvolvimento e testes de carga sem rede.
+
+    As respostas dependem só do prompt; a latência segue uma log-normal com mediana
+    ``latency_ms`` e, com a mesma ``seed``, falhas e tempos se repetem entre execuções.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        *,
+        latency_ms: float = 400.0,
+        latency_sigma: float = 0.4,
+        error_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._models: Dict[Tuple[str, str], FakeModel] = {}
+
+    def model(self, call_type: str, model_name: str) -> Optional[GenerativeModel]:
+        key = (call_type, model_name)
+        model = self._models.get(key)
+        if model is None:
+            model = self._models[key] = FakeModel(self, call_type, model_name)
+        return model
+
+    async def warm(self, targets: Iterable[Tuple[str, str]]) -> None:
+        return None
+
+    def sample(self) -> Tuple[float, str]:
+        """Sorteia latência (segundos) e desfecho ("ok", "error" ou "timeout") de uma chamada."""
+        self.calls += 1
+        latency = 0.0
+        if self.latency_ms > 0:
+            latency = self._rng.lognormvariate(math.log(self.latency_ms / 1000), self.latency_sigma)
+        draw = self._rng.random()
+        if draw < self.timeout_rate:
+            return latency, "timeout"
+        if draw < self.timeout_rate + self.error_rate:
+            return latency, "error"
+        return latency, "ok"
+
+
+def create_provider(
+    settings: Settings,
+    call_types: Sequence[CallSpec],
+    candidates: Mapping[str, Sequence[str]],
+) -> Optional[LLMProvider]:
+    if settings.llm_provider == "fake":
+        logger.warning("Usando provedor LLM simulado (LLM_PROVIDER=fake); respostas não vêm do Gemini.")
+        return FakeProvider(
+            latency_ms=settings.fake_llm_latency_ms,
+            latency_sigma=settings.fake_llm_latency_sigma,
+            error_rate=settings.fake_llm_error_rate,
+            timeout_rate=settings.fake_llm_timeout_rate,
+            seed=settings.fake_llm_seed,
+        )
+    if not settings.gemini_api_key:
+        logger.warning("Gemini API key ausente; utilizando apenas fallbacks seguros.")
+        return None
+    return GeminiProvider(
+        settings.gemini_api_key,
+        call_types,
+        candidates,
+        use_cache=settings.llm_prompt_cache,
+        cache_ttl_seconds=settings.llm_prompt_cache_ttl,
+    )
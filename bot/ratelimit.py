@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import math
+import random
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from . import metrics
+
+PRIORITY_CRISIS = 0
+PRIORITY_NORMAL = 1
+
+# Intervalo de reavaliação dos pedidos enfileirados; só há espera quando a cota está esgotada
+POLL_INTERVAL = 0.05
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa grosseira (~4 caracteres por token), suficiente para reservar cota."""
+    return max(1, math.ceil(len(text or "") / 4))
+
+
+def retry_delay(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+    """Backoff exponencial com jitter completo."""
+    return random.uniform(0, min(cap, base * (2**attempt)))
+
+
+class RateLimiter:
+    """Token bucket duplo (requisições e tokens por minuto) com fila por prioridade."""
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._clock = clock
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = clock()
+        self._waiters: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests_per_minute > 0 or self.tokens_per_minute > 0
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = max(0.0, now - self._updated)
+        self._updated = now
+        if self.requests_per_minute > 0:
+            self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute > 0:
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def _wait_time(self, tokens: int) -> float:
+        wait = 0.0
+        if self.requests_per_minute > 0 and self._requests < 1:
+            wait = max(wait, (1 - self._requests) * 60 / self.requests_per_minute)
+        if self.tokens_per_minute > 0 and self._tokens < tokens:
+            wait = max(wait, (tokens - self._tokens) * 60 / self.tokens_per_minute)
+        return wait
+
+    def try_acquire(self, tokens: int, entry: Optional[Tuple[int, int]] = None) -> float:
+        """Consome a cota se houver; senão retorna quantos segundos faltam. Respeita a ordem da fila."""
+        if not self.enabled:
+            return 0.0
+        if self.tokens_per_minute > 0:
+            tokens = min(tokens, self.tokens_per_minute)
+        with self._lock:
+            if self._waiters and self._waiters[0] != entry:
+                return POLL_INTERVAL
+            self._refill()
+            wait = self._wait_time(tokens)
+            if wait > 0:
+                return wait
+            if self.requests_per_minute > 0:
+                self._requests -= 1
+            if self.tokens_per_minute > 0:
+                self._tokens -= tokens
+            return 0.0
+
+    async def acquire(self, tokens: int, priority: int = PRIORITY_NORMAL, timeout: Optional[float] = None) -> None:
+        if self.try_acquire(tokens) == 0.0:
+            return
+        entry = (priority, next(self._seq))
+        with self._lock:
+            heapq.heappush(self._waiters, entry)
+        metrics.incr("llm.ratelimit.queued")
+        started = self._clock()
+        try:
+            while True:
+                wait = self.try_acquire(tokens, entry)
+                if wait == 0.0:
+                    break
+                if timeout is not None:
+                    remaining = timeout - (self._clock() - started)
+                    if remaining <= 0:
+                        metrics.incr("llm.ratelimit.timeouts")
+                        raise asyncio.TimeoutError()
+                    wait = min(wait, remaining)
+                await asyncio.sleep(min(wait, POLL_INTERVAL))
+        finally:
+            with self._lock:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+            metrics.observe("llm.ratelimit.wait_seconds", self._clock() - started)
@@ -10,6 +10,7 @@ from .instruments import (
     phq9_bucket,
     phq9_score,
 )
+from .safety import any_crisis
 
 
 def build_deterministic_summary(
@@ -102,8 +103,9 @@ def build_deterministic_summary(
 
 
 def compose_report_text(deterministic_summary: str, llm_text: str) -> str:
-    # Se o relatório da IA foi gerado com sucesso e está completo, usa ele
-    if llm_text and llm_text.strip() and len(llm_text.strip()) > 100:
+    # gen_report_text/triage_and_report já devolvem o relatório completo mesmo sem resposta do modelo
+    # (seções 2 e 3 montadas localmente); texto vazio só sobra quando a geração levantou exceção
+    if llm_text and llm_text.strip():
         return llm_text.strip()
     
     # Caso contrário, usa o resumo determinístico como fallback
@@ -113,3 +115,128 @@ def compose_report_text(deterministic_summary: str, llm_text: str) -> str:
     return deterministic
 
 
+
+
+# Partes fixas do relatório técnico (mesmo texto do RELATORIO_PROMPT); o modelo escreve só as seções 2 e 3.
+REPORT_TITLE = "📌 RELATÓRIO DE TRIAGEM — PSICOFLOW"
+QUANTITATIVE_HEADING = "1. Resultados Quantitativos"
+NARRATIVE_HEADINGS = ("2. Análise Integrada dos Sintomas (IA)", "3. Item mais sensível da triagem")
+RECOMMENDATIONS_HEADING = "5. Recomendações para o Serviço de Psicologia"
+RECOMMENDATIONS_ALTA = [
+    "✔ Agendar acolhimento individual em até 24–48 horas úteis, considerando o nível de urgência elevado e a presença de "
+    "indicadores de sofrimento emocional significativo.",
+    "✔ Priorizar escuta qualificada na primeira sessão, com foco em estabilização emocional e avaliação mais aprofundada de risco.",
+    "✔ Investigar fatores recentes de estresse, como perdas, demandas acadêmicas, sobrecarga ou eventos críticos mencionados durante a triagem.",
+    "✔ Verificar rede de apoio (família, amigos, professores), avaliando se o estudante tem suporte adequado para o momento.",
+    "✔ Realizar monitoramento contínuo, especialmente nas duas semanas seguintes, para observar evolução ou agravamento dos sintomas.",
+    "✔ Encaminhar para atendimento médico/psiquiátrico, caso sintomas graves persistam ou se identifiquem sinais mais intensos de risco.",
+    "✔ Registrar o caso no prontuário interno para acompanhamento e garantir continuidade dentro da política institucional de apoio psicológico.",
+]
+RECOMMENDATIONS_ROTINA = [
+    "✔ Agendar acolhimento em até 7-14 dias úteis",
+    "✔ Realizar acompanhamento breve (3–4 sessões)",
+    "✔ Monitorar sintomas por 4 semanas",
+    "✔ Trabalhar manejo emocional e rotina",
+    "✔ Verificar sobrecarga acadêmica",
+]
+DISCLAIMER = [
+    "6. Observação Importante",
+    "Este relatório é gerado por IA como apoio à triagem.",
+    "Não substitui avaliação ou diagnóstico clínico.",
+    "A interpretação final é exclusiva do profissional de saúde mental.",
+]
+NO_RISK_TEXT = "Nenhum indicador de risco agudo identificado no momento."
+NARRATIVE_MAX_CHARS = 2000
+
+
+def risk_indicators(contexto: Mapping[str, object]) -> list[str]:
+    """Indicadores que tornam a urgência alta; a lista vazia é o único caso sem risco agudo."""
+    triage = contexto.get("triage") or {}
+    nivel = str(triage.get("nivel_urgencia", "")).strip().lower() if isinstance(triage, Mapping) else ""
+    relatos = [str(text) for text in contexto.get("relatos_livres") or []] + [str(contexto.get("observacao") or "")]
+    indicators = []
+    if contexto.get("item9_positive"):
+        indicators.append("sinais de ideação (PHQ-9 Q9 positivo)")
+    if any_crisis(relatos):
+        indicators.append("relato com conteúdo de risco nas mensagens do aluno")
+    if int(contexto.get("phq9_score") or 0) >= 20:
+        indicators.append(f"sintomas depressivos graves (PHQ-9 {contexto.get('phq9_score')} ≥ 20)")
+    if int(contexto.get("gad7_score") or 0) >= 15:
+        indicators.append(f"ansiedade grave (GAD-7 {contexto.get('gad7_score')} ≥ 15)")
+    if nivel == "alta" and not indicators:
+        indicators.append("nível de urgência alto na análise da triagem")
+    return indicators
+
+
+def is_high_urgency(contexto: Mapping[str, object]) -> bool:
+    return bool(risk_indicators(contexto))
+
+
+def render_report_header(contexto: Mapping[str, object]) -> str:
+    return "\n".join(
+        [
+            REPORT_TITLE,
+            f"Aluno: {contexto.get('nome', 'Participante')}",
+            f"Matrícula: {contexto.get('matricula', 'Não informada')}",
+            f"Data: {contexto.get('data', '')}",
+            f"Disponibilidade para atendimento: {contexto.get('disponibilidade') or 'Não informada'}",
+            QUANTITATIVE_HEADING,
+            f"PHQ-9: {contexto.get('phq9_score', 0)} pontos — {contexto.get('phq9_classificacao', '')}",
+            f"GAD-7: {contexto.get('gad7_score', 0)} pontos — {contexto.get('gad7_classificacao', '')}",
+            f"Classificação geral: {contexto.get('classificacao_geral', '')}",
+        ]
+    )
+
+
+def render_report_footer(contexto: Mapping[str, object]) -> str:
+    recommendations = RECOMMENDATIONS_ALTA if is_high_urgency(contexto) else RECOMMENDATIONS_ROTINA
+    return "\n".join([RECOMMENDATIONS_HEADING, *recommendations, *DISCLAIMER])
+
+
+def clean_narrative(text: str) -> str:
+    """Mantém só as seções 2 e 3 vindas do modelo, com o título da seção 2 garantido."""
+    narrative = (text or "").strip()
+    for marker in (REPORT_TITLE, "5. Recomendações", "6. Observação Importante"):
+        if marker in narrative and not narrative.startswith(marker):
+            narrative = narrative.split(marker, 1)[0].rstrip()
+    start = narrative.find("2. Análise Integrada")
+    if start > 0:
+        narrative = narrative[start:]
+    if not narrative:
+        return ""
+    if not narrative.startswith("2. Análise Integrada"):
+        narrative = f"{NARRATIVE_HEADINGS[0]}\n{narrative}"
+    if len(narrative) > NARRATIVE_MAX_CHARS:
+        narrative = narrative[: NARRATIVE_MAX_CHARS - 3].rstrip() + "..."
+    return narrative
+
+
+def fallback_narrative(contexto: Mapping[str, object]) -> str:
+    """Seções 2 e 3 montadas a partir da análise de triagem quando o modelo não responde."""
+    triage = contexto.get("triage") or {}
+    if not isinstance(triage, Mapping):
+        triage = {}
+
+    def _items(key: str) -> list[str]:
+        return [str(item).strip() for item in triage.get(key, []) or [] if str(item).strip()]
+
+    sintomas = _items("sinais_depressao") + _items("sinais_ansiedade")
+    impacto = _items("impacto_funcional")
+    protecao = _items("fatores_protecao")
+    lines = [NARRATIVE_HEADINGS[0], "Sintomas predominantes"]
+    lines += [f"- {item}" for item in sintomas[:6]] or ["- Sem sintomas predominantes identificados nos instrumentos."]
+    lines.append("Impacto funcional")
+    lines += [f"- {item}" for item in impacto[:4]] or ["- Sem impacto funcional relatado."]
+    lines.append("Indicadores de risco")
+    lines += [f"- {item}" for item in risk_indicators(contexto)] or [NO_RISK_TEXT]
+    lines.append("Fatores de proteção")
+    # Sem a análise do modelo não há base para afirmar fatores de proteção
+    lines += [f"- {item}" for item in protecao[:4]] or ["- Não identificados"]
+    lines.append(NARRATIVE_HEADINGS[1])
+    lines.append(str(contexto.get("item_mais_preocupante") or "Nenhum item pontuou acima de 0."))
+    return "\n".join(lines)
+
+
+def render_report(contexto: Mapping[str, object], narrative: str) -> str:
+    body = clean_narrative(narrative) or fallback_narrative(contexto)
+    return "\n".join([render_report_header(contexto), body, render_report_footer(contexto)])
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import logging
+import random
+import statistics
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def parse_model_list(value: str, default: str) -> List[str]:
+    models = [item.strip() for item in (value or "").split(",") if item.strip()]
+    return models or [default]
+
+
+def normalize_model_name(name: str) -> str:
+    return name[len("models/"):] if name.startswith("models/") else name
+
+
+class ModelRouter:
+    """Escolhe, entre os modelos aceitos para um tipo de chamada, o mais rápido que está saudável.
+
+    A ordem da lista é a preferência de qualidade: sem dados suficientes fica o primeiro, e
+    candidatos ainda não medidos recebem uma pequena fração do tráfego para serem avaliados.
+    """
+
+    def __init__(
+        self,
+        call_type: str,
+        candidates: Sequence[str],
+        *,
+        window: int = 50,
+        min_samples: int = 5,
+        max_error_rate: float = 0.3,
+        explore_rate: float = 0.05,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        if not candidates:
+            raise ValueError("ModelRouter precisa de ao menos um modelo candidato.")
+        self.call_type = call_type
+        self.candidates = list(candidates)
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.explore_rate = explore_rate
+        self._rng = rng
+        self._samples: Dict[str, Deque[Tuple[float, bool]]] = {name: deque(maxlen=window) for name in self.candidates}
+        self._current: Optional[str] = None
+        self._probe_index = 0
+        self._lock = threading.Lock()
+
+    def record(self, model_name: str, seconds: float, ok: bool) -> None:
+        name = normalize_model_name(model_name)
+        if name not in self._samples:
+            return
+        with self._lock:
+            self._samples[name].append((seconds, ok))
+        metrics.observe_histogram(f"llm.model.{name}.{self.call_type}.latency_seconds", seconds)
+        if not ok:
+            metrics.incr(f"llm.model.{name}.{self.call_type}.errors")
+
+    def stats(self, model_name: str) -> Tuple[int, Optional[float], float]:
+        """(amostras, mediana de latência das chamadas bem-sucedidas, taxa de erro)."""
+        with self._lock:
+            samples = list(self._samples[model_name])
+        if not samples:
+            return 0, None, 0.0
+        ok_latencies = [seconds for seconds, ok in samples if ok]
+        error_rate = 1 - len(ok_latencies) / len(samples)
+        return len(samples), statistics.median(ok_latencies) if ok_latencies else None, error_rate
+
+    def choose(self) -> str:
+        scored: List[Tuple[float, int, str]] = []
+        unmeasured: List[str] = []
+        unhealthy: List[str] = []
+        for order, name in enumerate(self.candidates):
+            count, median, error_rate = self.stats(name)
+            if count < self.min_samples:
+                unmeasured.append(name)
+            elif error_rate <= self.max_error_rate and median is not None:
+                scored.append((median, order, name))
+            else:
+                unhealthy.append(name)
+
+        # Modelos sem dados ou fora do ar continuam recebendo uma fração pequena para reavaliação
+        probes = unmeasured + unhealthy
+        if self.candidates[0] in unmeasured:
+            choice = self.candidates[0]
+        elif probes and self._rng() < self.explore_rate:
+            choice = probes[self._probe_index % len(probes)]
+            self._probe_index += 1
+        elif scored:
+            choice = min(scored)[2]
+        else:
+            choice = unmeasured[0] if unmeasured else self.candidates[0]
+
+        metrics.incr(f"llm.route.{self.call_type}.{choice}")
+        if choice != self._current:
+            previous, self._current = self._current, choice
+            if previous is not None:
+                logger.info(
+                    "roteamento %s: %s -> %s",
+                    self.call_type,
+                    previous,
+                    choice,
+                    extra={
+                        "event": "model_route",
+                        "call_type": self.call_type,
+                        "from_model": previous,
+                        "to_model": choice,
+                        "candidates": {name: self.stats(name) for name in self.candidates},
+                    },
+                )
+        return choice
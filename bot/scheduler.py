@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Hashable, Optional
+
+from . import metrics
+from .ratelimit import PRIORITY_CRISIS, PRIORITY_NORMAL
+
+# Dono das chamadas ao LLM feitas no contexto atual (o aluno da atualização em tratamento)
+llm_user: contextvars.ContextVar[Hashable] = contextvars.ContextVar("llm_user", default="anon")
+
+
+class LLMOverloaded(RuntimeError):
+    """Fila do LLM cheia: a chamada é recusada na hora em vez de esperar indefinidamente."""
+
+
+class FairScheduler:
+    """Limita as chamadas simultâneas ao LLM e reparte a fila entre usuários em rodízio.
+
+    Cada usuário tem sua própria fila; a vaga liberada vai para o próximo usuário da
+    vez (pedidos de crise antes de todos), então novas tentativas de um aluno não
+    passam na frente dos pedidos já enfileirados pelos outros.
+    """
+
+    def __init__(self, name: str, concurrency: int, max_queue: int) -> None:
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self._active = 0
+        self._queued = 0
+        self._queues: Dict[Hashable, Deque["asyncio.Future[None]"]] = {}
+        self._turns: Deque[Hashable] = deque()
+        self._crisis: Deque["asyncio.Future[None]"] = deque()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    def _set_depth(self, delta: int) -> None:
+        self._queued += delta
+        metrics.set_gauge(f"{self.name}.queue_depth", self._queued)
+
+    async def acquire(self, user: Hashable, priority: int = PRIORITY_NORMAL) -> None:
+        if self._active < self.concurrency and self._queued == 0:
+            self._active += 1
+            metrics.observe(f"{self.name}.wait_seconds", 0.0)
+            return
+        # Pedidos de crise furam a fila; recusá-los por fila cheia tiraria do aluno a resposta mais urgente
+        if self._queued >= self.max_queue and priority != PRIORITY_CRISIS:
+            metrics.incr(f"{self.name}.rejected")
+            raise LLMOverloaded(f"{self._queued} chamadas na fila do LLM")
+
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[None] = loop.create_future()
+        if priority == PRIORITY_CRISIS:
+            self._crisis.append(future)
+        else:
+            queue = self._queues.get(user)
+            if queue is None:
+                queue = self._queues[user] = deque()
+                self._turns.append(user)
+            queue.append(future)
+        self._set_depth(1)
+        started = loop.time()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # A vaga chegou junto com o cancelamento: devolve para o próximo da fila
+                self.release()
+            else:
+                self._discard(user, future)
+            raise
+        finally:
+            metrics.observe(f"{self.name}.wait_seconds", loop.time() - started)
+
+    def release(self) -> None:
+        future = self._next_waiter()
+        if future is None:
+            self._active -= 1
+        else:
+            # A vaga passa direto para o próximo; o número de chamadas ativas não muda
+            future.set_result(None)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, user: Optional[Hashable] = None, priority: int = PRIORITY_NORMAL) -> AsyncIterator[None]:
+        await self.acquire(llm_user.get() if user is None else user, priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _next_waiter(self) -> Optional["asyncio.Future[None]"]:
+        while self._crisis:
+            future = self._crisis.popleft()
+            self._set_depth(-1)
+            if not future.done():
+                return future
+        while self._turns:
+            user = self._turns.popleft()
+            queue = self._queues[user]
+            future = queue.popleft()
+            if queue:
+                self._turns.append(user)
+            else:
+                del self._queues[user]
+            self._set_depth(-1)
+            if not future.done():
+                return future
+        return None
+
+    def _discard(self, user: Hashable, future: "asyncio.Future[None]") -> None:
+        if future in self._crisis:
+            self._crisis.remove(future)
+        else:
+            queue = self._queues.get(user)
+            if queue is None or future not in queue:
+                return
+            queue.remove(future)
+            if not queue:
+                del self._queues[user]
+                self._turns.remove(user)
+        self._set_depth(-1)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Mapping
+
+PERSONAL_FIELDS = [
+    ("nome", "Qual seu nome completo?"),
+    ("idade", "Qual sua idade?"),
+    ("telefone", "Qual seu número de telefone para contato? (ex: 92999999999 ou +5592999999999)"),
+    ("matricula", "Informe sua matrícula."),
+    ("curso", "Qual o seu curso?"),
+    ("periodo", "Qual o período/semestre atual?"),
+]
+
+# Estado de execução, não da triagem: não é copiado nem persistido
+_TRANSIENT_FIELDS = {"triage_task"}
+
+
+@dataclass
+class SessionData:
+    user_id: int
+    personal_data: Dict[str, str] = field(default_factory=dict)
+    phq9_answers: List[int] = field(default_factory=list)
+    phq9_item9_positive: bool = False
+    gad7_answers: List[int] = field(default_factory=list)
+    availability: str = ""
+    observation: str = ""
+    free_text: List[str] = field(default_factory=list)
+    history: List[str] = field(default_factory=list)
+    triage_result: Dict[str, object] = field(default_factory=dict)
+    phq9_started: bool = False
+    triage_active: bool = False
+    triage_task: asyncio.Task | None = field(default=None, repr=False, compare=False)
+
+    def next_personal_field(self) -> tuple[str, str] | None:
+        for key, question in PERSONAL_FIELDS:
+            if key not in self.personal_data:
+                return key, question
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Sem cópia: serve para serializar; quem precisa de cópia usa copy.deepcopy
+        return {f.name: getattr(self, f.name) for f in fields(self) if f.name not in _TRANSIENT_FIELDS}
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "SessionData":
+        # Campos desconhecidos (de versões anteriores ou futuras) são ignorados
+        known = {f.name for f in fields(cls)} - _TRANSIENT_FIELDS
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "SessionData":
+        # O Application copia o user_data antes de persistir; a task em andamento fica de fora
+        return SessionData.from_dict(copy.deepcopy(self.to_dict(), memo))
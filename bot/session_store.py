@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+
+from . import metrics
+from .config import Settings
+from .session import SessionData
+from .states import ConversationState
+
+logger = logging.getLogger(__name__)
+
+
+class VersionConflict(RuntimeError):
+    """Outro processo gravou a chave depois da leitura; a gravação foi recusada."""
+
+
+class SessionStoreError(RuntimeError):
+    """Servidor de sessões indisponível ou resposta inválida."""
+
+
+class VersionedKV(Protocol):
+    async def get(self, key: str, known_version: int = 0) -> Tuple[int, Optional[str]]:
+        """Versão atual e valor; o valor vem None se a versão for `known_version` (ou a chave não existir)."""
+        ...
+
+    async def cas(self, key: str, version: int, value: str) -> int:
+        """Grava se a versão atual ainda for `version`; devolve a nova versão ou levanta VersionConflict."""
+        ...
+
+    async def close(self) -> None: ...
+
+
+class MemoryKV:
+    """Chave-valor versionado em memória: backend de um processo só e base do servidor local."""
+
+    def __init__(self) -> None:
+        self._data: Dict[str, Tuple[int, str]] = {}
+
+    def get_nowait(self, key: str, known_version: int = 0) -> Tuple[int, Optional[str]]:
+        version, value = self._data.get(key, (0, None))
+        return version, None if version == known_version else value
+
+    def cas_nowait(self, key: str, version: int, value: str) -> int:
+        current = self._data.get(key, (0, None))[0]
+        if current != version:
+            raise VersionConflict(f"{key}: versão atual {current}, lida {version}")
+        self._data[key] = (current + 1, value)
+        return current + 1
+
+    async def get(self, key: str, known_version: int = 0) -> Tuple[int, Optional[str]]:
+        return self.get_nowait(key, known_version)
+
+    async def cas(self, key: str, version: int, value: str) -> int:
+        return self.cas_nowait(key, version, value)
+
+    async def close(self) -> None:
+        pass
+
+
+class RemoteKV:
+    """Cliente do servidor de chave-valor (JSON por linha sobre TCP) com pool de conexões."""
+
+    def __init__(self, host: str, port: int, *, pool_size: int = 10, timeout: float = 2.0) -> None:
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(pool_size)
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        try:
+            return await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        except (OSError, asyncio.TimeoutError) as exc:
+            raise SessionStoreError(f"sem conexão com {self.host}:{self.port}: {exc!r}") from exc
+
+    async def _request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        line = (json.dumps(payload, ensure_ascii=False) + "\n").encode()
+        async with self._slots:
+            pooled = bool(self._idle)
+            reader, writer = self._idle.pop() if pooled else await self._connect()
+            while True:
+                try:
+                    writer.write(line)
+                    response = await asyncio.wait_for(reader.readline(), self.timeout)
+                    if not response:
+                        raise ConnectionResetError("conexão encerrada pelo servidor")
+                    break
+                except (OSError, asyncio.TimeoutError) as exc:
+                    writer.close()
+                    # Conexão ociosa derrubada pelo servidor: tenta uma vez numa conexão nova
+                    if pooled and not isinstance(exc, asyncio.TimeoutError):
+                        pooled = False
+                        reader, writer = await self._connect()
+                        continue
+                    raise SessionStoreError(f"falha na requisição {payload['op']}: {exc!r}") from exc
+                except asyncio.CancelledError:
+                    # A resposta pendente deixaria a conexão dessincronizada
+                    writer.close()
+                    raise
+            self._idle.append((reader, writer))
+        data = json.loads(response)
+        if "error" in data:
+            raise SessionStoreError(data["error"])
+        return data
+
+    async def get(self, key: str, known_version: int = 0) -> Tuple[int, Optional[str]]:
+        data = await self._request({"op": "get", "key": key, "known": known_version})
+        return int(data["version"]), data.get("value")
+
+    async def cas(self, key: str, version: int, value: str) -> int:
+        data = await self._request({"op": "cas", "key": key, "version": version, "value": value})
+        if not data["ok"]:
+            raise VersionConflict(f"{key}: versão atual {data['version']}, lida {version}")
+        return int(data["version"])
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for _reader, writer in idle:
+            writer.close()
+
+
+@dataclass
+class StoredSession:
+    session: SessionData
+    state: Optional[ConversationState]
+    version: int
+    # Registro como foi lido/gravado; gravar de novo o mesmo conteúdo é desnecessário
+    encoded: str = ""
+
+
+def _encode_record(session: SessionData, state: Optional[ConversationState]) -> str:
+    record = {"session": session.to_dict(), "state": state.name if state is not None else None}
+    return json.dumps(record, ensure_ascii=False, default=str)
+
+
+def _decode_record(encoded: str, version: int) -> StoredSession:
+    record = json.loads(encoded)
+    state = record.get("state")
+    return StoredSession(
+        session=SessionData.from_dict(record["session"]),
+        state=ConversationState[state] if state in ConversationState.__members__ else None,
+        version=version,
+        encoded=encoded,
+    )
+
+
+class SessionStore:
+    """Sessões e estado da conversa compartilhados entre processos do bot.
+
+    A leitura é otimista: o processo guarda a última versão que viu e o servidor
+    só devolve o registro se ela mudou. A gravação é condicionada a essa versão;
+    se outro processo gravou antes, ela é recusada com VersionConflict.
+    """
+
+    def __init__(self, kv: VersionedKV, prefix: str = "session:") -> None:
+        self.kv = kv
+        self.prefix = prefix
+
+    async def load(self, user_id: int, cached: Optional[StoredSession] = None) -> StoredSession:
+        started = time.perf_counter()
+        known = cached.version if cached is not None else 0
+        version, encoded = await self.kv.get(f"{self.prefix}{user_id}", known)
+        metrics.observe("sessions.store_load_seconds", time.perf_counter() - started)
+        if cached is not None and version == cached.version:
+            metrics.incr("sessions.store_unchanged")
+            return cached
+        if encoded is None:
+            return StoredSession(session=SessionData(user_id=user_id), state=None, version=version)
+        return _decode_record(encoded, version)
+
+    async def save(
+        self,
+        user_id: int,
+        stored: StoredSession,
+        session: SessionData,
+        state: Optional[ConversationState],
+    ) -> StoredSession:
+        encoded = _encode_record(session, state)
+        if encoded == stored.encoded:
+            return stored
+        started = time.perf_counter()
+        try:
+            version = await self.kv.cas(f"{self.prefix}{user_id}", stored.version, encoded)
+        except VersionConflict:
+            metrics.incr("sessions.store_conflicts")
+            raise
+        finally:
+            metrics.observe("sessions.store_save_seconds", time.perf_counter() - started)
+        return StoredSession(session=session, state=state, version=version, encoded=encoded)
+
+    async def close(self) -> None:
+        await self.kv.close()
+
+
+def create_session_store(settings: Settings) -> Optional[SessionStore]:
+    """None no modo "local": a sessão fica só no user_data do processo, como antes."""
+    if settings.session_store == "memory":
+        return SessionStore(MemoryKV())
+    if settings.session_store == "kv":
+        logger.info(
+            "Sessões no servidor %s:%s",
+            settings.session_kv_host,
+            settings.session_kv_port,
+            extra={"event": "session_store_remote"},
+        )
+        return SessionStore(
+            RemoteKV(
+                settings.session_kv_host,
+                settings.session_kv_port,
+                pool_size=settings.session_kv_pool_size,
+                timeout=settings.session_kv_timeout,
+            )
+        )
+    return None
@@ -1,23 +1,28 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import json
-from dataclasses import dataclass, field
-from typing import Dict, List
+import sqlite3
+import time
 
 from telegram import ReplyKeyboardMarkup, ReplyKeyboardRemove, Update
 from telegram.constants import ParseMode
+from telegram.error import BadRequest, RetryAfter
 from telegram.ext import (
     Application,
+    ApplicationHandlerStop,
     CallbackContext,
     CommandHandler,
     ConversationHandler,
     Defaults,
     MessageHandler,
+    TypeHandler,
     filters,
 )
 
-from .backend import send_screening
+from . import metrics
+from .backend import BackendClient
 from .config import Settings, get_settings
 from .instruments import (
     GAD7_QUESTIONS,
@@ -26,10 +31,22 @@ from .instruments import (
     phq9_item9_flag,
     phq9_score,
 )
-from .llm import classify_msg, gen_report_text, triage_summary
-from .report import build_deterministic_summary, compose_report_text
+from .llm import classify_msg, gen_report_text, triage_and_report, triage_summary, prewarm
+from .outbox import Outbox, OutboxWorker
+from .persistence import SQLitePersistence
+from .report import (
+    NARRATIVE_HEADINGS,
+    QUANTITATIVE_HEADING,
+    build_deterministic_summary,
+    compose_report_text,
+    render_report,
+)
 from .safety import crisis_gate
+from .scheduler import LLMOverloaded, llm_user
+from .session import PERSONAL_FIELDS, SessionData
+from .session_store import SessionStore, SessionStoreError, StoredSession, VersionConflict, create_session_store
 from .states import ConversationState
+from .updates import PerUserUpdateProcessor
 
 logger = logging.getLogger(__name__)
 
@@ -62,39 +79,90 @@ SCALE_INTRO = (
 
 SCALE_KEYBOARD = ReplyKeyboardMarkup([["0", "1", "2", "3"]], one_time_keyboard=True, resize_keyboard=True)
 
-PERSONAL_FIELDS = [
-    ("nome", "Qual seu nome completo?"),
-    ("idade", "Qual sua idade?"),
-    ("telefone", "Qual seu número de telefone para contato? (ex: 92999999999 ou +5592999999999)"),
-    ("matricula", "Informe sua matrícula."),
-    ("curso", "Qual o seu curso?"),
-    ("periodo", "Qual o período/semestre atual?"),
+PROCESSING_MESSAGE = "⏳ Processando sua triagem... Isso pode levar alguns segundos."
+
+LLM_BUSY_MESSAGE = "⏳ O sistema está ocupado no momento. Por favor, envie sua mensagem novamente em instantes."
+LLM_BUSY_REPORT_MESSAGE = (
+    "⏳ O sistema de análise estava ocupado: sua triagem foi registrada com a análise simplificada "
+    "e será revisada pela equipe."
+)
+
+SESSION_UNAVAILABLE_MESSAGE = "⚠️ Não consegui acessar sua sessão agora. Por favor, tente novamente em instantes."
+SESSION_NOT_SAVED_MESSAGE = (
+    "⚠️ Não consegui registrar sua última mensagem. Por favor, envie-a novamente em instantes."
+)
+
+# Marcadores das seções que chegam no streaming (cabeçalho local + seções 2 e 3 do modelo) e o rótulo
+# exibido ao aluno. O texto do relatório é destinado à equipe de psicologia; ao aluno mostramos só o progresso.
+# Recomendações e observação final são montadas localmente depois do streaming: o último passo só
+# fica concluído em ReportProgressMessage.complete().
+REPORT_PROGRESS_STEPS = [
+    (QUANTITATIVE_HEADING, "Resultados das escalas"),
+    # Só número e começo do título: o modelo às vezes abrevia o restante
+    (" ".join(NARRATIVE_HEADINGS[0].split()[:3]), "Análise integrada das respostas"),
+    (" ".join(NARRATIVE_HEADINGS[1].split()[:3]), "Pontos de atenção"),
+    (None, "Recomendações e finalização"),
 ]
 
 
-@dataclass
-class SessionData:
-    user_id: int
-    personal_data: Dict[str, str] = field(default_factory=dict)
-    phq9_answers: List[int] = field(default_factory=list)
-    phq9_item9_positive: bool = False
-    gad7_answers: List[int] = field(default_factory=list)
-    availability: str = ""
-    observation: str = ""
-    free_text: List[str] = field(default_factory=list)
-    history: List[str] = field(default_factory=list)
-    triage_result: Dict[str, object] = field(default_factory=dict)
-    phq9_started: bool = False
-    triage_active: bool = False
-
-    def next_personal_field(self) -> tuple[str, str] | None:
-        for key, question in PERSONAL_FIELDS:
-            if key not in self.personal_data:
-                return key, question
-        return None
+class ReportProgressMessage:
+    """Atualiza uma única mensagem com o progresso do relatório, respeitando o limite de edições do Telegram."""
+
+    def __init__(self, message, min_interval: float = 1.5) -> None:
+        self.message = message
+        self.min_interval = min_interval
+        self.first_edit_seconds: float | None = None
+        self._started = time.monotonic()
+        self._next_edit_at = 0.0
+        self._last_text = PROCESSING_MESSAGE
+
+    @staticmethod
+    def render(partial_report: str, done: bool = False) -> str:
+        reached = [
+            idx for idx, (marker, _label) in enumerate(REPORT_PROGRESS_STEPS) if marker and marker in partial_report
+        ]
+        current = len(REPORT_PROGRESS_STEPS) if done else max(reached, default=0)
+        lines = [PROCESSING_MESSAGE, ""]
+        for idx, (_marker, label) in enumerate(REPORT_PROGRESS_STEPS):
+            if idx < current:
+                lines.append(f"✅ {label}")
+            elif idx == current:
+                lines.append(f"✍️ {label}...")
+            else:
+                lines.append(f"▫️ {label}")
+        return "\n".join(lines)
+
+    async def update(self, partial_report: str) -> None:
+        await self._edit(self.render(partial_report))
+
+    async def complete(self) -> None:
+        """Marca todos os passos como concluídos quando o relatório fica pronto (ignora o intervalo mínimo)."""
+        await self._edit(self.render("", done=True), force=True)
+
+    async def _edit(self, text: str, force: bool = False) -> None:
+        now = time.monotonic()
+        if text == self._last_text or now < self._next_edit_at and not force:
+            return
+        try:
+            await self.message.edit_text(text)
+        except RetryAfter as exc:
+            retry_after = exc.retry_after
+            seconds = retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+            self._next_edit_at = now + seconds
+            return
+        except BadRequest as exc:
+            logger.debug(f"Edição de progresso ignorada: {exc}")
+            return
+        self._last_text = text
+        self._next_edit_at = now + self.min_interval
+        if self.first_edit_seconds is None:
+            self.first_edit_seconds = now - self._started
+            metrics.observe("telegram.report_first_edit_seconds", self.first_edit_seconds)
 
 
 def _get_session(context: CallbackContext, user_id: int) -> SessionData:
+    # Chamadas ao LLM feitas a partir desta atualização entram na fila deste aluno
+    llm_user.set(user_id)
     session = context.user_data.get("session")
     if isinstance(session, SessionData):
         return session
@@ -115,6 +183,30 @@ def _reset_session(session: SessionData) -> None:
     session.triage_result.clear()
     session.phq9_started = False
     session.triage_active = False
+    _cancel_triage_task(session)
+
+
+def _start_speculative_triage(context: CallbackContext, update: Update, session: SessionData) -> None:
+    # Todas as entradas do triage_summary já são conhecidas após a 7ª resposta do GAD-7;
+    # a chamada roda enquanto o aluno informa disponibilidade e observação.
+    _cancel_triage_task(session)
+    session.triage_task = context.application.create_task(
+        triage_summary(
+            dados_pessoais=session.personal_data.copy(),
+            phq9_respostas=list(session.phq9_answers),
+            gad7_respostas=list(session.gad7_answers),
+            texto_livre=list(session.free_text),
+        ),
+        update=update,
+        name=f"triage_summary:{session.user_id}",
+    )
+
+
+def _cancel_triage_task(session: SessionData) -> None:
+    task = session.triage_task
+    session.triage_task = None
+    if task is not None and not task.done():
+        task.cancel()
 
 
 def _inferred_state(session: SessionData) -> ConversationState:
@@ -137,10 +229,39 @@ def build_application(settings: Settings | None = None) -> Application:
         Application.builder()
         .token(config.telegram_token)
         .defaults(Defaults(parse_mode=ParseMode.MARKDOWN))
+        .post_init(_on_startup)
+        .post_shutdown(_on_shutdown)
     )
+    store = create_session_store(config)
+    # Com store compartilhado, ele é a fonte da sessão; o SQLite local só vale para um processo
+    persistent = config.session_persistence and store is None
+    if persistent:
+        builder = builder.persistence(
+            SQLitePersistence(
+                config.session_db_path,
+                update_interval=config.session_flush_interval,
+                max_age_seconds=config.session_max_age_hours * 3600,
+                max_loaded=config.session_max_loaded,
+            )
+        )
+    if config.telegram_concurrent_updates > 1:
+        builder = builder.concurrent_updates(
+            PerUserUpdateProcessor(config.telegram_concurrent_updates, config.telegram_max_pending_updates)
+        )
     application = builder.build()
+    backend_client = _build_backend_client(config)
+    application.bot_data["backend_client"] = backend_client
+    outbox = Outbox(config.outbox_path)
+    application.bot_data["outbox_worker"] = OutboxWorker(
+        outbox,
+        backend_client,
+        batch_size=config.outbox_batch_size,
+        retry_base=config.outbox_retry_base,
+        retry_max=config.outbox_retry_max,
+        poll_interval=config.outbox_poll_interval,
+    )
 
-    conv_handler = ConversationHandler(
+    conv_handler = (SharedConversationHandler if store is not None else ConversationHandler)(
         entry_points=[
             CommandHandler("start", start),
             CommandHandler("menu", start),
@@ -158,12 +279,145 @@ def build_application(settings: Settings | None = None) -> Application:
             ConversationState.AGENDAMENTO: [MessageHandler(filters.TEXT & ~filters.COMMAND, scheduling_handler)],
         },
         fallbacks=[CommandHandler("cancelar", cancel)],
+        name="triagem",
+        persistent=persistent,
     )
 
     application.add_handler(conv_handler)
+    if store is not None:
+        _install_session_store(application, conv_handler, store)
     return application
 
 
+class SharedConversationHandler(ConversationHandler):
+    """ConversationHandler cujo estado por aluno é trazido do SessionStore a cada update."""
+
+    def get_state(self, update: Update) -> ConversationState | None:
+        return self._conversations.get(self._get_key(update))
+
+    def set_state(self, update: Update, state: ConversationState | None) -> None:
+        key = self._get_key(update)
+        if state is None:
+            self._conversations.pop(key, None)
+        else:
+            self._conversations[key] = state
+
+
+async def _reply_session_problem(update: Update, text: str) -> None:
+    if update.effective_message is not None:
+        await update.effective_message.reply_text(text, reply_markup=ReplyKeyboardRemove())
+
+
+def _install_session_store(
+    application: Application, conv_handler: SharedConversationHandler, store: SessionStore
+) -> None:
+    """Cada update lê a sessão do store antes do ConversationHandler e a grava depois dele."""
+    application.bot_data["session_store"] = store
+
+    async def load_session(update: Update, context: CallbackContext) -> None:
+        user = update.effective_user
+        if user is None or update.effective_chat is None:
+            return
+        cached = context.user_data.get("stored_session")
+        cached = cached if isinstance(cached, StoredSession) else None
+        try:
+            stored = await store.load(user.id, cached)
+        except SessionStoreError as exc:
+            # Sem a sessão do servidor, o ConversationHandler rodaria sobre um estado velho
+            metrics.incr("sessions.store_errors")
+            logger.warning(
+                "Sessão indisponível: %s", exc, extra={"event": "session_store_unavailable", "user_id": user.id}
+            )
+            await _reply_session_problem(update, SESSION_UNAVAILABLE_MESSAGE)
+            raise ApplicationHandlerStop
+        if cached is not None and stored is not cached:
+            # Outro processo atendeu o aluno nesse meio-tempo: a triagem especulativa daqui ficou velha
+            _cancel_triage_task(cached.session)
+        context.user_data["stored_session"] = stored
+        context.user_data["session"] = stored.session
+        context.user_data.pop("screening_submitted", None)
+        conv_handler.set_state(update, stored.state)
+
+    async def save_session(update: Update, context: CallbackContext) -> None:
+        user = update.effective_user
+        stored = context.user_data.get("stored_session")
+        session = context.user_data.get("session")
+        if user is None or update.effective_chat is None or not isinstance(stored, StoredSession):
+            return
+        if not isinstance(session, SessionData):
+            return
+        try:
+            state = conv_handler.get_state(update)
+            context.user_data["stored_session"] = await store.save(user.id, stored, session, state)
+            return
+        except VersionConflict:
+            # Outro processo gravou primeiro; a resposta deste update não entra na versão dele
+            logger.warning(
+                "Sessão alterada por outro processo", extra={"event": "session_conflict", "user_id": user.id}
+            )
+        except SessionStoreError as exc:
+            metrics.incr("sessions.store_errors")
+            logger.warning(
+                "Falha ao gravar sessão: %s", exc, extra={"event": "session_store_unavailable", "user_id": user.id}
+            )
+        # A próxima mensagem relê a versão do servidor; o aluno reenvia a que se perdeu
+        context.user_data.pop("stored_session", None)
+        _cancel_triage_task(session)
+        if context.user_data.pop("screening_submitted", False):
+            # A triagem já foi para o outbox/backend: reenviar a última mensagem a duplicaria
+            logger.warning(
+                "Sessão não gravada após o envio da triagem",
+                extra={"event": "session_not_saved_after_submit", "user_id": user.id},
+            )
+            raise ApplicationHandlerStop
+        await _reply_session_problem(update, SESSION_NOT_SAVED_MESSAGE)
+        raise ApplicationHandlerStop
+
+    application.add_handler(TypeHandler(Update, load_session), group=-1)
+    application.add_handler(TypeHandler(Update, save_session), group=1)
+
+
+def _build_backend_client(config: Settings) -> BackendClient:
+    return BackendClient(
+        str(config.backend_url),
+        config.bot_shared_secret,
+        pool_size=config.backend_pool_size,
+        timeout=config.backend_timeout,
+        connect_timeout=config.backend_connect_timeout,
+    )
+
+
+async def _on_startup(application: Application) -> None:
+    worker = application.bot_data.get("outbox_worker")
+    if isinstance(worker, OutboxWorker):
+        worker.start()
+    if get_settings().llm_prewarm:
+        # Em segundo plano: o polling começa sem esperar o SDK do Gemini nem o cache de prompts
+        application.bot_data["llm_prewarm_task"] = asyncio.create_task(prewarm(), name="llm_prewarm")
+
+
+async def _on_shutdown(application: Application) -> None:
+    worker = application.bot_data.get("outbox_worker")
+    if isinstance(worker, OutboxWorker):
+        await worker.stop()
+        worker.outbox.close()
+    client = application.bot_data.get("backend_client")
+    if isinstance(client, BackendClient):
+        await client.aclose()
+    store = application.bot_data.get("session_store")
+    if isinstance(store, SessionStore):
+        await store.close()
+
+
+def _get_backend_client(context: CallbackContext) -> BackendClient:
+    client = context.bot_data.get("backend_client")
+    if isinstance(client, BackendClient):
+        return client
+    client = _build_backend_client(get_settings())
+    context.bot_data["backend_client"] = client
+    return client
+
+
 async def start(update: Update, context: CallbackContext) -> ConversationState:
     user = update.effective_user
     if not user or not update.message:
@@ -434,7 +688,14 @@ async def empathetic_conversation(update: Update, context: CallbackContext) -> C
     message = (update.message.text or "").strip()
     session = _get_session(context, update.effective_user.id)
 
-    classify = await classify_msg(message, session.history)
+    try:
+        classify = await classify_msg(message, session.history)
+    except LLMOverloaded:
+        # Nada foi registrado: o aluno continua nesta etapa e reenvia a mensagem
+        if crisis_gate(message, False):
+            await update.message.reply_text(CRISIS_MESSAGE)
+        await update.message.reply_text(LLM_BUSY_MESSAGE)
+        return ConversationState.CONVERSA
     crisis_detected = crisis_gate(message, classify.possivel_crise)
     _record_history(session, message)
     if crisis_detected:
@@ -555,6 +816,9 @@ async def gad7_handler(update: Update, context: CallbackContext) -> Conversation
         )
         return ConversationState.GAD7
 
+    if not get_settings().llm_combined_mode:
+        _start_speculative_triage(context, update, session)
+
     await update.message.reply_text(
         "Obrigado por responder. 💙",
         reply_markup=ReplyKeyboardRemove(),
@@ -616,12 +880,12 @@ async def scheduling_handler(update: Update, context: CallbackContext) -> Conver
     session.observation = "" if text.lower() == "nenhuma" else text
     print(f"   ✅ Observação salva: {session.observation[:50] if session.observation else 'Nenhuma'}")
     print("   🚀 Chamando finalize_screening...")
-    await finalize_screening(update, session)
+    await finalize_screening(update, context, session)
     print("   ✅ finalize_screening concluído")
     return ConversationHandler.END
 
 
-async def finalize_screening(update: Update, session: SessionData) -> None:
+async def finalize_screening(update: Update, context: CallbackContext, session: SessionData) -> None:
     # Print de debug para rastreamento
     print("="*60)
     print("🚀 FINALIZE_SCREENING CHAMADO!")
@@ -638,7 +902,7 @@ async def finalize_screening(update: Update, session: SessionData) -> None:
     processing_msg = None
     if update.message:
         try:
-            processing_msg = await update.message.reply_text("⏳ Processando sua triagem... Isso pode levar alguns segundos.")
+            processing_msg = await update.message.reply_text(PROCESSING_MESSAGE)
         except Exception as e:
             logger.warning(f"Erro ao enviar mensagem de processamento (ignorado): {e}")
             processing_msg = None
@@ -647,30 +911,37 @@ async def finalize_screening(update: Update, session: SessionData) -> None:
     gad7_total = gad7_score(session.gad7_answers)
     dados = session.personal_data.copy()
 
-    logger.info("Chamando triage_summary...")
-    try:
-        triage = await triage_summary(
-            dados_pessoais=dados,
-            phq9_respostas=session.phq9_answers,
-            gad7_respostas=session.gad7_answers,
-            texto_livre=session.free_text,
-        )
-        session.triage_result = triage.model_dump()
-        logger.info("triage_summary concluído")
-    except Exception as e:
-        logger.error(f"Erro em triage_summary: {e}")
-        session.triage_result = {}
+    settings = get_settings()
+    combined_mode = settings.llm_combined_mode
 
-    deterministic = build_deterministic_summary(
-        nome=dados.get("nome", "Participante"),
-        phq9_answers=session.phq9_answers,
-        gad7_answers=session.gad7_answers,
-        disponibilidade=session.availability,
-        observacao=session.observation,
-        free_text=session.free_text,
-        triage=session.triage_result,
-        phq9_item9_positive=session.phq9_item9_positive,
-    )
+    triage_task = session.triage_task
+    session.triage_task = None
+    # Fila do LLM cheia: a triagem segue com o relatório montado localmente e o aluno é avisado
+    llm_busy = False
+    if not combined_mode:
+        try:
+            if triage_task is not None and not triage_task.cancelled():
+                logger.info("Aguardando triage_summary iniciado após o GAD-7...")
+                triage = await triage_task
+            else:
+                logger.info("Chamando triage_summary...")
+                triage = await triage_summary(
+                    dados_pessoais=dados,
+                    phq9_respostas=session.phq9_answers,
+                    gad7_respostas=session.gad7_answers,
+                    texto_livre=session.free_text,
+                )
+            session.triage_result = triage.model_dump()
+            logger.info("triage_summary concluído")
+        except LLMOverloaded:
+            llm_busy = True
+            session.triage_result = {}
+        except Exception as e:
+            logger.error(f"Erro em triage_summary: {e}")
+            session.triage_result = {}
+    elif triage_task is not None:
+        # No modo combinado a triagem sai junto com o relatório
+        triage_task.cancel()
 
     # Prepara contexto mais rico para o relatório da IA
     from .instruments import phq9_bucket, gad7_bucket
@@ -717,14 +988,61 @@ async def finalize_screening(update: Update, session: SessionData) -> None:
         "triage": session.triage_result or {},
     }
 
-    logger.info("Chamando gen_report_text...")
-    try:
-        llm_text = await gen_report_text(json.dumps(contexto, ensure_ascii=False))
-        logger.info("gen_report_text concluído")
-    except Exception as e:
-        logger.error(f"Erro em gen_report_text: {e}")
-        llm_text = ""
-    
+    if combined_mode:
+        logger.info("Chamando triage_and_report...")
+        try:
+            triage, llm_text = await triage_and_report(
+                dados_pessoais=dados,
+                phq9_respostas=session.phq9_answers,
+                gad7_respostas=session.gad7_answers,
+                texto_livre=session.free_text,
+                contexto={key: value for key, value in contexto.items() if key != "triage"},
+            )
+            session.triage_result = triage.model_dump()
+            logger.info("triage_and_report concluído")
+        except LLMOverloaded:
+            llm_busy = True
+            llm_text = render_report({**contexto, "triage": {}}, "")
+        except Exception as e:
+            logger.error(f"Erro em triage_and_report: {e}")
+            llm_text = ""
+    else:
+        logger.info("Chamando gen_report_text...")
+        try:
+            progress = (
+                ReportProgressMessage(processing_msg, settings.telegram_edit_interval) if processing_msg else None
+            )
+            llm_text = await gen_report_text(
+                contexto,
+                on_chunk=progress.update if progress else None,
+            )
+            if progress:
+                await progress.complete()
+            logger.info(
+                "gen_report_text concluído",
+                extra={
+                    "event": "report_generated",
+                    "first_visible_update_seconds": progress.first_edit_seconds if progress else None,
+                },
+            )
+        except LLMOverloaded:
+            llm_busy = True
+            llm_text = render_report(contexto, "")
+        except Exception as e:
+            logger.error(f"Erro em gen_report_text: {e}")
+            llm_text = ""
+
+    deterministic = build_deterministic_summary(
+        nome=dados.get("nome", "Participante"),
+        phq9_answers=session.phq9_answers,
+        gad7_answers=session.gad7_answers,
+        disponibilidade=session.availability,
+        observacao=session.observation,
+        free_text=session.free_text,
+        triage=session.triage_result,
+        phq9_item9_positive=session.phq9_item9_positive,
+    )
+
     final_report = compose_report_text(deterministic, llm_text)
     
     # Remove mensagem de processamento
@@ -735,6 +1053,17 @@ async def finalize_screening(update: Update, session: SessionData) -> None:
             logger.debug(f"Erro ao deletar mensagem de processamento (ignorado): {e}")
             pass  # Ignora se não conseguir deletar
 
+    if llm_busy:
+        logger.warning(
+            "Triagem finalizada sem o LLM (fila cheia)",
+            extra={"event": "screening_llm_overloaded", "user_id": session.user_id},
+        )
+        if update.message:
+            try:
+                await update.message.reply_text(LLM_BUSY_REPORT_MESSAGE)
+            except Exception as e:
+                logger.warning(f"Erro ao avisar sobre a fila do LLM (ignorado): {e}")
+
     # Converte idade para número se necessário
     idade_val = dados.get("idade")
     if isinstance(idade_val, str):
@@ -761,7 +1090,6 @@ async def finalize_screening(update: Update, session: SessionData) -> None:
         "telegram_id": str(session.user_id),
     }
 
-    settings = get_settings()
     logger.info(f"Enviando triagem para: {settings.backend_url}")
     logger.info(f"Secret configurado: {'Sim' if settings.bot_shared_secret else 'Não'}")
     logger.debug(f"Payload completo: {json.dumps(payload, ensure_ascii=False, indent=2)}")
@@ -772,7 +1100,23 @@ async def finalize_screening(update: Update, session: SessionData) -> None:
     if missing_fields:
         logger.error(f"Payload incompleto. Campos faltando: {missing_fields}")
     
-    success = send_screening(settings.backend_url, settings.bot_shared_secret, payload)
+    worker = context.bot_data.get("outbox_worker")
+    success = False
+    # Daqui em diante a triagem pode já ter saído; save_session não pede reenvio se a gravação falhar
+    context.user_data["screening_submitted"] = True
+    if isinstance(worker, OutboxWorker):
+        try:
+            outbox_id = await asyncio.to_thread(worker.outbox.enqueue, payload)
+            worker.wake()
+            success = True
+            logger.info(
+                "screening_enqueued",
+                extra={"event": "screening_enqueued", "user_id": session.user_id, "outbox_id": outbox_id},
+            )
+        except sqlite3.Error as exc:
+            logger.error(f"Falha ao gravar triagem no outbox, enviando diretamente: {exc}")
+    if not success:
+        success = await _get_backend_client(context).send_screening(payload)
     if not success:
         logger.error(
             "backend_post_failed",
@@ -786,7 +1130,7 @@ async def finalize_screening(update: Update, session: SessionData) -> None:
         # Ainda mostra mensagem de sucesso para o usuário, mas loga o erro
         if update.message:
             await update.message.reply_text(
-                "⚠️ Aviso: A triagem foi registrada localmente, mas houve um problema ao enviar para o sistema. "
+                "⚠️ Aviso: Houve um problema ao registrar sua triagem no sistema. "
                 "A equipe será notificada. Em caso de emergência, procure ajuda imediatamente (188 ou 192)."
             )
         return
@@ -837,5 +1181,6 @@ async def cancel(update: Update, context: CallbackContext) -> int:
     session = context.user_data.get("session")
     if isinstance(session, SessionData):
         session.triage_active = False
+        _cancel_triage_task(session)
     return ConversationHandler.END
 
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence
+
+from .instruments import GAD7_QUESTIONS, PHQ9_QUESTIONS, gad7_score, phq9_item9_flag, phq9_score
+from .models import TriageOut
+from .safety import any_crisis
+
+MAX_ITEMS = 6
+# A partir de tantos itens com escore >= 2 o TRIAGE_PROMPT fala em "sintomas persistentes" (média ou mais)
+PERSISTENT_ITEMS = 4
+# Relato livre só fica de fora do modelo se for curto e não tiver nenhum termo de risco nem negação
+MAX_FREE_TEXT_CHARS = 200
+# Mais amplo que safety.RISK_PATTERNS de propósito: na dúvida, o relato vai ao modelo
+FREE_TEXT_RISK_PATTERNS: tuple[str, ...] = (
+    r"morr", r"mort", r"mat(ar|o|ei|ou)", r"suic", r"vida", r"viver", r"machuc", r"cort(ar|o|ei)", r"acabar",
+    r"sumir", r"desist", r"aguent", r"suport", r"sa[ií]da", r"rem[eé]dio", r"overdose", r"pular", r"enforc",
+    r"sangu", r"adeus", r"in[uú]til", r"culpa", r"sozinh", r"abus", r"viol[eê]n", r"agress", r"drog",
+    r"[aá]lcool", r"bebid", r"desesper", r"p[aâ]nico", r"crise", r"medo",
+)
+NEGATION_PATTERNS: tuple[str, ...] = (r"n[aã]o", r"nunca", r"nada", r"ningu[eé]m", r"nem", r"jamais", r"sem")
+_free_text_risk = re.compile("|".join(FREE_TEXT_RISK_PATTERNS), re.IGNORECASE)
+_negation = re.compile(r"\b(" + "|".join(NEGATION_PATTERNS) + r")\b", re.IGNORECASE)
+
+PHQ9_SIGNALS = [
+    "pouco interesse ou prazer nas atividades",
+    "humor deprimido ou sem esperança",
+    "alterações no sono",
+    "cansaço ou pouca energia",
+    "alterações no apetite",
+    "sentimento de fracasso ou autocrítica",
+    "dificuldade de concentração",
+    "lentificação ou agitação psicomotora",
+    "pensamentos de morte ou autolesão",
+]
+
+GAD7_SIGNALS = [
+    "nervosismo ou tensão",
+    "preocupação difícil de controlar",
+    "preocupação excessiva com diferentes temas",
+    "dificuldade em relaxar",
+    "inquietação",
+    "irritabilidade",
+    "medo de que algo ruim aconteça",
+]
+
+# Itens cujo escore alto costuma refletir impacto no cotidiano
+PHQ9_IMPACT = {2: "alterações no sono", 3: "baixa energia para as atividades diárias", 6: "dificuldade de concentração nos estudos"}
+GAD7_IMPACT = {3: "dificuldade em relaxar no dia a dia", 5: "irritabilidade nas relações"}
+
+
+@dataclass
+class RuleDecision:
+    triage: TriageOut
+    reason: str
+
+
+def _high_items(answers: Sequence[int], labels: Sequence[str], threshold: int = 2) -> List[str]:
+    return [labels[i] for i, score in enumerate(answers) if score >= threshold]
+
+
+def _impact(answers: Sequence[int], mapping: dict[int, str]) -> List[str]:
+    return [label for idx, label in mapping.items() if idx < len(answers) and answers[idx] >= 2]
+
+
+def _build(urgency: str, phq9: Sequence[int], gad7: Sequence[int], item9: bool) -> TriageOut:
+    depressao = _high_items(phq9[:8], PHQ9_SIGNALS)
+    if item9:
+        depressao.insert(0, PHQ9_SIGNALS[8])
+    ansiedade = _high_items(gad7, GAD7_SIGNALS)
+    if len(depressao) >= PERSISTENT_ITEMS:
+        depressao.append("sintomas persistentes")
+    impacto = _impact(phq9, PHQ9_IMPACT) + _impact(gad7, GAD7_IMPACT)
+    return TriageOut(
+        nivel_urgencia=urgency,
+        # Fatores de proteção vêm do relato do aluno; sem o modelo, não há o que afirmar
+        fatores_protecao=[],
+        impacto_funcional=impacto[:MAX_ITEMS],
+        sinais_depressao=depressao[:MAX_ITEMS],
+        sinais_ansiedade=ansiedade[:MAX_ITEMS],
+    )
+
+
+def _plain_free_text(relatos: Sequence[str]) -> bool:
+    """Relatos curtos, sem termos de risco nem negações ("não aguento", "nada faz sentido")."""
+    if sum(len(text) for text in relatos) > MAX_FREE_TEXT_CHARS:
+        return False
+    return not any(_free_text_risk.search(text) or _negation.search(text) for text in relatos)
+
+
+def decide_triage(
+    phq9_respostas: Iterable[int],
+    gad7_respostas: Iterable[int],
+    texto_livre: Iterable[str],
+) -> Optional[RuleDecision]:
+    """Aplica as regras de urgência do TRIAGE_PROMPT; retorna None quando o caso precisa do modelo."""
+    phq9 = list(phq9_respostas)
+    gad7 = list(gad7_respostas)
+    relatos = [text for text in texto_livre if text and text.strip()]
+    if len(phq9) != len(PHQ9_QUESTIONS) or len(gad7) != len(GAD7_QUESTIONS):
+        return None
+
+    phq9_total = phq9_score(phq9)
+    gad7_total = gad7_score(gad7)
+    item9 = phq9_item9_flag(phq9)
+
+    if item9:
+        return RuleDecision(_build("alta", phq9, gad7, item9), "phq9_item9")
+    if phq9_total >= 20 or gad7_total >= 15:
+        return RuleDecision(_build("alta", phq9, gad7, item9), "escore_grave")
+    if any_crisis(relatos):
+        return RuleDecision(_build("alta", phq9, gad7, item9), "relato_risco")
+
+    # As listas de padrões não cobrem tudo o que o aluno escreve: só relato curto e neutro fica de fora do modelo
+    if not _plain_free_text(relatos):
+        return None
+    persistent = max(len(_high_items(phq9, PHQ9_SIGNALS)), len(_high_items(gad7, GAD7_SIGNALS)))
+    if phq9_total <= 9 and gad7_total <= 9 and persistent < PERSISTENT_ITEMS:
+        return RuleDecision(_build("baixa", phq9, gad7, item9), "escores_baixos")
+    return None
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Dict, Hashable, List
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from . import metrics
+
+
+def update_key(update: object) -> Hashable:
+    """Chave de serialização: o aluno (a sessão vive em user_data), ou o chat na falta dele."""
+    if isinstance(update, Update):
+        if update.effective_user is not None:
+            return ("user", update.effective_user.id)
+        if update.effective_chat is not None:
+            return ("chat", update.effective_chat.id)
+    return ("global",)
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Processa updates de alunos diferentes em paralelo e os de um mesmo aluno em ordem.
+
+    O ConversationHandler e o SessionData supõem um update por vez; um lock por aluno
+    mantém isso sem que a finalização de uma triagem atrase as mensagens dos outros.
+    `max_pending` limita os updates admitidos (rodando ou esperando a vez do aluno);
+    `concurrency` limita os que rodam de fato, para que vários updates enfileirados de
+    um mesmo aluno não ocupem as vagas dos demais.
+    """
+
+    def __init__(self, concurrency: int, max_pending: int) -> None:
+        super().__init__(max(concurrency, max_pending))
+        self.concurrency = concurrency
+        self._running = asyncio.Semaphore(concurrency)
+        # Lock e número de updates usando a chave; a entrada sai quando ninguém mais espera
+        self._locks: Dict[Hashable, List[Any]] = {}
+
+    @property
+    def active_keys(self) -> int:
+        return len(self._locks)
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = update_key(update)
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            async with entry[0]:
+                async with self._running:
+                    metrics.observe("telegram.update_wait_seconds", loop.time() - started)
+                    await coroutine
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
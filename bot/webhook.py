@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+import hmac
+import logging
+import signal
+import time
+
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+
+from . import metrics
+from .config import Settings
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+HEALTH_PATH = "/healthz"
+# Updates de texto têm poucos KB; o limite barra corpos abusivos antes do parse
+MAX_BODY_BYTES = 256 * 1024
+
+
+def build_webhook_app(application: Application, *, path: str, secret_token: str) -> web.Application:
+    """Servidor HTTP do webhook: valida o segredo, enfileira o update e responde 200 sem esperar o processamento."""
+
+    async def receive(request: web.Request) -> web.Response:
+        started = time.perf_counter()
+        if not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), secret_token):
+            metrics.incr("webhook.rejected")
+            return web.Response(status=403)
+        update = None
+        try:
+            data = await request.json()
+            if isinstance(data, dict):
+                update = Update.de_json(data, application.bot)
+        except (ValueError, TypeError, KeyError, AttributeError):
+            pass
+        if update is None:
+            metrics.incr("webhook.invalid")
+            return web.Response(status=400)
+        # O update segue pela fila da Application; os handlers rodam fora desta requisição
+        application.update_queue.put_nowait(update)
+        metrics.incr("webhook.updates")
+        metrics.observe("webhook.ack_seconds", time.perf_counter() - started)
+        return web.Response(status=200)
+
+    async def health(_request: web.Request) -> web.Response:
+        running = application.running
+        body = {"status": "ok" if running else "parado", "pending_updates": application.update_queue.qsize()}
+        return web.json_response(body, status=200 if running else 503)
+
+    app = web.Application(client_max_size=MAX_BODY_BYTES)
+    app.router.add_post(path, receive)
+    app.router.add_get(HEALTH_PATH, health)
+    return app
+
+
+async def serve_webhook(application: Application, settings: Settings) -> None:
+    """Alternativa ao run_polling: vários processos podem atender o mesmo bot atrás de um balanceador."""
+    if not settings.webhook_secret:
+        raise ValueError("WEBHOOK_SECRET obrigatório no modo webhook.")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    runner = web.AppRunner(
+        build_webhook_app(application, path=settings.webhook_path, secret_token=settings.webhook_secret),
+        access_log=None,
+    )
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+    try:
+        if settings.webhook_url:
+            await application.bot.set_webhook(
+                url=f"{settings.webhook_url.rstrip('/')}{settings.webhook_path}",
+                secret_token=settings.webhook_secret,
+                allowed_updates=[],
+                max_connections=settings.webhook_max_connections,
+            )
+        await runner.setup()
+        await web.TCPSite(runner, settings.webhook_host, settings.webhook_port).start()
+        logger.info(
+            "Webhook escutando em %s:%s%s",
+            settings.webhook_host,
+            settings.webhook_port,
+            settings.webhook_path,
+            extra={"event": "webhook_started"},
+        )
+        await stop.wait()
+    finally:
+        # O webhook não é removido no Telegram: outras instâncias podem continuar atendendo
+        await runner.cleanup()
+        if application.running:
+            await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
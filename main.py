@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import sys
 
@@ -18,7 +19,13 @@ def main() -> None:
     settings = get_settings()
     application = build_application(settings)
     logging.getLogger(__name__).info("Bot inicializado", extra={"event": "startup"})
-    application.run_polling(allowed_updates=[])
+    if settings.telegram_mode == "webhook":
+        # Import adiado: o aiohttp só é carregado quando o modo webhook está ativo
+        from bot.webhook import serve_webhook
+
+        asyncio.run(serve_webhook(application, settings))
+    else:
+        application.run_polling(allowed_updates=[])
 
 
 if __name__ == "__main__":
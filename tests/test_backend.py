@@ -0,0 +1,66 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from bot.backend import BackendClient
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    status = 201
+    received: list = []
+
+    def do_POST(self):  # noqa: N802
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        type(self).received.append((self.headers.get("X-Bot-Secret"), body))
+        self.send_response(type(self).status)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    _StubHandler.status = 201
+    _StubHandler.received = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/api/screenings"
+    server.shutdown()
+    server.server_close()
+
+
+def _send_all(client: BackendClient, payloads):
+    async def runner():
+        try:
+            return await asyncio.gather(*(client.send_screening(p) for p in payloads))
+        finally:
+            await client.aclose()
+
+    return asyncio.run(runner())
+
+
+def test_backend_client_posts_payload_with_secret(stub_server):
+    client = BackendClient(stub_server, "segredo", pool_size=2)
+    results = _send_all(client, [{"nome": "Maria"}, {"nome": "João"}, {"nome": "Ana"}])
+    assert results == [True, True, True]
+    assert {secret for secret, _ in _StubHandler.received} == {"segredo"}
+    assert sorted(body["nome"] for _, body in _StubHandler.received) == ["Ana", "João", "Maria"]
+
+
+def test_backend_client_returns_false_on_error_status(stub_server):
+    _StubHandler.status = 500
+    client = BackendClient(stub_server, "segredo")
+    assert _send_all(client, [{"nome": "Maria"}]) == [False]
+
+
+def test_backend_client_returns_false_when_unreachable():
+    client = BackendClient("http://127.0.0.1:9/api/screenings", "segredo", timeout=1.0, connect_timeout=0.5)
+    assert _send_all(client, [{"nome": "Maria"}]) == [False]
@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+from bot import llm, metrics
+from bot.batching import MicroBatcher
+from bot.cache import TTLCache
+
+
+def test_micro_batcher_groups_and_retries_missing_items():
+    batches = []
+    singles = []
+
+    async def run_batch(items):
+        batches.append(list(items))
+        return [item * 10 if item != 2 else None for item in items]
+
+    async def run_single(item):
+        singles.append(item)
+        return item * 100
+
+    batcher = MicroBatcher("teste", run_batch, run_single, window_seconds=0.01, max_batch=8)
+
+    async def runner():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(4)))
+
+    assert asyncio.run(runner()) == [0, 10, 200, 30]
+    assert batches == [[0, 1, 2, 3]]
+    assert singles == [2]
+
+
+def test_micro_batcher_flushes_at_max_size_and_propagates_errors():
+    calls = []
+
+    async def run_batch(items):
+        calls.append(len(items))
+        raise RuntimeError("falhou")
+
+    async def run_single(item):
+        return item
+
+    batcher = MicroBatcher("teste", run_batch, run_single, window_seconds=10, max_batch=2)
+
+    async def runner():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(2)), return_exceptions=True)
+
+    results = asyncio.run(runner())
+    assert calls == [2]
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_classify_msg_batches_across_users(monkeypatch):
+    metrics.reset()
+    calls = []
+
+    async def fake_invoke(prompt, call_type, **kwargs):
+        calls.append(call_type)
+        if call_type == "classify_batch":
+            # O item 1 volta inválido e é refeito sozinho
+            return json.dumps({
+                "resultados": [
+                    {"id": 0, "emocao_principal": "cansaco", "intensidade": 3, "possivel_crise": False, "resposta_empatica": "a"},
+                    {"id": 1, "emocao_principal": "desconhecida"},
+                    {"id": 2, "emocao_principal": "alegria", "intensidade": 1, "possivel_crise": False, "resposta_empatica": "c"},
+                ]
+            })
+        return json.dumps({"emocao_principal": "ansiedade", "intensidade": 5, "possivel_crise": False, "resposta_empatica": "b"})
+
+    monkeypatch.setattr(llm, "_invoke_raw", fake_invoke)
+    monkeypatch.setattr(llm._settings, "classify_batching", True)
+    monkeypatch.setattr(llm, "_classify_cache", TTLCache("classify", max_size=0, ttl_seconds=0))
+    monkeypatch.setattr(llm, "_classify_batcher", llm.MicroBatcher(
+        "llm.classify_batch", llm._classify_batch, llm._classify_single, window_seconds=0.02, max_batch=16
+    ))
+
+    async def runner():
+        return await asyncio.gather(
+            llm.classify_msg("cansado", []),
+            llm.classify_msg("nervoso com a prova", []),
+            llm.classify_msg("feliz", []),
+            llm.classify_msg("quero morrer", []),
+        )
+
+    results = asyncio.run(runner())
+    assert [result.emocao_principal for result in results[:3]] == ["cansaco", "ansiedade", "alegria"]
+    assert sorted(calls) == ["classify", "classify", "classify_batch"]
+    assert metrics.get("llm.classify_batch.single_fallbacks") == 1
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import types
+
+from bot import llm, metrics
+from bot.circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_on_failure_rate_and_closes_after_probe():
+    metrics.reset()
+    clock = Clock()
+    breaker = CircuitBreaker("teste", min_calls=4, failure_rate=0.5, open_seconds=10, clock=clock)
+    for ok in (True, False, True, False):
+        assert breaker.allow()
+        breaker.record_success() if ok else breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.allow() is False
+
+    clock.now = 10
+    assert breaker.allow() is True
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is False
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert metrics.get("teste.state") == 0
+    assert metrics.get("teste.transitions.open") == 1
+    assert metrics.get("teste.short_circuited") == 2
+
+
+def test_failed_probe_reopens():
+    clock = Clock()
+    breaker = CircuitBreaker("teste", min_calls=1, open_seconds=5, clock=clock)
+    breaker.allow()
+    breaker.record_failure()
+    clock.now = 5
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    clock.now = 9
+    assert breaker.allow() is False
+
+
+class FlakyModel:
+    def __init__(self):
+        self.calls = 0
+        self.down = True
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.calls += 1
+        if self.down:
+            raise RuntimeError("503 Service Unavailable")
+        payload = {"emocao_principal": "neutra", "intensidade": 1, "possivel_crise": False, "resposta_empatica": "Oi."}
+        return types.SimpleNamespace(text=json.dumps(payload), usage_metadata=None)
+
+
+def test_open_circuit_short_circuits_to_fallbacks(monkeypatch):
+    clock = Clock()
+    model = FlakyModel()
+    monkeypatch.setattr(llm, "_get_model", lambda call_type: model)
+    monkeypatch.setattr(llm, "_schedulers", llm.weakref.WeakKeyDictionary())
+    monkeypatch.setattr(llm, "_breaker", CircuitBreaker("llm.circuit", min_calls=3, open_seconds=30, clock=clock))
+
+    async def run(count):
+        return [await llm._invoke_json("prompt", "classify") for _ in range(count)]
+
+    assert asyncio.run(run(10)) == [None] * 10
+    assert model.calls == 3
+    assert asyncio.run(llm._invoke_text("prompt")) == ""
+    assert model.calls == 3
+
+    model.down = False
+    clock.now = 30
+    assert asyncio.run(run(1))[0]["emocao_principal"] == "neutra"
+    assert llm._breaker.state == CLOSED
+
+
+def test_local_queue_and_quota_timeouts_do_not_trip_breaker(monkeypatch):
+    metrics.reset()
+
+    class SlowModel:
+        calls = 0
+
+        async def generate_content_async(self, prompt, **kwargs):
+            SlowModel.calls += 1
+            await asyncio.sleep(0.1)
+            return types.SimpleNamespace(text='{"ok": true}', usage_metadata=None)
+
+    monkeypatch.setattr(llm, "_get_model", lambda call_type: SlowModel())
+    monkeypatch.setattr(llm, "_schedulers", llm.weakref.WeakKeyDictionary())
+    monkeypatch.setattr(llm, "_concurrency_limit", 1)
+    monkeypatch.setattr(llm, "LLM_TIMEOUT_SECONDS", 0.15)
+    monkeypatch.setattr(llm, "_breaker", CircuitBreaker("llm.circuit", min_calls=1))
+
+    async def queued():
+        # A vaga única está ocupada por outro aluno: a chamada estoura o prazo ainda na fila
+        scheduler = llm._get_scheduler()
+        await scheduler.acquire("outro")
+        try:
+            return await llm._invoke_json("p", "triage")
+        finally:
+            scheduler.release()
+
+    assert asyncio.run(queued()) is None
+    assert SlowModel.calls == 0
+
+    monkeypatch.setattr(llm, "_rate_limiter", llm.RateLimiter(requests_per_minute=1, tokens_per_minute=0))
+
+    async def over_quota():
+        return [await llm._invoke_json("p", "triage") for _ in range(2)]
+
+    assert asyncio.run(over_quota()) == [{"ok": True}, None]
+    assert SlowModel.calls == 1
+    assert llm._breaker.state == CLOSED
+    assert metrics.get("llm.triage.local_timeouts") == 2
@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+from bot import llm, metrics
+from bot.cache import TTLCache, conversation_key, normalize_text
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _fake_invoke(payloads, calls):
+    async def fake(prompt, call_type, **kwargs):
+        calls.append(prompt)
+        return json.dumps(payloads[min(len(calls), len(payloads)) - 1])
+
+    return fake
+
+
+def test_normalize_text_ignores_case_accents_and_spacing():
+    assert normalize_text("  Estou   CANSADO... ") == normalize_text("estou cansado")
+    assert normalize_text("Não sei") == "nao sei"
+    assert conversation_key("Tudo bem!", ["Olá"]) == conversation_key("tudo bem", ["ola"])
+
+
+def test_ttl_cache_expires_and_evicts_least_recent():
+    metrics.reset()
+    clock = Clock()
+    cache = TTLCache("teste", max_size=2, ttl_seconds=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert metrics.get("cache.teste.evictions") == 1
+
+    clock.now = 11
+    assert cache.get("a") is None
+    assert metrics.get("cache.teste.hits") == 1
+    assert metrics.get("cache.teste.misses") == 2
+
+
+def test_classify_msg_reuses_normalized_result(monkeypatch):
+    calls = []
+    payload = {"emocao_principal": "cansaco", "intensidade": 4, "possivel_crise": False, "resposta_empatica": "Imagino."}
+    monkeypatch.setattr(llm, "_invoke_raw", _fake_invoke([payload], calls))
+    monkeypatch.setattr(llm, "_classify_cache", TTLCache("classify", max_size=8, ttl_seconds=60))
+
+    first = asyncio.run(llm.classify_msg("Estou cansado", []))
+    second = asyncio.run(llm.classify_msg("  estou   cansado. ", []))
+    other_history = asyncio.run(llm.classify_msg("estou cansado", ["oi"]))
+
+    assert first == second == other_history
+    assert len(calls) == 2
+
+
+def test_classify_msg_never_caches_crisis(monkeypatch):
+    calls = []
+    payload = {"emocao_principal": "tristeza", "intensidade": 8, "possivel_crise": True, "resposta_empatica": "Estou aqui."}
+    monkeypatch.setattr(llm, "_invoke_raw", _fake_invoke([payload], calls))
+    monkeypatch.setattr(llm, "_classify_cache", TTLCache("classify", max_size=8, ttl_seconds=60))
+
+    for _ in range(2):
+        assert asyncio.run(llm.classify_msg("não aguento mais", [])).possivel_crise is True
+    assert len(calls) == 2
+    assert len(llm._classify_cache) == 0
+
+
+def test_classify_msg_does_not_cache_empty_response(monkeypatch):
+    calls = []
+    monkeypatch.setattr(llm, "_invoke_raw", _fake_invoke([{}], calls))
+    monkeypatch.setattr(llm, "_classify_cache", TTLCache("classify", max_size=8, ttl_seconds=60))
+
+    for _ in range(2):
+        assert asyncio.run(llm.classify_msg("Estou cansado", [])) == llm.ClassifyOut()
+    assert len(calls) == 2
+    assert len(llm._classify_cache) == 0
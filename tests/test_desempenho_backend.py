@@ -0,0 +1,154 @@
+"""
+Teste de Desempenho - Envio de triagens ao backend
+Mede a responsividade do event loop durante 50 envios concorrentes
+para um servidor stub local, comparando o envio bloqueante (requests)
+com o cliente assíncrono com pool de conexões (BackendClient).
+"""
+
+import sys
+from pathlib import Path
+
+# Ajusta o path para encontrar o módulo bot
+script_path = Path(__file__).resolve()
+project_root = script_path.parent.parent if script_path.parent.name == "tests" else script_path.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+
+import asyncio
+import contextlib
+import io
+import math
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Awaitable, Callable, Dict, List
+
+from bot.backend import BackendClient, send_screening
+
+# Configuração
+CONCURRENT_SUBMISSIONS = 50
+BACKEND_LATENCY_SECONDS = 0.05
+HEARTBEAT_INTERVAL_SECONDS = 0.005
+
+
+class StubBackendHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):  # noqa: N802
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        time.sleep(BACKEND_LATENCY_SECONDS)
+        body = b'{"ok": true}'
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubBackendHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def sample_payload(i: int) -> Dict[str, Any]:
+    return {
+        "nome": f"Estudante Teste {i}",
+        "idade": 20,
+        "matricula": f"2024{str(i).zfill(3)}",
+        "curso": "Informática",
+        "periodo": "3",
+        "phq9_respostas": [1] * 9,
+        "phq9_score": 9,
+        "gad7_respostas": [1] * 7,
+        "gad7_score": 7,
+        "relatorio": "Relatório de teste " * 50,
+    }
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = max(0, min(len(sorted_values) - 1, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+async def heartbeat(stop: asyncio.Event, lags: List[float]) -> None:
+    """Mede o atraso do event loop em relação ao intervalo esperado."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(HEARTBEAT_INTERVAL_SECONDS)
+        lags.append(loop.time() - start - HEARTBEAT_INTERVAL_SECONDS)
+
+
+async def measure(label: str, submit: Callable[[int], Awaitable[bool]]) -> Dict[str, Any]:
+    lags: List[float] = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(heartbeat(stop, lags))
+    await asyncio.sleep(HEARTBEAT_INTERVAL_SECONDS * 2)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(submit(i) for i in range(CONCURRENT_SUBMISSIONS)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await monitor
+    lags_sorted = sorted(lags)
+    return {
+        "modo": label,
+        "sucessos": sum(1 for ok in results if ok),
+        "tempo_total_segundos": elapsed,
+        "heartbeats": len(lags),
+        "atraso_loop_max_ms": max(lags_sorted) * 1000 if lags_sorted else 0,
+        "atraso_loop_p99_ms": percentile(lags_sorted, 0.99) * 1000,
+        "atraso_loop_medio_ms": statistics.mean(lags_sorted) * 1000 if lags_sorted else 0,
+    }
+
+
+async def run_backend_benchmark() -> List[Dict[str, Any]]:
+    server = start_stub_server()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/screenings"
+
+    async def blocking_submit(i: int) -> bool:
+        # Reproduz o comportamento anterior: requests.post direto no handler assíncrono
+        with contextlib.redirect_stdout(io.StringIO()):
+            return send_screening(url, "bench_secret", sample_payload(i))
+
+    client = BackendClient(url, "bench_secret", pool_size=10)
+
+    async def async_submit(i: int) -> bool:
+        return await client.send_screening(sample_payload(i))
+
+    try:
+        results = [
+            await measure("bloqueante (requests)", blocking_submit),
+            await measure("assíncrono (BackendClient)", async_submit),
+        ]
+    finally:
+        await client.aclose()
+        server.shutdown()
+        server.server_close()
+
+    print("=" * 80)
+    print(f"🖥️  ENVIO DE {CONCURRENT_SUBMISSIONS} TRIAGENS CONCORRENTES (latência do stub: {BACKEND_LATENCY_SECONDS * 1000:.0f}ms)")
+    print("=" * 80)
+    for result in results:
+        print(f"\n   {result['modo']}:")
+        print(f"      Sucessos: {result['sucessos']}/{CONCURRENT_SUBMISSIONS}")
+        print(f"      Tempo total: {result['tempo_total_segundos']:.3f}s")
+        print(f"      Heartbeats do loop: {result['heartbeats']}")
+        print(f"      Atraso do loop — máx: {result['atraso_loop_max_ms']:.1f}ms | "
+              f"p99: {result['atraso_loop_p99_ms']:.1f}ms | média: {result['atraso_loop_medio_ms']:.1f}ms")
+    print("\n" + "=" * 80)
+    return results
+
+
+if __name__ == "__main__":
+    asyncio.run(run_backend_benchmark())
@@ -0,0 +1,133 @@
+"""
+Teste de Desempenho - Micro-batching do classify_msg
+Compara vazão e latência p95 do classify_msg com e sem agrupamento em lote
+para 10, 50 e 200 alunos simultâneos na etapa CONVERSA, usando um modelo
+simulado com latência fixa por chamada e custo incremental por conversa.
+"""
+
+import sys
+from pathlib import Path
+
+# Ajusta o path para encontrar o módulo bot
+script_path = Path(__file__).resolve()
+project_root = script_path.parent.parent if script_path.parent.name == "tests" else script_path.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+
+import asyncio
+import json
+import math
+import time
+import types
+from typing import Any, Dict, List
+
+from bot import llm
+from bot.batching import MicroBatcher
+from bot.cache import TTLCache
+from bot.circuit import CircuitBreaker
+
+# Configuração
+CONCURRENT_USERS = [10, 50, 200]
+CALL_LATENCY_SECONDS = 0.8
+PER_ITEM_LATENCY_SECONDS = 0.02
+
+MENSAGENS = [
+    "estou cansado com as provas",
+    "ando ansiosa com o TCC",
+    "tudo tranquilo por aqui",
+    "me sinto sozinho na cidade nova",
+    "dormindo pouco por causa do trabalho",
+]
+
+
+class SimulatedModel:
+    """Responde classify e classify_batch com latência fixa + custo por conversa."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def generate_content_async(self, prompt: str, **kwargs: Any) -> Any:
+        self.calls += 1
+        resultado = {"emocao_principal": "cansaco", "intensidade": 4, "possivel_crise": False, "resposta_empatica": "Imagino."}
+        if prompt.startswith("CONVERSAS (JSON):"):
+            conversas = json.loads(prompt.split("\n", 1)[1].rsplit("\n\n", 1)[0])
+            await asyncio.sleep(CALL_LATENCY_SECONDS + PER_ITEM_LATENCY_SECONDS * len(conversas))
+            payload: Dict[str, Any] = {"resultados": [{"id": c["id"], **resultado} for c in conversas]}
+        else:
+            await asyncio.sleep(CALL_LATENCY_SECONDS + PER_ITEM_LATENCY_SECONDS)
+            payload = resultado
+        return types.SimpleNamespace(text=json.dumps(payload), usage_metadata=None)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = max(0, min(len(sorted_values) - 1, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+def reset_llm_state(model: SimulatedModel, batching: bool) -> None:
+    llm._get_model = lambda call_type: model
+    llm._schedulers = llm.weakref.WeakKeyDictionary()
+    llm._latency = {}
+    llm._breaker = CircuitBreaker("llm.circuit")
+    llm._classify_cache = TTLCache("classify", max_size=0, ttl_seconds=0)
+    llm._settings.classify_batching = batching
+    llm._classify_batcher = MicroBatcher(
+        "llm.classify_batch",
+        llm._classify_batch,
+        llm._classify_single,
+        window_seconds=llm._settings.classify_batch_window_ms / 1000,
+        max_batch=llm._settings.classify_batch_max,
+    )
+
+
+async def measure(users: int, batching: bool) -> Dict[str, Any]:
+    model = SimulatedModel()
+    reset_llm_state(model, batching)
+    latencies: List[float] = []
+
+    async def aluno(i: int) -> bool:
+        start = time.perf_counter()
+        result = await llm.classify_msg(f"{MENSAGENS[i % len(MENSAGENS)]} ({i})", [])
+        latencies.append(time.perf_counter() - start)
+        return result.resposta_empatica == "Imagino."
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(aluno(i) for i in range(users)))
+    elapsed = time.perf_counter() - start
+    ordered = sorted(latencies)
+    return {
+        "usuarios": users,
+        "modo": "com lote" if batching else "sem lote",
+        "sucessos": sum(results),
+        "chamadas_modelo": model.calls,
+        "tempo_total_segundos": elapsed,
+        "vazao_msgs_por_segundo": users / elapsed if elapsed else 0.0,
+        "latencia_p50_segundos": percentile(ordered, 0.50),
+        "latencia_p95_segundos": percentile(ordered, 0.95),
+    }
+
+
+async def run_batching_benchmark() -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = []
+    for users in CONCURRENT_USERS:
+        for batching in (False, True):
+            results.append(await measure(users, batching))
+
+    print("=" * 80)
+    print(f"📦 MICRO-BATCHING DO CLASSIFY_MSG (latência simulada: {CALL_LATENCY_SECONDS * 1000:.0f}ms + "
+          f"{PER_ITEM_LATENCY_SECONDS * 1000:.0f}ms/conversa, concorrência máx. {llm._concurrency_limit})")
+    print("=" * 80)
+    print(f"{'Usuários':>9} | {'Modo':<9} | {'Sucessos':>8} | {'Chamadas':>8} | {'Vazão (msg/s)':>13} | {'p50 (s)':>7} | {'p95 (s)':>7}")
+    print("-" * 80)
+    for r in results:
+        print(f"{r['usuarios']:>9} | {r['modo']:<9} | {r['sucessos']:>8} | {r['chamadas_modelo']:>8} | "
+              f"{r['vazao_msgs_por_segundo']:>13.1f} | {r['latencia_p50_segundos']:>7.2f} | {r['latencia_p95_segundos']:>7.2f}")
+    print("=" * 80)
+    return results
+
+
+if __name__ == "__main__":
+    asyncio.run(run_batching_benchmark())
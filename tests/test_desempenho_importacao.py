@@ -0,0 +1,93 @@
+"""
+Teste de Desempenho - Tempo de importação
+Mede com `python -X importtime` o custo de importar main.py e bot.llm com a
+inicialização adiada do SDK do Gemini, comparando com o custo de carregar o SDK
+no import (comportamento anterior), e o tempo de coleta da suíte de testes.
+"""
+
+import sys
+from pathlib import Path
+
+# Ajusta o path para encontrar o módulo bot
+script_path = Path(__file__).resolve()
+project_root = script_path.parent.parent if script_path.parent.name == "tests" else script_path.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+
+import os
+import statistics
+import subprocess
+import time
+from typing import Any, Dict, List, Tuple
+
+# Configuração
+REPETICOES = 5
+TOP_MODULOS = 8
+SDK = "google.generativeai"
+
+CENARIOS = [
+    ("main.py", "import main"),
+    ("main.py + SDK no import", f"import main, {SDK}"),
+    ("bot.llm", "import bot.llm"),
+    ("bot.llm + SDK no import", f"import bot.llm, {SDK}"),
+]
+COLETA = [
+    ("suíte (coleta)", "import pytest; pytest.main(['--collect-only', '-q', 'tests'])"),
+    ("suíte (coleta) + SDK", f"import {SDK}, pytest; pytest.main(['--collect-only', '-q', 'tests'])"),
+]
+
+ENV = {**os.environ, "TELEGRAM_TOKEN": os.getenv("TELEGRAM_TOKEN", "1:a")}
+
+
+def run_python(code: str, importtime: bool = False) -> Tuple[float, str]:
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    start = time.perf_counter()
+    result = subprocess.run(cmd, cwd=project_root, env=ENV, capture_output=True, text=True)
+    return time.perf_counter() - start, result.stderr
+
+
+def parse_importtime(stderr: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """Soma o acumulado dos imports de primeiro nível e lista os módulos mais caros (em ms)."""
+    total_ms = 0.0
+    modules: List[Tuple[str, float]] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        ms = int(cumulative_us) / 1000
+        # Primeiro nível: um único espaço antes do nome; os aninhados vêm indentados
+        if not name.startswith("  "):
+            total_ms += ms
+        modules.append((name.strip(), ms))
+    return total_ms, sorted(modules, key=lambda item: item[1], reverse=True)[:TOP_MODULOS]
+
+
+def measure(label: str, code: str) -> Dict[str, Any]:
+    walls = [run_python(code)[0] for _ in range(REPETICOES)]
+    _wall, stderr = run_python(code, importtime=True)
+    total_ms, top = parse_importtime(stderr)
+    return {"cenario": label, "processo_ms": statistics.median(walls) * 1000, "importtime_ms": total_ms, "top": top}
+
+
+def run_import_benchmark() -> List[Dict[str, Any]]:
+    results = [measure(label, code) for label, code in CENARIOS + COLETA]
+
+    print("=" * 80)
+    print(f"⏱️  TEMPO DE IMPORTAÇÃO (mediana de {REPETICOES} processos)")
+    print("=" * 80)
+    print(f"{'Cenário':<28} | {'Processo (ms)':>13} | {'importtime (ms)':>15}")
+    print("-" * 80)
+    for r in results:
+        print(f"{r['cenario']:<28} | {r['processo_ms']:>13.0f} | {r['importtime_ms']:>15.0f}")
+    print("-" * 80)
+    for r in results[:2]:
+        print(f"Imports mais caros em {r['cenario']}:")
+        for name, ms in r["top"]:
+            print(f"   {name:<40} {ms:>8.1f} ms")
+    print("=" * 80)
+    return results
+
+
+if __name__ == "__main__":
+    run_import_benchmark()
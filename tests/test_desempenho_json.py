@@ -0,0 +1,109 @@
+"""
+Teste de Desempenho - Extração de JSON das respostas do modelo
+Compara a extração antiga (regex cercado + regex guloso + json.loads + validação
+do dict) com o scanner de passada única validando direto no modelo, em respostas
+normais, grandes, adversariais (muitas chaves sem fechamento) e malformadas.
+"""
+
+import sys
+from pathlib import Path
+
+# Ajusta o path para encontrar o módulo bot
+script_path = Path(__file__).resolve()
+project_root = script_path.parent.parent if script_path.parent.name == "tests" else script_path.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+
+import json
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import ValidationError
+
+from bot import llm, metrics
+from bot.models import ClassifyOut, TriageOut
+
+# Configuração
+REPETICOES = 20
+
+CLASSIFY = {"emocao_principal": "tristeza", "intensidade": 6, "possivel_crise": False, "resposta_empatica": "Sinto muito. {Estou} aqui."}
+TRIAGE = {
+    "nivel_urgencia": "media",
+    "fatores_protecao": ["apoio familiar", "busca de ajuda"],
+    "impacto_funcional": ["queda no rendimento"],
+    "sinais_depressao": ["humor deprimido", "anedonia"],
+    "sinais_ansiedade": ["preocupação excessiva"],
+}
+PROSA = "O aluno relata cansaço e dificuldade de concentração nas últimas semanas. " * 2000
+
+CASOS = {
+    "classify normal": (ClassifyOut, json.dumps(CLASSIFY, ensure_ascii=False)),
+    "triage cercado": (TriageOut, f"Segue a análise:\n```json\n{json.dumps(TRIAGE, ensure_ascii=False)}\n```\n"),
+    "triage grande (~150KB)": (TriageOut, f"{PROSA}\n{json.dumps(TRIAGE, ensure_ascii=False)}\n{PROSA}"),
+    "chaves sem fechar (20k)": (ClassifyOut, "{" * 20000),
+    "vírgula sobrando": (TriageOut, json.dumps(TRIAGE, ensure_ascii=False)[:-1] + ",}"),
+    "truncado": (ClassifyOut, json.dumps(CLASSIFY, ensure_ascii=False)[:-20]),
+}
+
+_FENCED = re.compile(r"```(?:json)?\s*(\{.*?\})```", re.DOTALL | re.IGNORECASE)
+_GREEDY = re.compile(r"\{.*\}", re.DOTALL)
+
+
+def extracao_antiga(model: Any, text: str) -> Optional[Any]:
+    """Caminho anterior: regex cercado, depois regex guloso, json.loads e validação do dict."""
+    fenced = _FENCED.search(text)
+    if fenced:
+        block = fenced.group(1)
+    else:
+        match = _GREEDY.search(text)
+        if match is None:
+            # Virava "{}" e, em silêncio, o modelo padrão
+            return None
+        block = match.group(0)
+    try:
+        return model.model_validate(json.loads(block))
+    except (ValueError, ValidationError):
+        return None
+
+
+def extracao_nova(model: Any, text: str) -> Optional[Any]:
+    return llm._parse_output(model, text, "benchmark")
+
+
+def medir(func: Callable[[Any, str], Optional[Any]], model: Any, text: str) -> Dict[str, Any]:
+    result = func(model, text)
+    start = time.perf_counter()
+    for _ in range(REPETICOES):
+        func(model, text)
+    elapsed = time.perf_counter() - start
+    return {"us_por_chamada": elapsed / REPETICOES * 1e6, "ok": result is not None}
+
+
+def run_json_benchmark() -> List[Dict[str, Any]]:
+    metrics.reset()
+    results: List[Dict[str, Any]] = []
+    for nome, (model, text) in CASOS.items():
+        antiga = medir(extracao_antiga, model, text)
+        nova = medir(extracao_nova, model, text)
+        results.append({"caso": nome, "tamanho": len(text), "antiga": antiga, "nova": nova})
+
+    print("=" * 88)
+    print(f"🧩 EXTRAÇÃO DE JSON DAS RESPOSTAS ({REPETICOES} repetições por caso)")
+    print("=" * 88)
+    print(f"{'Caso':<24} | {'Tamanho':>8} | {'Antiga (µs)':>11} | {'OK':>3} | {'Nova (µs)':>10} | {'OK':>3} | {'Ganho':>7}")
+    print("-" * 88)
+    for r in results:
+        antiga, nova = r["antiga"], r["nova"]
+        ganho = antiga["us_por_chamada"] / nova["us_por_chamada"] if nova["us_por_chamada"] else 0.0
+        print(f"{r['caso']:<24} | {r['tamanho']:>8} | {antiga['us_por_chamada']:>11.1f} | {'sim' if antiga['ok'] else 'não':>3} | "
+              f"{nova['us_por_chamada']:>10.1f} | {'sim' if nova['ok'] else 'não':>3} | {ganho:>6.1f}x")
+    print("-" * 88)
+    print(f"Reparadas: {metrics.get('llm.benchmark.json_repaired')} | Padrão: {metrics.get('llm.benchmark.json_defaulted')}")
+    print("=" * 88)
+    return results
+
+
+if __name__ == "__main__":
+    run_json_benchmark()
@@ -0,0 +1,159 @@
+"""
+Teste de Desempenho - Saída estruturada com response_schema
+Compara taxa de respostas reparadas/descartadas (modelo padrão) e tempo de
+leitura entre respostas gravadas no modo apenas `application/json` e no modo
+com `response_schema` derivado dos modelos pydantic.
+
+Com GEMINI_API_KEY definida, também mede ao vivo a latência (p50/p95) e a
+taxa de descarte de chamadas classify nos dois modos.
+"""
+
+import sys
+from pathlib import Path
+
+# Ajusta o path para encontrar o módulo bot
+script_path = Path(__file__).resolve()
+project_root = script_path.parent.parent if script_path.parent.name == "tests" else script_path.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+
+import asyncio
+import math
+import os
+import time
+from typing import Any, Dict, List, Tuple
+
+from bot import llm, metrics
+from bot.models import ClassifyOut, TriageOut, response_schema
+from bot.prompt_builder import build_classify_prompt
+from bot.prompts import CLASSIFY_PROMPT
+
+# Configuração
+REPETICOES = 200
+CHAMADAS_AO_VIVO = 20
+
+# Respostas gravadas no modo apenas application/json: o formato deriva com frequência
+GRAVADAS_SEM_SCHEMA: List[Tuple[Any, str]] = [
+    (ClassifyOut, '{"emocao_principal":"cansaco","intensidade":4,"possivel_crise":false,"resposta_empatica":"Imagino o peso."}'),
+    (ClassifyOut, 'Claro! Aqui está:\n```json\n{"emocao_principal":"ansiedade","intensidade":6,"possivel_crise":false,"resposta_empatica":"Respira."}\n```'),
+    (ClassifyOut, '{"emocao_principal":"medo","intensidade":7,"possivel_crise":false,"resposta_empatica":"Estou aqui."}'),
+    (ClassifyOut, '{"emocao_principal":"tristeza","intensidade":"alta","possivel_crise":false,"resposta_empatica":"Sinto muito."}'),
+    (ClassifyOut, '{"emocao_principal":"tristeza","intensidade":5,"possivel_crise":"não","resposta_empatica":"Sinto muito."}'),
+    (ClassifyOut, '{"emocao_principal":"raiva","intensidade":5,"possivel_crise":false,"resposta_empatica":"Faz sentido.",}'),
+    (ClassifyOut, '{"emocao_principal":"tristeza","intensidade":8,"possivel_crise":true,"resposta_empatica":"Você não está so'),
+    (TriageOut, '{"nivel_urgencia":"media","fatores_protecao":["família"],"sinais_depressao":["anedonia"],"sinais_ansiedade":[]}'),
+    (TriageOut, '{"nivel_urgencia":"moderada","fatores_protecao":[],"sinais_depressao":["humor deprimido"]}'),
+    (TriageOut, 'Análise:\n{"nivel_urgencia":"alta","sinais_depressao":["ideação"],"impacto_funcional":["faltas"],}'),
+]
+
+# Respostas gravadas com response_schema: enums e tipos respeitados, limites numéricos não
+GRAVADAS_COM_SCHEMA: List[Tuple[Any, str]] = [
+    (ClassifyOut, '{"emocao_principal":"cansaco","intensidade":4,"possivel_crise":false,"resposta_empatica":"Imagino o peso."}'),
+    (ClassifyOut, '{"emocao_principal":"ansiedade","intensidade":6,"possivel_crise":false,"resposta_empatica":"Respira."}'),
+    (ClassifyOut, '{"emocao_principal":"ansiedade","intensidade":7,"possivel_crise":false,"resposta_empatica":"Estou aqui."}'),
+    (ClassifyOut, '{"emocao_principal":"tristeza","intensidade":8,"possivel_crise":false,"resposta_empatica":"Sinto muito."}'),
+    (ClassifyOut, '{"emocao_principal":"tristeza","intensidade":5,"possivel_crise":false,"resposta_empatica":"Sinto muito."}'),
+    (ClassifyOut, '{"emocao_principal":"raiva","intensidade":5,"possivel_crise":false,"resposta_empatica":"Faz sentido."}'),
+    (ClassifyOut, '{"emocao_principal":"tristeza","intensidade":12,"possivel_crise":true,"resposta_empatica":"Você não está só."}'),
+    (TriageOut, '{"nivel_urgencia":"media","fatores_protecao":["família"],"impacto_funcional":[],"sinais_depressao":["anedonia"],"sinais_ansiedade":[]}'),
+    (TriageOut, '{"nivel_urgencia":"media","fatores_protecao":[],"impacto_funcional":[],"sinais_depressao":["humor deprimido"],"sinais_ansiedade":[]}'),
+    (TriageOut, '{"nivel_urgencia":"alta","fatores_protecao":[],"impacto_funcional":["faltas"],"sinais_depressao":["ideação"],"sinais_ansiedade":[]}'),
+]
+
+MENSAGENS = [
+    "estou cansado com as provas",
+    "ando com medo de não conseguir me formar",
+    "tô puto com meu orientador",
+    "não consigo dormir direito faz uma semana",
+    "hoje foi um dia bom",
+]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = max(0, min(len(sorted_values) - 1, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+def medir_gravadas(nome: str, gravadas: List[Tuple[Any, str]]) -> Dict[str, Any]:
+    metrics.reset()
+    call_type = f"benchmark_{'schema' if 'com' in nome else 'json'}"
+    descartadas = sum(llm._parse_output(model, text, call_type) is None for model, text in gravadas)
+    reparadas = metrics.get(f"llm.{call_type}.json_repaired")
+    start = time.perf_counter()
+    for _ in range(REPETICOES):
+        for model, text in gravadas:
+            llm._parse_output(model, text, call_type)
+    elapsed = time.perf_counter() - start
+    return {
+        "modo": nome,
+        "respostas": len(gravadas),
+        "reparadas": reparadas,
+        "descartadas": descartadas,
+        "us_por_resposta": elapsed / (REPETICOES * len(gravadas)) * 1e6,
+    }
+
+
+async def medir_ao_vivo(nome: str, generation_config: Dict[str, Any]) -> Dict[str, Any]:
+    import google.generativeai as genai
+
+    genai.configure(api_key=os.environ["GEMINI_API_KEY"])
+    model = genai.GenerativeModel(llm.GEMINI_MODEL, system_instruction=CLASSIFY_PROMPT, generation_config=generation_config)
+    latencies: List[float] = []
+    descartadas = 0
+    for i in range(CHAMADAS_AO_VIVO):
+        prompt = build_classify_prompt(MENSAGENS[i % len(MENSAGENS)], [])
+        start = time.perf_counter()
+        try:
+            response = await model.generate_content_async(prompt)
+            text = response.text
+        except Exception:  # pylint: disable=broad-except
+            text = ""
+        latencies.append(time.perf_counter() - start)
+        descartadas += llm._parse_output(ClassifyOut, text, "benchmark_ao_vivo") is None
+    ordered = sorted(latencies)
+    return {
+        "modo": nome,
+        "chamadas": CHAMADAS_AO_VIVO,
+        "descartadas": descartadas,
+        "p50": percentile(ordered, 0.50),
+        "p95": percentile(ordered, 0.95),
+    }
+
+
+async def run_schema_benchmark() -> Dict[str, Any]:
+    gravadas = [
+        medir_gravadas("sem schema", GRAVADAS_SEM_SCHEMA),
+        medir_gravadas("com schema", GRAVADAS_COM_SCHEMA),
+    ]
+    print("=" * 80)
+    print("📐 SAÍDA ESTRUTURADA: RESPOSTAS GRAVADAS")
+    print("=" * 80)
+    print(f"{'Modo':<12} | {'Respostas':>9} | {'Reparadas':>9} | {'Descartadas':>11} | {'Taxa descarte':>13} | {'µs/resposta':>11}")
+    print("-" * 80)
+    for r in gravadas:
+        taxa = r["descartadas"] / r["respostas"] * 100
+        print(f"{r['modo']:<12} | {r['respostas']:>9} | {r['reparadas']:>9} | {r['descartadas']:>11} | {taxa:>12.0f}% | {r['us_por_resposta']:>11.1f}")
+    print("=" * 80)
+
+    ao_vivo: List[Dict[str, Any]] = []
+    if os.getenv("GEMINI_API_KEY"):
+        ao_vivo = [
+            await medir_ao_vivo("sem schema", llm.JSON_CONFIG),
+            await medir_ao_vivo("com schema", {**llm.JSON_CONFIG, "response_schema": response_schema(ClassifyOut)}),
+        ]
+        print(f"🌐 AO VIVO ({llm.GEMINI_MODEL}, {CHAMADAS_AO_VIVO} chamadas classify por modo)")
+        print("-" * 80)
+        print(f"{'Modo':<12} | {'Descartadas':>11} | {'p50 (s)':>8} | {'p95 (s)':>8}")
+        for r in ao_vivo:
+            print(f"{r['modo']:<12} | {r['descartadas']:>11} | {r['p50']:>8.2f} | {r['p95']:>8.2f}")
+        print("=" * 80)
+    else:
+        print("ℹ️  Defina GEMINI_API_KEY para medir latência ao vivo nos dois modos.")
+    return {"gravadas": gravadas, "ao_vivo": ao_vivo}
+
+
+if __name__ == "__main__":
+    asyncio.run(run_schema_benchmark())
@@ -0,0 +1,144 @@
+"""
+Teste de Desempenho - Store de sessões compartilhado
+Mede o custo extra por update de ler e gravar a sessão no SessionStore:
+backend em memória e servidor de chave-valor local (processo separado, TCP),
+com o mesmo processo atendendo o aluno (leitura sem payload), com processos
+alternando (leitura completa + decodificação) e updates sem mudança na sessão.
+"""
+
+import sys
+from pathlib import Path
+
+# Ajusta o path para encontrar o módulo bot
+script_path = Path(__file__).resolve()
+project_root = script_path.parent.parent if script_path.parent.name == "tests" else script_path.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+
+import asyncio
+import math
+import socket
+import subprocess
+import time
+from typing import Any, Dict, List, Optional
+
+from bot.session_store import MemoryKV, RemoteKV, SessionStore, StoredSession
+from bot.states import ConversationState
+
+# Configuração
+ALUNOS = 200
+UPDATES_POR_ALUNO = 10
+CONCORRENCIA = 64
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = max(0, min(len(sorted_values) - 1, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+def porta_livre() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def iniciar_servidor(port: int) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "bot.kv_server", "--port", str(port)],
+        cwd=project_root,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            _reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return proc
+        except OSError:
+            await asyncio.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("servidor de sessões não subiu")
+
+
+async def um_update(
+    workers: List[SessionStore], caches: List[Dict[int, StoredSession]], user_id: int, i: int, muda: bool
+) -> float:
+    """Carrega, altera como um handler faria e grava; devolve o tempo gasto no store."""
+    idx = i % len(workers)
+    store, cache = workers[idx], caches[idx]
+    start = time.perf_counter()
+    stored = await store.load(user_id, cache.get(user_id))
+    elapsed = time.perf_counter() - start
+    if muda:
+        stored.session.history.append(f"mensagem {i} do aluno {user_id} sobre a semana")
+        stored.session.personal_data.setdefault("nome", "Maria da Silva")
+    start = time.perf_counter()
+    cache[user_id] = await store.save(user_id, stored, stored.session, ConversationState.CONVERSA)
+    return elapsed + time.perf_counter() - start
+
+
+async def medir(nome: str, workers: List[SessionStore], muda: bool = True, offset: int = 0) -> Dict[str, Any]:
+    caches: List[Dict[int, StoredSession]] = [{} for _ in workers]
+    latencias: List[float] = []
+    for i in range(UPDATES_POR_ALUNO):
+        for user_id in range(offset, offset + ALUNOS):
+            latencias.append(await um_update(workers, caches, user_id, i, muda))
+    ordenadas = sorted(latencias)
+
+    # Vazão com vários alunos ao mesmo tempo (um update por vez por aluno, como no processador)
+    async def aluno(user_id: int) -> None:
+        for i in range(UPDATES_POR_ALUNO):
+            await um_update(workers, caches, user_id, i, muda)
+
+    sem = asyncio.Semaphore(CONCORRENCIA)
+
+    async def limitado(user_id: int) -> None:
+        async with sem:
+            await aluno(user_id)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(limitado(user_id) for user_id in range(offset, offset + ALUNOS)))
+    vazao = ALUNOS * UPDATES_POR_ALUNO / (time.perf_counter() - start)
+    return {
+        "cenario": nome,
+        "p50_us": percentile(ordenadas, 0.50) * 1e6,
+        "p99_us": percentile(ordenadas, 0.99) * 1e6,
+        "vazao": vazao,
+    }
+
+
+async def run_session_store_benchmark() -> List[Dict[str, Any]]:
+    port = porta_livre()
+    proc: Optional[subprocess.Popen] = await iniciar_servidor(port)
+    try:
+        memoria = SessionStore(MemoryKV())
+        kv_a = SessionStore(RemoteKV("127.0.0.1", port, pool_size=CONCORRENCIA))
+        kv_b = SessionStore(RemoteKV("127.0.0.1", port, pool_size=CONCORRENCIA))
+        resultados = [
+            await medir("memória", [memoria]),
+            await medir("kv, mesmo processo", [kv_a], offset=10_000),
+            await medir("kv, processos alternando", [kv_a, kv_b], offset=20_000),
+            await medir("kv, update sem mudança", [kv_a], muda=False, offset=10_000),
+        ]
+        await kv_a.close()
+        await kv_b.close()
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    print("=" * 80)
+    print(f"🔁 STORE DE SESSÕES: {ALUNOS} alunos × {UPDATES_POR_ALUNO} updates (load + save por update)")
+    print("=" * 80)
+    print(f"{'Cenário':<26} | {'p50 (µs)':>9} | {'p99 (µs)':>9} | {f'updates/s ({CONCORRENCIA} alunos)':>24}")
+    print("-" * 80)
+    for r in resultados:
+        print(f"{r['cenario']:<26} | {r['p50_us']:>9.0f} | {r['p99_us']:>9.0f} | {r['vazao']:>24.0f}")
+    print("=" * 80)
+    return resultados
+
+
+if __name__ == "__main__":
+    asyncio.run(run_session_store_benchmark())
@@ -0,0 +1,126 @@
+"""
+Teste de Desempenho - Persistência de sessões em SQLite
+Mede o custo de gravar em lote as sessões de 1.000 alunos ativos (cópia feita
+pelo Application + uma transação) contra gravar uma transação por mensagem, e o
+tempo de carga na inicialização com 100.000 sessões armazenadas.
+"""
+
+import sys
+from pathlib import Path
+
+# Ajusta o path para encontrar o módulo bot
+script_path = Path(__file__).resolve()
+project_root = script_path.parent.parent if script_path.parent.name == "tests" else script_path.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+
+import copy
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from bot.persistence import SQLitePersistence
+from bot.session import SessionData
+from bot.states import ConversationState
+
+# Configuração
+ALUNOS_ATIVOS = 1_000
+REPETICOES = 10
+SESSOES_ARMAZENADAS = 100_000
+LOTE_CARGA = 10_000
+
+
+def sessao(user_id: int) -> SessionData:
+    return SessionData(
+        user_id=user_id,
+        personal_data={
+            "nome": "Maria da Silva",
+            "idade": "21",
+            "telefone": "92999999999",
+            "matricula": f"2024{user_id:06d}",
+            "curso": "Engenharia de Software",
+            "periodo": "5",
+        },
+        phq9_answers=[1, 2, 1, 0, 2, 1, 1, 0, 0],
+        gad7_answers=[2, 1, 1, 0, 1, 2],
+        free_text=["ando muito cansado com as provas", "não consigo dormir direito"],
+        history=[f"mensagem {i} do aluno sobre a semana" for i in range(10)],
+        triage_result={"nivel_urgencia": "media", "sinais_depressao": ["anedonia"], "fatores_protecao": ["família"]},
+        phq9_started=True,
+        triage_active=True,
+    )
+
+
+def medir_flush(path: Path) -> Dict[str, Any]:
+    persistence = SQLitePersistence(path)
+    user_data = {user_id: {"session": sessao(user_id)} for user_id in range(ALUNOS_ATIVOS)}
+    conversas = {("triagem", f"[{u}, {u}]"): ConversationState.GAD7 for u in range(ALUNOS_ATIVOS)}
+
+    copia, gravacao = [], []
+    for _ in range(REPETICOES):
+        start = time.perf_counter()
+        # Application.update_persistence faz deepcopy de cada user_data sujo
+        lote = {user_id: copy.deepcopy(data) for user_id, data in user_data.items()}
+        copia.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        persistence.write_batch(lote, conversas)
+        gravacao.append(time.perf_counter() - start)
+
+    # Referência: uma transação por mensagem, como seria gravar a cada update
+    start = time.perf_counter()
+    for user_id, data in user_data.items():
+        persistence.write_batch({user_id: data}, {("triagem", f"[{user_id}, {user_id}]"): ConversationState.GAD7})
+    por_mensagem = time.perf_counter() - start
+    persistence.close()
+    return {
+        "copia_ms": statistics.median(copia) * 1000,
+        "gravacao_ms": statistics.median(gravacao) * 1000,
+        "por_mensagem_ms": por_mensagem * 1000,
+    }
+
+
+def medir_carga(path: Path, limites: List[int]) -> List[Dict[str, Any]]:
+    persistence = SQLitePersistence(path)
+    for inicio in range(0, SESSOES_ARMAZENADAS, LOTE_CARGA):
+        persistence.write_batch({u: {"session": sessao(u)} for u in range(inicio, inicio + LOTE_CARGA)}, {})
+    persistence.close()
+
+    resultados = []
+    for limite in limites:
+        persistence = SQLitePersistence(path, max_loaded=limite)
+        start = time.perf_counter()
+        carregadas = persistence.load_user_data()
+        elapsed = time.perf_counter() - start
+        persistence.close()
+        resultados.append({"limite": limite, "carregadas": len(carregadas), "segundos": elapsed})
+    return resultados
+
+
+def run_sessions_benchmark() -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        flush = medir_flush(Path(tmp) / "flush.sqlite3")
+        carga = medir_carga(Path(tmp) / "carga.sqlite3", [20_000, SESSOES_ARMAZENADAS])
+        tamanho_mb = (Path(tmp) / "carga.sqlite3").stat().st_size / 1e6
+
+    total = flush["copia_ms"] + flush["gravacao_ms"]
+    print("=" * 80)
+    print(f"💾 GRAVAÇÃO EM LOTE: {ALUNOS_ATIVOS} alunos ativos (mediana de {REPETICOES} lotes)")
+    print("=" * 80)
+    print(f"Cópia do user_data (Application):   {flush['copia_ms']:>8.1f} ms")
+    print(f"Transação única (SQLite WAL):       {flush['gravacao_ms']:>8.1f} ms")
+    print(f"Total por lote de {ALUNOS_ATIVOS}:              {total:>8.1f} ms  ({total / ALUNOS_ATIVOS * 1000:.0f} µs/aluno)")
+    print(f"Uma transação por mensagem:         {flush['por_mensagem_ms']:>8.1f} ms")
+    print("-" * 80)
+    print(f"📂 CARGA NA INICIALIZAÇÃO: {SESSOES_ARMAZENADAS} sessões armazenadas ({tamanho_mb:.0f} MB)")
+    print("-" * 80)
+    print(f"{'SESSION_MAX_LOADED':>18} | {'Carregadas':>10} | {'Tempo (s)':>9}")
+    for r in carga:
+        print(f"{r['limite']:>18} | {r['carregadas']:>10} | {r['segundos']:>9.2f}")
+    print("=" * 80)
+    return {"flush": flush, "carga": carga}
+
+
+if __name__ == "__main__":
+    run_sessions_benchmark()
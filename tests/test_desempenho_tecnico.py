@@ -21,7 +21,7 @@ from typing import Dict, List, Any
 import statistics
 import random
 
-from bot.llm import classify_msg, triage_summary, gen_report_text
+from bot.llm import classify_msg, triage_summary, gen_report_text, triage_and_report
 from bot.backend import send_screening
 from bot.instruments import phq9_score, gad7_score, phq9_bucket, gad7_bucket
 from bot.config import get_settings
@@ -131,7 +131,7 @@ async def measure_emotional_analysis(
             "error": str(e)
         }
 
-async def measure_report_generation(contexto: str) -> Dict[str, Any]:
+async def measure_report_generation(contexto: Dict) -> Dict[str, Any]:
     """Mede tempo de geração de relatório técnico (10-15 segundos)"""
     start = time.time()
     try:
@@ -150,6 +150,31 @@ async def measure_report_generation(contexto: str) -> Dict[str, Any]:
             "error": str(e)
         }
 
+async def measure_combined_generation(test_case: Dict, contexto: Dict) -> Dict[str, Any]:
+    """Mede análise + relatório em uma única chamada estruturada (modo combinado)"""
+    start = time.time()
+    try:
+        triage, report = await triage_and_report(
+            test_case["dados_pessoais"],
+            test_case["phq9"],
+            test_case["gad7"],
+            test_case["texto_livre"],
+            contexto,
+        )
+        elapsed = time.time() - start
+        return {
+            "success": bool(report),
+            "time_seconds": elapsed,
+            "nivel_urgencia": triage.nivel_urgencia,
+            "length": len(report)
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "time_seconds": time.time() - start,
+            "error": str(e)
+        }
+
 def measure_backend_processing(payload: Dict) -> Dict[str, Any]:
     """Mede tempo de resposta do backend (<1 segundo)"""
     settings = get_settings()
@@ -250,21 +275,27 @@ async def execute_complete_triage(test_case: Dict) -> Dict[str, Any]:
         result["metrics"]["emotional_analysis"] = emotional_analysis
         
         # 5. Preparar contexto para relatório
-        contexto_json = json.dumps({
+        contexto_base = {
             "nome": test_case["dados_pessoais"]["nome"],
             "matricula": test_case["dados_pessoais"]["matricula"],
             "data": datetime.now().strftime("%d/%m/%Y"),
             "disponibilidade": "Segunda às 15h",
-            "phq9": phq9_score_val,
-            "classificacao_phq9": phq9_level,
-            "gad7": gad7_score_val,
-            "classificacao_gad7": gad7_level,
+            "phq9_score": phq9_score_val,
+            "phq9_classificacao": phq9_level,
+            "gad7_score": gad7_score_val,
+            "gad7_classificacao": gad7_level,
             "classificacao_geral": phq9_level if phq9_score_val >= gad7_score_val else gad7_level,
+            "phq9_respostas": test_case["phq9"],
+            "gad7_respostas": test_case["gad7"],
+            "relatos_livres": test_case["texto_livre"][-6:],
+        }
+        contexto_relatorio = {
+            **contexto_base,
             "triage": emotional_analysis.get("result", {}).__dict__ if hasattr(emotional_analysis.get("result"), "__dict__") else {}
-        })
+        }
         
-        # 6. Medir geração de relatório técnico (10-15 segundos)
-        report_generation = await measure_report_generation(contexto_json)
+        # 6. Medir geração de relatório técnico (apenas seções 2 e 3 vêm do modelo)
+        report_generation = await measure_report_generation(contexto_relatorio)
         result["metrics"]["report_generation"] = report_generation
         
         # 7. Preparar payload para backend
@@ -305,7 +336,11 @@ async def execute_complete_triage(test_case: Dict) -> Dict[str, Any]:
             }
         }
         
-        # 10. Status
+        # 10. Medir modo combinado (análise + relatório em uma única chamada)
+        combined_generation = await measure_combined_generation(test_case, contexto_base)
+        result["metrics"]["combined_generation"] = combined_generation
+        
+        # 11. Status
         all_success = (
             emotional_analysis["success"] and
             report_generation["success"] and
@@ -410,6 +445,18 @@ async def run_performance_tests():
         for r in successful if "metrics" in r and "total_processing" in r["metrics"]
     ]
     
+    two_call_times = [
+        r["metrics"]["total_processing"]["breakdown"]["emotional_analysis"]
+        + r["metrics"]["total_processing"]["breakdown"]["report_generation"]
+        for r in successful if "metrics" in r and "total_processing" in r["metrics"]
+    ]
+    
+    combined_times = [
+        r["metrics"]["combined_generation"]["time_seconds"]
+        for r in successful
+        if "metrics" in r and r["metrics"].get("combined_generation", {}).get("success")
+    ]
+    
     realtime_times = []
     for r in all_results:
         if "metrics" in r and "realtime_analysis" in r["metrics"]:
@@ -462,6 +509,21 @@ async def run_performance_tests():
                 "media_segundos": statistics.mean(total_processing_times) if total_processing_times else 0,
                 "range": f"{min(total_processing_times):.1f} - {max(total_processing_times):.1f} segundos" if total_processing_times else "N/A"
             },
+            "comparativo_modos_ia": {
+                "duas_chamadas": {
+                    "min_segundos": min(two_call_times) if two_call_times else 0,
+                    "max_segundos": max(two_call_times) if two_call_times else 0,
+                    "media_segundos": statistics.mean(two_call_times) if two_call_times else 0,
+                    "range": f"{min(two_call_times):.1f} - {max(two_call_times):.1f} segundos" if two_call_times else "N/A"
+                },
+                "chamada_unica": {
+                    "min_segundos": min(combined_times) if combined_times else 0,
+                    "max_segundos": max(combined_times) if combined_times else 0,
+                    "media_segundos": statistics.mean(combined_times) if combined_times else 0,
+                    "range": f"{min(combined_times):.1f} - {max(combined_times):.1f} segundos" if combined_times else "N/A",
+                    "sucessos": len(combined_times)
+                }
+            },
             "analise_emocional_tempo_real": {
                 "min_segundos": min(realtime_times) if realtime_times else 0,
                 "max_segundos": max(realtime_times) if realtime_times else 0,
@@ -475,7 +537,7 @@ async def run_performance_tests():
     # Salvar relatório
     filename = f"desempenho_tecnico_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
     with open(filename, "w", encoding="utf-8") as f:
-        json.dump(report, f, indent=2, ensure_ascii=False)
+        json.dump(report, f, indent=2, ensure_ascii=False, default=lambda o: o.model_dump() if hasattr(o, "model_dump") else str(o))
     
     # Imprimir resumo formatado
     print("="*80)
@@ -510,6 +572,12 @@ async def run_performance_tests():
     print(f"      {report['performance_metrics']['tempo_total_processamento']['range']}")
     print(f"      Média: {report['performance_metrics']['tempo_total_processamento']['media_segundos']:.2f}s")
     
+    comparativo = report['performance_metrics']['comparativo_modos_ia']
+    print(f"\n   🔀 Análise + relatório: duas chamadas vs chamada única:")
+    print(f"      {'Modo':<18}{'Faixa':<28}{'Média':>8}")
+    print(f"      {'Duas chamadas':<18}{comparativo['duas_chamadas']['range']:<28}{comparativo['duas_chamadas']['media_segundos']:>7.2f}s")
+    print(f"      {'Chamada única':<18}{comparativo['chamada_unica']['range']:<28}{comparativo['chamada_unica']['media_segundos']:>7.2f}s")
+    
     print(f"\n   💬 Análise emocional em tempo real (por mensagem):")
     print(f"      {report['performance_metrics']['analise_emocional_tempo_real']['range']}")
     print(f"      Média: {report['performance_metrics']['analise_emocional_tempo_real']['media_segundos']:.2f}s")
@@ -0,0 +1,132 @@
+"""
+Teste de Desempenho - Modo webhook
+Sobe o servidor aiohttp do webhook em 127.0.0.1, envia updates sintéticos do
+Telegram em paralelo e mede vazão (req/s) e latência de confirmação (p50/p99).
+Um consumidor esvazia a fila da Application, como o processamento assíncrono
+faria em produção.
+"""
+
+import sys
+from pathlib import Path
+
+# Ajusta o path para encontrar o módulo bot
+script_path = Path(__file__).resolve()
+project_root = script_path.parent.parent if script_path.parent.name == "tests" else script_path.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+
+import asyncio
+import math
+import time
+from typing import Any, Dict, List
+
+import aiohttp
+from aiohttp import web
+from telegram.ext import ApplicationBuilder
+
+from bot.webhook import SECRET_HEADER, build_webhook_app
+
+# Configuração
+HOST = "127.0.0.1"
+PORT = 8089
+PATH = "/telegram"
+SECRET = "segredo-benchmark"
+TOTAL_REQUISICOES = 5000
+CONCORRENCIAS = [1, 16, 64]
+USUARIOS = 500
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = max(0, min(len(sorted_values) - 1, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+def synthetic_update(update_id: int) -> Dict[str, Any]:
+    user_id = 1000 + update_id % USUARIOS
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1700000000,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Aluno"},
+            "text": "ando muito cansado com as provas",
+        },
+    }
+
+
+async def drain(queue: "asyncio.Queue[Any]", counter: List[int]) -> None:
+    while True:
+        await queue.get()
+        counter[0] += 1
+
+
+async def measure(concurrency: int) -> Dict[str, Any]:
+    application = ApplicationBuilder().token("123:abc").updater(None).build()
+    runner = web.AppRunner(build_webhook_app(application, path=PATH, secret_token=SECRET), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, HOST, PORT).start()
+    processed = [0]
+    consumer = asyncio.create_task(drain(application.update_queue, processed))
+
+    url = f"http://{HOST}:{PORT}{PATH}"
+    headers = {SECRET_HEADER: SECRET}
+    latencies: List[float] = []
+    failures = 0
+    next_id = iter(range(TOTAL_REQUISICOES))
+
+    async def worker(session: aiohttp.ClientSession) -> None:
+        nonlocal failures
+        for update_id in next_id:
+            start = time.perf_counter()
+            async with session.post(url, json=synthetic_update(update_id), headers=headers) as response:
+                await response.read()
+                if response.status != 200:
+                    failures += 1
+            latencies.append(time.perf_counter() - start)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    while processed[0] < TOTAL_REQUISICOES - failures:
+        await asyncio.sleep(0.01)
+    consumer.cancel()
+    await asyncio.gather(consumer, return_exceptions=True)
+    await runner.cleanup()
+
+    ordered = sorted(latencies)
+    return {
+        "concorrencia": concurrency,
+        "req_s": TOTAL_REQUISICOES / elapsed,
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "falhas": failures,
+        "processados": processed[0],
+    }
+
+
+async def run_webhook_benchmark() -> List[Dict[str, Any]]:
+    results = [await measure(concurrency) for concurrency in CONCORRENCIAS]
+
+    print("=" * 80)
+    print(f"🌐 WEBHOOK: {TOTAL_REQUISICOES} updates sintéticos de {USUARIOS} usuários")
+    print("=" * 80)
+    print(f"{'Concorrência':>12} | {'req/s':>9} | {'p50 (ms)':>9} | {'p99 (ms)':>9} | {'Falhas':>6} | {'Processados':>11}")
+    print("-" * 80)
+    for r in results:
+        print(
+            f"{r['concorrencia']:>12} | {r['req_s']:>9.0f} | {r['p50_ms']:>9.2f} | "
+            f"{r['p99_ms']:>9.2f} | {r['falhas']:>6} | {r['processados']:>11}"
+        )
+    print("=" * 80)
+    return results
+
+
+if __name__ == "__main__":
+    asyncio.run(run_webhook_benchmark())
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import types
+from datetime import date
+
+from bot import llm, metrics
+from bot.latency import HedgeBudget, LatencyTracker
+
+
+def test_timeout_follows_rolling_p99_within_bounds():
+    tracker = LatencyTracker("teste", window=50, min_samples=10, min_timeout=1.0)
+    assert tracker.timeout(20.0) == 20.0
+    for value in [2.0] * 45 + [4.0] * 5:
+        tracker.record(value)
+    assert tracker.percentile(95) == 4.0
+    assert tracker.timeout(20.0) == 6.0
+    assert tracker.timeout(5.0) == 5.0
+
+
+def test_hedge_budget_resets_each_day():
+    today = [date(2025, 1, 1)]
+    budget = HedgeBudget(2, today=lambda: today[0])
+    assert budget.try_acquire() and budget.try_acquire()
+    assert budget.try_acquire() is False
+    today[0] = date(2025, 1, 2)
+    assert budget.try_acquire() is True
+
+
+class SlowFirstModel:
+    def __init__(self, delays):
+        self.delays = list(delays)
+        self.cancelled = 0
+
+    async def generate_content_async(self, prompt, **kwargs):
+        delay = self.delays.pop(0)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        payload = {"emocao_principal": "neutra", "intensidade": 1, "possivel_crise": False, "resposta_empatica": "Oi."}
+        return types.SimpleNamespace(text=json.dumps(payload), usage_metadata=None)
+
+
+def _warm_tracker(value):
+    tracker = LatencyTracker("classify", min_samples=5, min_timeout=0.5)
+    for _ in range(20):
+        tracker.record(value)
+    return tracker
+
+
+def test_adaptive_timeout_ignores_time_queued_for_a_slot(monkeypatch):
+    model = SlowFirstModel([0.01])
+    tracker = _warm_tracker(0.05)
+    monkeypatch.setattr(llm, "_get_model", lambda call_type: model)
+    monkeypatch.setattr(llm, "_schedulers", llm.weakref.WeakKeyDictionary())
+    monkeypatch.setattr(llm, "_concurrency_limit", 1)
+    monkeypatch.setattr(llm, "_latency", {"classify": tracker})
+    monkeypatch.setattr(llm._settings, "llm_hedging", False)
+
+    async def runner():
+        # Timeout adaptativo de 0.5s; a vaga só abre depois de 0.8s na fila
+        scheduler = llm._get_scheduler()
+        await scheduler.acquire("outro")
+        asyncio.get_running_loop().call_later(0.8, scheduler.release)
+        return await llm._invoke_json("prompt", "classify")
+
+    assert asyncio.run(runner())["emocao_principal"] == "neutra"
+    # A amostra registrada é a da requisição, sem a espera na fila
+    assert tracker.percentile(100) < 0.5
+
+
+def test_hedged_request_wins_and_cancels_straggler(monkeypatch):
+    metrics.reset()
+    model = SlowFirstModel([5.0, 0.01])
+    monkeypatch.setattr(llm, "_get_model", lambda call_type: model)
+    monkeypatch.setattr(llm, "_schedulers", llm.weakref.WeakKeyDictionary())
+    monkeypatch.setattr(llm, "_latency", {"classify": _warm_tracker(0.05)})
+    monkeypatch.setattr(llm, "_hedge_budget", HedgeBudget(10))
+    monkeypatch.setattr(llm._settings, "llm_hedging", True)
+
+    payload = asyncio.run(llm._invoke_json("prompt", "classify"))
+    assert payload["emocao_principal"] == "neutra"
+    assert model.cancelled == 1
+    assert metrics.get("llm.classify.hedged") == 1
+    assert metrics.get("llm.classify.hedge_wins") == 1
+
+
+def test_no_hedge_when_budget_is_spent(monkeypatch):
+    metrics.reset()
+    model = SlowFirstModel([0.2, 0.01])
+    monkeypatch.setattr(llm, "_get_model", lambda call_type: model)
+    monkeypatch.setattr(llm, "_schedulers", llm.weakref.WeakKeyDictionary())
+    monkeypatch.setattr(llm, "_latency", {"classify": _warm_tracker(0.05)})
+    monkeypatch.setattr(llm, "_hedge_budget", HedgeBudget(0))
+    monkeypatch.setattr(llm._settings, "llm_hedging", True)
+
+    assert asyncio.run(llm._invoke_json("prompt", "classify")) is not None
+    assert model.delays == [0.01]
+    assert metrics.get("llm.hedge.budget_exhausted") == 1
@@ -0,0 +1,74 @@
+import asyncio
+import json
+import threading
+import types
+
+from bot import llm
+
+CLASSIFY_JSON = json.dumps(
+    {"emocao_principal": "cansaco", "intensidade": 4, "possivel_crise": False, "resposta_empatica": "Estou aqui."}
+)
+
+
+class FakeModel:
+    def __init__(self, delay=0.01, text=CLASSIFY_JSON):
+        self.delay = delay
+        self.text = text
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.cancelled = 0
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            return types.SimpleNamespace(text=self.text)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+
+def test_concurrent_classify_keeps_thread_count_flat(monkeypatch):
+    model = FakeModel(delay=0.02)
+    monkeypatch.setattr(llm, "_get_model", lambda call_type: model)
+    monkeypatch.setattr(llm, "_concurrency_limit", 16)
+    monkeypatch.setattr(llm, "_schedulers", llm.weakref.WeakKeyDictionary())
+    monkeypatch.setattr(llm, "_classify_cache", llm.TTLCache("classify", max_size=0, ttl_seconds=0))
+
+    async def runner():
+        baseline = threading.active_count()
+        peak = baseline
+        done = asyncio.Event()
+
+        async def monitor():
+            nonlocal peak
+            while not done.is_set():
+                peak = max(peak, threading.active_count())
+                await asyncio.sleep(0.005)
+
+        monitor_task = asyncio.create_task(monitor())
+        results = await asyncio.gather(*(llm.classify_msg(f"msg {i}", []) for i in range(200)))
+        done.set()
+        await monitor_task
+        return baseline, peak, results
+
+    baseline, peak, results = asyncio.run(runner())
+    assert peak == baseline
+    assert all(result.emocao_principal == "cansaco" for result in results)
+    assert model.max_in_flight <= 16
+
+
+def test_timeout_cancels_underlying_request(monkeypatch):
+    model = FakeModel(delay=10)
+    monkeypatch.setattr(llm, "_get_model", lambda call_type: model)
+    monkeypatch.setattr(llm, "LLM_TIMEOUT_SECONDS", 0.05)
+    monkeypatch.setattr(llm, "_schedulers", llm.weakref.WeakKeyDictionary())
+    monkeypatch.setattr(llm, "_classify_cache", llm.TTLCache("classify", max_size=0, ttl_seconds=0))
+
+    result = asyncio.run(llm.classify_msg("oi", []))
+    assert result == llm.ClassifyOut()
+    assert model.cancelled == 1
+    assert model.in_flight == 0
@@ -0,0 +1,49 @@
+import asyncio
+import json
+
+from bot import llm
+from bot.models import TriageReportOut
+from bot.report import RECOMMENDATIONS_ROTINA, render_report
+
+REPORT = "2. Análise Integrada dos Sintomas (IA)\n" + " ".join(["Conteúdo do relatório."] * 10)
+
+DADOS = {"nome": "Maria", "matricula": "2024001"}
+PHQ9 = [2, 2, 1, 1, 1, 1, 1, 1, 0]
+GAD7 = [1, 1, 1, 1, 1, 1, 1]
+
+
+def _run(payload, monkeypatch, text=REPORT):
+    calls = []
+
+    async def fake_json(prompt, call_type):
+        calls.append("json")
+        return json.dumps(payload if len(calls) == 1 else {"nivel_urgencia": "media"})
+
+    async def fake_text(prompt, call_type="report"):
+        calls.append("text")
+        return text
+
+    monkeypatch.setattr(llm, "_invoke_raw", fake_json)
+    monkeypatch.setattr(llm, "_invoke_text", fake_text)
+    result = asyncio.run(llm.triage_and_report(DADOS, PHQ9, GAD7, ["cansada"], {"nome": "Maria"}))
+    return result, calls
+
+
+def test_combined_response_is_used_in_single_call(monkeypatch):
+    payload = {"triage": {"nivel_urgencia": "baixa", "fatores_protecao": ["busca de ajuda"]}, "relatorio": REPORT}
+    (triage, report), calls = _run(payload, monkeypatch)
+    assert calls == ["json"]
+    assert triage.nivel_urgencia == "baixa"
+    assert report == render_report({"nome": "Maria", "triage": triage.model_dump()}, REPORT)
+    assert RECOMMENDATIONS_ROTINA[0] in report
+
+
+def test_combined_falls_back_to_two_calls_on_invalid_payload(monkeypatch):
+    (triage, report), calls = _run({"triage": {"nivel_urgencia": "baixa"}, "relatorio": "curto"}, monkeypatch)
+    assert calls == ["json", "json", "text"]
+    assert triage.nivel_urgencia == "media"
+    assert report == render_report({"nome": "Maria", "triage": triage.model_dump()}, REPORT)
+
+
+def test_triage_report_out_requires_full_report():
+    assert TriageReportOut.model_validate({"triage": {}, "relatorio": REPORT}).triage.nivel_urgencia == "baixa"
@@ -1,5 +1,9 @@
+import json
+
+from bot import llm, metrics
+from bot.json_extract import json_candidates
 from bot.llm import _extract_first_json_block  # type: ignore[attr-defined]
-from bot.models import ClassifyOut, safe_parse
+from bot.models import ClassifyOut, TriageOut, safe_parse
 
 
 def test_extract_first_json_block_with_fence():
@@ -24,3 +28,35 @@ def test_safe_parse_returns_default_on_invalid_payload():
     assert parsed == default
 
 
+
+
+def test_json_candidates_skip_braces_inside_strings():
+    text = 'Segue: {"resposta_empatica":"use {chaves} e \\"aspas\\"","intensidade":2} e mais {texto}'
+    [candidate] = json_candidates(text)
+    assert json.loads(candidate.text)["resposta_empatica"] == 'use {chaves} e "aspas"'
+    assert candidate.repaired is False
+
+
+def test_json_candidates_remove_trailing_commas():
+    [candidate] = json_candidates('{"sinais_depressao":["humor deprimido",],"nivel_urgencia":"media",}')
+    assert json.loads(candidate.text) == {"sinais_depressao": ["humor deprimido"], "nivel_urgencia": "media"}
+    assert candidate.repaired is True
+
+
+def test_json_candidates_close_truncated_output():
+    truncated = '{"emocao_principal":"tristeza","intensidade":6,"resposta_empatica":"Sinto muito que'
+    assert json.loads(json_candidates(truncated)[0].text)["resposta_empatica"] == "Sinto muito que"
+
+    cut = json_candidates('{"nivel_urgencia":"media","fatores_protecao":["familia"],"sinais_ansiedade":[tr')
+    assert json.loads(cut[-1].text) == {"nivel_urgencia": "media", "fatores_protecao": ["familia"]}
+    assert json_candidates("sem json aqui") == []
+
+
+def test_parse_output_counts_repaired_and_defaulted():
+    metrics.reset()
+    parsed = llm._parse_output(TriageOut, '```json\n{"nivel_urgencia":"alta","sinais_depressao":["anedonia",],}\n```', "triage")
+    assert parsed.nivel_urgencia == "alta" and parsed.sinais_depressao == ["anedonia"]
+    assert llm._parse_output(ClassifyOut, '{"emocao_principal":"desconhecida"}', "classify") is None
+    assert llm._parse_output(ClassifyOut, "não consegui responder", "classify") is None
+    assert metrics.get("llm.triage.json_repaired") == 1
+    assert metrics.get("llm.classify.json_defaulted") == 2
@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+from bot import metrics
+from bot.outbox import Outbox, OutboxWorker
+
+
+class FakeSender:
+    def __init__(self, results):
+        self.results = list(results)
+        self.sent = []
+
+    async def send_screening(self, payload):
+        self.sent.append(payload["nome"])
+        return self.results.pop(0) if self.results else True
+
+
+def test_outbox_survives_reopen(tmp_path):
+    path = tmp_path / "outbox.sqlite3"
+    outbox = Outbox(path)
+    outbox.enqueue({"nome": "Maria", "phq9_respostas": [1, 2, 3]})
+    outbox.close()
+
+    reopened = Outbox(path)
+    entries = reopened.due(limit=10)
+    assert len(entries) == 1
+    assert entries[0].payload == {"nome": "Maria", "phq9_respostas": [1, 2, 3]}
+    assert reopened.stats().depth == 1
+    reopened.close()
+
+
+def test_mark_failed_postpones_entry(tmp_path):
+    outbox = Outbox(tmp_path / "outbox.sqlite3")
+    entry_id = outbox.enqueue({"nome": "Maria"})
+    outbox.mark_failed(entry_id, next_attempt_at=time.time() + 60, error="timeout")
+    assert outbox.due(limit=10) == []
+    assert outbox.due(limit=10, now=time.time() + 120)[0].attempts == 1
+    outbox.close()
+
+
+def test_worker_drains_and_retries_failures(tmp_path):
+    metrics.reset()
+    outbox = Outbox(tmp_path / "outbox.sqlite3")
+    for nome in ("Ana", "Bia", "Caio"):
+        outbox.enqueue({"nome": nome})
+    sender = FakeSender([True, False, True])
+    worker = OutboxWorker(outbox, sender, batch_size=10, retry_base=60)
+
+    async def runner():
+        sent = await worker.drain_once()
+        stats = await worker.refresh_metrics()
+        return sent, stats
+
+    sent, stats = asyncio.run(runner())
+    assert sent == 2
+    assert sender.sent == ["Ana", "Bia", "Caio"]
+    assert stats.depth == 1
+    assert metrics.get("outbox.depth") == 1
+    assert metrics.get("outbox.retries") == 1
+    assert outbox.due(limit=10) == []
+    outbox.close()
+
+
+def test_worker_backoff_grows_exponentially(tmp_path):
+    outbox = Outbox(tmp_path / "outbox.sqlite3")
+    worker = OutboxWorker(outbox, FakeSender([]), retry_base=2, retry_max=30)
+    assert 1 <= worker.backoff(0) <= 2
+    assert 8 <= worker.backoff(3) <= 16
+    assert worker.backoff(10) <= 30
+    outbox.close()
@@ -0,0 +1,111 @@
+import asyncio
+import copy
+import time
+
+from bot import metrics
+from bot.persistence import SQLitePersistence
+from bot.session import SessionData
+from bot.states import ConversationState
+
+
+def _session(user_id, **kwargs):
+    return SessionData(user_id=user_id, personal_data={"nome": "Maria", "curso": "Direito"}, **kwargs)
+
+
+def test_sessions_and_conversations_survive_restart(tmp_path):
+    path = tmp_path / "sessions.sqlite3"
+
+    async def first_run():
+        persistence = SQLitePersistence(path)
+        session = _session(1, phq9_answers=[1, 2, 3], phq9_started=True, triage_result={"nivel_urgencia": "media"})
+        session.triage_task = asyncio.get_running_loop().create_future()
+        # O Application copia o user_data antes de entregar; a task não vai junto
+        await persistence.update_user_data(1, copy.deepcopy({"session": session}))
+        await persistence.update_conversation("triagem", (1, 1), ConversationState.PHQ9)
+        await persistence.update_conversation("triagem", (2, 2), ConversationState.DADOS)
+        await persistence.update_conversation("triagem", (2, 2), None)
+        session.triage_task.cancel()
+        await persistence.flush()
+
+    async def second_run():
+        persistence = SQLitePersistence(path)
+        data = await persistence.get_user_data(), await persistence.get_conversations("triagem")
+        await persistence.flush()
+        return data
+
+    asyncio.run(first_run())
+    user_data, conversations = asyncio.run(second_run())
+    restored = user_data[1]["session"]
+    assert restored == _session(1, phq9_answers=[1, 2, 3], phq9_started=True, triage_result={"nivel_urgencia": "media"})
+    assert restored.triage_task is None
+    assert conversations == {(1, 1): ConversationState.PHQ9}
+
+
+def test_updates_are_coalesced_into_one_write(tmp_path):
+    metrics.reset()
+    persistence = SQLitePersistence(tmp_path / "sessions.sqlite3")
+
+    async def runner():
+        # Como em Application.update_persistence: todos os alunos sujos entregues juntos
+        coroutines = [persistence.update_user_data(user_id, {"session": _session(user_id)}) for user_id in range(50)]
+        coroutines.append(persistence.update_user_data(7, {"session": _session(7, availability="manhã")}))
+        await asyncio.gather(*coroutines)
+        await persistence.flush()
+
+    asyncio.run(runner())
+    summary = metrics.snapshot()["summaries"]
+    assert summary["sessions.flush_batch"]["count"] == 1
+    assert summary["sessions.flush_batch"]["last"] == 50
+
+    reopened = SQLitePersistence(tmp_path / "sessions.sqlite3")
+    assert reopened.load_user_data()[7]["session"].availability == "manhã"
+    reopened.close()
+
+
+def test_load_skips_expired_and_caps_count(tmp_path):
+    path = tmp_path / "sessions.sqlite3"
+    persistence = SQLitePersistence(path, max_loaded=3)
+    persistence.write_batch({user_id: {"session": _session(user_id)} for user_id in range(5)}, {})
+    persistence.write_batch({99: {"session": _session(99)}}, {("triagem", "[99, 99]"): ConversationState.GAD7})
+    with persistence._lock:
+        persistence._conn.execute("UPDATE sessions SET updated_at = ? WHERE user_id = 99", (time.time() - 30 * 86400,))
+        persistence._conn.execute("UPDATE conversations SET updated_at = ?", (time.time() - 30 * 86400,))
+
+    loaded = persistence.load_user_data()
+    assert len(loaded) == 3
+    assert 99 not in loaded
+    assert persistence.load_conversations("triagem") == {}
+    persistence.close()
+
+
+def test_sessions_beyond_cap_load_on_first_update(tmp_path):
+    metrics.reset()
+    path = tmp_path / "sessions.sqlite3"
+    persistence = SQLitePersistence(path, max_loaded=2)
+    for user_id in range(5):
+        persistence.write_batch(
+            {user_id: {"session": _session(user_id)}},
+            {("triagem", f"[{user_id}, {user_id}]"): ConversationState.PHQ9},
+        )
+    persistence.close()
+
+    async def restart():
+        persistence = SQLitePersistence(path, max_loaded=2)
+        user_data = await persistence.get_user_data()
+        conversations = await persistence.get_conversations("triagem")
+        missed = next(user_id for user_id in range(5) if user_id not in user_data)
+        refreshed = {}
+        await persistence.refresh_user_data(missed, refreshed)
+        # Aluno novo: nada no banco, a sessão segue vazia
+        fresh = {}
+        await persistence.refresh_user_data(1000, fresh)
+        await persistence.flush()
+        return len(user_data), conversations, missed, refreshed, fresh
+
+    loaded, conversations, missed, refreshed, fresh = asyncio.run(restart())
+    assert loaded == 2
+    # Todas as conversas voltam, inclusive as dos alunos fora do limite da carga inicial
+    assert len(conversations) == 5
+    assert refreshed["session"] == _session(missed)
+    assert fresh == {}
+    assert metrics.get("sessions.lazy_loaded") == 1
@@ -0,0 +1,74 @@
+from bot import metrics, prompt_builder
+from bot.prompt_builder import (
+    INPUT_TOKEN_BUDGETS,
+    build_classify_prompt,
+    build_report_prompt,
+    build_triage_prompt,
+    fit_texts,
+)
+from bot.ratelimit import estimate_tokens
+
+DADOS = {"nome": "Maria", "idade": "20", "telefone": "92999999999", "matricula": "2024001", "curso": "Informática", "periodo": "3"}
+
+
+def test_fit_texts_keeps_risk_and_recent_messages_in_order():
+    textos = ["antigo " * 40, "penso em morrer às vezes", "recente " * 40]
+    kept = fit_texts(textos, budget_tokens=90)
+    assert kept[0] == "penso em morrer às vezes"
+    assert kept[-1].startswith("recente")
+    assert all(not text.startswith("antigo") for text in kept)
+
+
+def test_triage_prompt_drops_pii_and_is_compact():
+    prompt = build_triage_prompt(DADOS, [1] * 9, [2] * 7, ["cansada", "sem tempo"])
+    for valor in ("Maria", "92999999999", "2024001", "'idade'"):
+        assert valor not in prompt
+    assert '"curso":"Informática"' in prompt
+    assert "total 9/27 (Leve)" in prompt
+    assert "item 9 (morte/autolesão): POSITIVO" in prompt
+    assert '["cansada","sem tempo"]' in prompt
+
+
+def test_prompts_respect_budget_and_log_token_counts():
+    metrics.reset()
+    historico = ["mensagem longa " * 200] * 6
+    prompt = build_classify_prompt("estou cansado", historico)
+    assert estimate_tokens(prompt) <= INPUT_TOKEN_BUDGETS["classify"]
+    assert metrics.get("llm.classify.prompt_tokens_saved") > 0
+    assert metrics.get_summary("llm.classify.prompt_tokens")["count"] == 1
+
+
+def test_report_prompt_sends_only_scored_items():
+    contexto = {
+        "nome": "Maria",
+        "matricula": "2024001",
+        "phq9_score": 3,
+        "phq9_respostas": [0, 0, 3, 0, 0, 0, 0, 0, 0],
+        "gad7_respostas": [0] * 7,
+        "triage": {"nivel_urgencia": "baixa", "sinais_depressao": [], "impacto_funcional": ["alterações no sono"]},
+        "relatos_livres": ["durmo mal"],
+    }
+    prompt = build_report_prompt(contexto)
+    assert '"phq9_itens":{"Q3":3}' in prompt
+    assert '"gad7_itens":{}' in prompt
+    assert "sinais_depressao" not in prompt
+    assert "Maria" not in prompt
+
+
+def test_token_savings_are_measured_against_previous_prompt(caplog):
+    metrics.reset()
+    contexto = {
+        "nome": "Maria",
+        "phq9_score": 3,
+        "phq9_respostas": [0, 0, 3, 0, 0, 0, 0, 0, 0],
+        "gad7_respostas": [0] * 7,
+        # Campo que o prompt anterior também não enviava: não conta como economia
+        "disponibilidade": "segunda a sexta de manhã " * 40,
+    }
+    with caplog.at_level("DEBUG", logger="bot.prompt_builder"):
+        prompt = build_report_prompt(contexto)
+    (record,) = caplog.records
+    assert record.levelname == "DEBUG"
+    assert record.tokens_before == estimate_tokens(prompt_builder._previous_report(contexto))
+    assert metrics.get("llm.report.prompt_tokens_saved") == record.tokens_before - estimate_tokens(prompt)
+    assert metrics.get("llm.report.prompt_tokens_saved") < 30
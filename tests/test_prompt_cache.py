@@ -0,0 +1,98 @@
+import asyncio
+import datetime as dt
+import types
+
+from bot import metrics
+from bot.prompt_cache import PromptModel, record_usage
+
+
+class FakeCache:
+    def __init__(self, ttl):
+        self.name = "cachedContents/fake"
+        self.expire_time = dt.datetime.now(dt.timezone.utc) + ttl
+        self.updates = 0
+
+    def update(self, ttl):
+        self.updates += 1
+        self.expire_time = dt.datetime.now(dt.timezone.utc) + ttl
+
+
+class FakeGenerativeModel:
+    def __init__(self, model_name, system_instruction=None, generation_config=None, cached=None):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.cached = cached
+
+    @classmethod
+    def from_cached_content(cls, cache, generation_config=None):
+        return cls("cached", cached=cache)
+
+
+def fake_genai(fail=False):
+    created = []
+
+    def create(model, display_name, system_instruction, ttl):
+        if fail:
+            raise RuntimeError("Cached content is too small")
+        created.append((model, system_instruction))
+        return FakeCache(ttl)
+
+    genai = types.SimpleNamespace(
+        GenerativeModel=FakeGenerativeModel,
+        caching=types.SimpleNamespace(CachedContent=types.SimpleNamespace(create=create)),
+    )
+    return genai, created
+
+
+def test_prompt_model_uses_cached_content_after_refresh():
+    genai, created = fake_genai()
+    handle = PromptModel(genai, "classify", "gemini-2.5-flash", "PROMPT FIXO", {"response_mime_type": "application/json"})
+    assert handle.model().system_instruction == "PROMPT FIXO"
+
+    assert asyncio.run(handle.refresh()) is True
+    assert created == [("models/gemini-2.5-flash", "PROMPT FIXO")]
+    assert handle.model().cached is not None
+    assert handle.needs_refresh() is False
+
+
+def test_prompt_model_extends_ttl_near_expiry():
+    genai, created = fake_genai()
+    handle = PromptModel(genai, "triage", "gemini-2.5-flash", "PROMPT", cache_ttl_seconds=3600)
+    asyncio.run(handle.refresh())
+    handle._cache.expire_time = dt.datetime.now(dt.timezone.utc) + dt.timedelta(seconds=30)
+    assert handle.needs_refresh() is True
+    asyncio.run(handle.refresh())
+    assert len(created) == 1
+    assert handle._cache.updates == 1
+
+
+def test_prompt_model_falls_back_to_system_instruction_when_cache_fails():
+    genai, _created = fake_genai(fail=True)
+    handle = PromptModel(genai, "report", "gemini-2.5-flash", "PROMPT")
+    assert asyncio.run(handle.refresh()) is False
+    assert handle.model().system_instruction == "PROMPT"
+    assert handle.needs_refresh() is False
+
+
+def test_concurrent_refreshes_share_one_cache_creation():
+    genai, created = fake_genai()
+    handle = PromptModel(genai, "classify", "gemini-2.5-flash", "PROMPT")
+
+    async def runner():
+        # Aquecimento em andamento enquanto uma chamada pede o modelo
+        warm = asyncio.ensure_future(handle.refresh())
+        await asyncio.sleep(0)
+        handle.model()
+        return await asyncio.gather(warm, handle.refresh())
+
+    assert asyncio.run(runner()) == [True, True]
+    assert len(created) == 1
+
+
+def test_record_usage_counts_uncached_input_tokens():
+    metrics.reset()
+    usage = types.SimpleNamespace(prompt_token_count=1200, cached_content_token_count=1000)
+    record_usage("classify", types.SimpleNamespace(usage_metadata=usage))
+    assert metrics.get("llm.classify.input_tokens") == 1200
+    assert metrics.get("llm.classify.cached_input_tokens") == 1000
+    assert metrics.get_summary("llm.classify.uncached_input_tokens_per_call")["last"] == 200
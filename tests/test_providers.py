@@ -0,0 +1,134 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from bot import llm
+from bot.cache import TTLCache
+from bot.circuit import CircuitBreaker
+from bot.config import Settings
+from bot.models import ClassifyOut
+from bot.providers import FakeModel, FakeProvider, GeminiProvider, create_provider
+from bot.report import NARRATIVE_HEADINGS
+
+PHQ9 = [2, 2, 1, 1, 1, 1, 1, 1, 0]
+GAD7 = [2, 1, 1, 1, 1, 1, 1]
+
+
+def _use(monkeypatch, provider):
+    monkeypatch.setattr(llm, "_provider", provider)
+    monkeypatch.setattr(llm, "_schedulers", llm.weakref.WeakKeyDictionary())
+    monkeypatch.setattr(llm, "_latency", {})
+    monkeypatch.setattr(llm, "_breaker", CircuitBreaker("llm.circuit"))
+    monkeypatch.setattr(llm, "_classify_cache", TTLCache("classify", max_size=0, ttl_seconds=0))
+    monkeypatch.setattr(llm, "retry_delay", lambda attempt: 0.0)
+
+
+def test_fake_provider_runs_full_flow_offline(monkeypatch):
+    provider = FakeProvider(latency_ms=1)
+    _use(monkeypatch, provider)
+    chunks = []
+
+    async def on_chunk(text):
+        chunks.append(text)
+
+    async def fluxo():
+        calma = await llm.classify_msg("estou cansado com as provas", [])
+        crise = await llm.classify_msg("quero morrer", [])
+        triage = await llm.triage_summary({}, PHQ9, GAD7, ["ando nervoso"])
+        combined, report = await llm.triage_and_report({}, PHQ9, GAD7, ["ando nervoso"], {"nome": "Ana"})
+        streamed = await llm.gen_report_text({"nome": "Ana", "triage": triage.model_dump()}, on_chunk)
+        return calma, crise, triage, combined, report, streamed
+
+    calma, crise, triage, combined, report, streamed = asyncio.run(fluxo())
+    assert (calma.emocao_principal, calma.possivel_crise) == ("cansaco", False)
+    assert crise.possivel_crise is True
+    assert triage.nivel_urgencia == "media" and triage.sinais_depressao
+    assert combined == triage
+    assert NARRATIVE_HEADINGS[1] in report and NARRATIVE_HEADINGS[1] in streamed
+    assert chunks
+    assert provider.calls == 5
+
+
+def test_fake_provider_is_deterministic_per_seed():
+    first = FakeProvider(error_rate=0.3, timeout_rate=0.1, seed=7)
+    second = FakeProvider(error_rate=0.3, timeout_rate=0.1, seed=7)
+    draws = [first.sample() for _ in range(50)]
+    assert draws == [second.sample() for _ in range(50)]
+    outcomes = {outcome for _latency, outcome in draws}
+    assert outcomes == {"ok", "error", "timeout"}
+
+
+def test_fake_provider_errors_fall_back_to_defaults(monkeypatch):
+    _use(monkeypatch, FakeProvider(latency_ms=0, error_rate=1.0))
+    assert asyncio.run(llm.classify_msg("estou cansado", [])) == ClassifyOut()
+
+
+def test_create_provider_follows_settings():
+    base = {"telegram_token": "1:a"}
+    assert isinstance(create_provider(Settings(**base, llm_provider="fake"), llm.CALL_TYPES, llm.MODEL_CANDIDATES), FakeProvider)
+    assert create_provider(Settings(**base), llm.CALL_TYPES, llm.MODEL_CANDIDATES) is None
+    gemini = create_provider(Settings(**base, gemini_api_key="x", llm_prompt_cache=False), llm.CALL_TYPES, llm.MODEL_CANDIDATES)
+    assert isinstance(gemini, GeminiProvider)
+
+
+def test_importing_llm_does_not_load_sdk():
+    code = "import sys, bot.llm; print('google.generativeai' in sys.modules, 'google.api_core' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).resolve().parent.parent,
+        env={**os.environ, "TELEGRAM_TOKEN": "1:a", "GEMINI_API_KEY": "x"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.split() == ["False", "False"]
+
+
+def test_prewarm_creates_provider_once(monkeypatch):
+    created = []
+
+    def fake_create(settings, call_types, candidates):
+        created.append(settings.llm_provider)
+        return FakeProvider(latency_ms=0)
+
+    monkeypatch.setattr(llm, "_provider", llm._UNSET)
+    monkeypatch.setattr(llm, "create_provider", fake_create)
+    asyncio.run(llm.prewarm())
+    assert isinstance(llm._get_model("classify"), FakeModel)
+    assert isinstance(llm._get_model("triage"), FakeModel)
+    assert len(created) == 1
+
+
+def test_lazy_provider_creation_does_not_block_the_loop(monkeypatch):
+    created = []
+
+    def slow_create(settings, call_types, candidates):
+        created.append(settings.llm_provider)
+        time.sleep(0.3)  # import do SDK
+        return FakeProvider(latency_ms=0)
+
+    _use(monkeypatch, llm._UNSET)
+    monkeypatch.setattr(llm, "create_provider", slow_create)
+
+    async def runner():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        results = await asyncio.gather(*(llm._invoke_raw("{}", "classify") for _ in range(5)))
+        task.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(runner())
+    assert all(result is not None for result in results)
+    assert len(created) == 1
+    # O loop seguiu atendendo enquanto o provedor era criado na thread
+    assert ticks >= 10
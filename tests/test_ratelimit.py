@@ -0,0 +1,101 @@
+import asyncio
+import json
+import types
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from bot import llm, metrics
+from bot.circuit import CircuitBreaker
+from bot.ratelimit import PRIORITY_CRISIS, PRIORITY_NORMAL, RateLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_limits_requests_and_tokens():
+    clock = Clock()
+    limiter = RateLimiter(2, 1000, clock=clock)
+    assert limiter.try_acquire(100) == 0.0
+    assert limiter.try_acquire(100) == 0.0
+    assert limiter.try_acquire(100) == pytest.approx(30.0)
+    clock.now = 30
+    assert limiter.try_acquire(100) == 0.0
+
+    tokens = RateLimiter(0, 600, clock=clock)
+    assert tokens.try_acquire(600) == 0.0
+    assert tokens.try_acquire(60) == pytest.approx(6.0)
+
+
+def test_crisis_calls_jump_the_queue():
+    limiter = RateLimiter(600, 0)
+    order = []
+
+    async def call(name, priority):
+        await limiter.acquire(1, priority)
+        order.append(name)
+
+    async def runner():
+        for _ in range(600):
+            await limiter.acquire(1)
+        await asyncio.gather(
+            call("normal-1", PRIORITY_NORMAL),
+            call("normal-2", PRIORITY_NORMAL),
+            call("crise", PRIORITY_CRISIS),
+        )
+
+    asyncio.run(runner())
+    assert order == ["crise", "normal-1", "normal-2"]
+
+
+def test_acquire_gives_up_at_deadline():
+    limiter = RateLimiter(1, 0)
+
+    async def runner():
+        await limiter.acquire(1)
+        await limiter.acquire(1, timeout=0.1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(runner())
+
+
+class QuotaModel:
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise google_exceptions.ResourceExhausted("429 quota")
+        return types.SimpleNamespace(text=json.dumps({"ok": True}), usage_metadata=None)
+
+
+def _patch(monkeypatch, model):
+    monkeypatch.setattr(llm, "_get_model", lambda call_type: model)
+    monkeypatch.setattr(llm, "_schedulers", llm.weakref.WeakKeyDictionary())
+    monkeypatch.setattr(llm, "_breaker", CircuitBreaker("llm.circuit"))
+    monkeypatch.setattr(llm, "retry_delay", lambda attempt: 0.01)
+
+
+def test_quota_errors_are_retried_within_deadline(monkeypatch):
+    metrics.reset()
+    model = QuotaModel(failures=2)
+    _patch(monkeypatch, model)
+
+    assert asyncio.run(llm._invoke_json("prompt", "triage")) == {"ok": True}
+    assert model.calls == 3
+    assert metrics.get("llm.triage.retries") == 2
+
+
+def test_retries_stop_at_configured_limit(monkeypatch):
+    model = QuotaModel(failures=10)
+    _patch(monkeypatch, model)
+
+    assert asyncio.run(llm._invoke_json("prompt", "triage")) is None
+    assert model.calls == llm._settings.llm_max_retries + 1
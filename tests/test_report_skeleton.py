@@ -0,0 +1,93 @@
+import asyncio
+
+from bot import llm
+from bot.prompts import RELATORIO_PROMPT
+from bot.report import (
+    DISCLAIMER,
+    NO_RISK_TEXT,
+    RECOMMENDATIONS_ALTA,
+    RECOMMENDATIONS_ROTINA,
+    clean_narrative,
+    compose_report_text,
+    render_report,
+)
+
+CONTEXTO = {
+    "nome": "Maria",
+    "matricula": "2024001",
+    "data": "01/01/2025 10:00",
+    "disponibilidade": "Segunda às 15h",
+    "phq9_score": 12,
+    "phq9_classificacao": "Moderada",
+    "gad7_score": 8,
+    "gad7_classificacao": "Leve",
+    "classificacao_geral": "Moderada",
+    "item_mais_preocupante": "PHQ-9 Q4: Sentir-se cansado(a) ou com pouca energia? (pontuação 3)",
+    "item9_positive": False,
+    "triage": {"nivel_urgencia": "media", "sinais_depressao": ["cansaço"], "fatores_protecao": ["vínculos familiares"]},
+}
+
+
+def test_fixed_sections_match_report_prompt_text():
+    prompt_lines = RELATORIO_PROMPT.replace(" \n", "\n").splitlines()
+    for line in RECOMMENDATIONS_ROTINA + DISCLAIMER:
+        assert line in prompt_lines
+    # A primeira recomendação de urgência alta ocupa duas linhas no prompt
+    assert RECOMMENDATIONS_ALTA[0].replace("e a presença de ", "e a presença de \n") in RELATORIO_PROMPT
+
+
+def test_render_report_fills_header_and_picks_recommendations():
+    report = render_report(CONTEXTO, "2. Análise Integrada dos Sintomas (IA)\nSintomas predominantes\n- cansaço")
+    assert report.startswith("📌 RELATÓRIO DE TRIAGEM — PSICOFLOW\nAluno: Maria\nMatrícula: 2024001\n")
+    assert "PHQ-9: 12 pontos — Moderada\nGAD-7: 8 pontos — Leve\nClassificação geral: Moderada" in report
+    assert RECOMMENDATIONS_ROTINA[0] in report and RECOMMENDATIONS_ALTA[0] not in report
+
+    urgent = render_report({**CONTEXTO, "item9_positive": True}, "")
+    assert RECOMMENDATIONS_ALTA[-1] in urgent
+    assert report.endswith(DISCLAIMER[-1]) and urgent.endswith(DISCLAIMER[-1])
+
+
+def test_missing_narrative_falls_back_to_triage_analysis():
+    report = render_report(CONTEXTO, "")
+    assert "- cansaço" in report
+    assert "- vínculos familiares" in report
+    assert NO_RISK_TEXT in report
+    assert CONTEXTO["item_mais_preocupante"] in report
+
+
+def test_clean_narrative_drops_sections_the_model_should_not_write():
+    text = (
+        "📌 RELATÓRIO DE TRIAGEM — PSICOFLOW\nAluno: X\n"
+        "2. Análise Integrada dos Sintomas (IA)\nSintomas\n"
+        "3. Item mais sensível da triagem\nQ4\n"
+        "5. Recomendações para o Serviço de Psicologia\n✔ algo"
+    )
+    assert clean_narrative(text) == "2. Análise Integrada dos Sintomas (IA)\nSintomas\n3. Item mais sensível da triagem\nQ4"
+    assert clean_narrative("Sintomas: cansaço").startswith("2. Análise Integrada dos Sintomas (IA)\n")
+
+
+def test_fallback_without_protection_factors_does_not_invent_them():
+    report = render_report({**CONTEXTO, "triage": {"nivel_urgencia": "media"}}, "")
+    assert "Fatores de proteção\n- Não identificados" in report
+    assert "busca por ajuda" not in report
+
+
+def test_llm_failure_with_high_urgency_lists_the_risk_that_fired(monkeypatch):
+    async def no_answer(prompt, call_type="report"):
+        return ""
+
+    monkeypatch.setattr(llm, "_invoke_text", no_answer)
+    contexto = {
+        **CONTEXTO,
+        "phq9_score": 21,
+        "relatos_livres": ["às vezes penso em morrer"],
+        "triage": {"nivel_urgencia": "alta"},
+    }
+    report = compose_report_text("resumo determinístico", asyncio.run(llm.gen_report_text(contexto)))
+
+    assert NO_RISK_TEXT not in report
+    assert "- relato com conteúdo de risco nas mensagens do aluno" in report
+    assert "- sintomas depressivos graves (PHQ-9 21 ≥ 20)" in report
+    assert "sinais de ideação" not in report
+    assert RECOMMENDATIONS_ALTA[0] in report
+    assert contexto["item_mais_preocupante"] in report
@@ -0,0 +1,111 @@
+import asyncio
+import types
+
+from telegram.error import RetryAfter
+
+from bot import llm, metrics
+from bot.report import render_report, render_report_header
+from bot.telegram_app import PROCESSING_MESSAGE, ReportProgressMessage
+
+CHUNKS = [
+    "📌 RELATÓRIO DE TRIAGEM — PSICOFLOW\nAluno: Maria\n",
+    "1. Resultados Quantitativos\nPHQ-9: 9 pontos — Leve\n",
+    "2. Análise Integrada dos Sintomas (IA)\n" + "Sintomas predominantes: cansaço. " * 5,
+]
+
+NARRATIVE_CHUNKS = [
+    "2. Análise Integrada dos Sintomas (IA)\n",
+    "Sintomas predominantes\n- cansaço ou pouca energia\n",
+    "3. Item mais sensível da triagem\nPHQ-9 Q4 (pontuação 2)",
+]
+
+CONTEXTO = {"nome": "Maria", "matricula": "2024001", "data": "01/01/2025 10:00", "phq9_score": 9, "phq9_classificacao": "Leve"}
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(0)
+            yield types.SimpleNamespace(text=chunk)
+
+
+class FakeStreamingModel:
+    async def generate_content_async(self, prompt, stream=False, **kwargs):
+        assert stream is True
+        return FakeStream(NARRATIVE_CHUNKS)
+
+
+class FakeMessage:
+    def __init__(self, fail_with=None):
+        self.edits = []
+        self.fail_with = fail_with
+
+    async def edit_text(self, text):
+        if self.fail_with is not None:
+            error, self.fail_with = self.fail_with, None
+            raise error
+        self.edits.append(text)
+
+
+def test_gen_report_text_streams_accumulated_chunks(monkeypatch):
+    metrics.reset()
+    monkeypatch.setattr(llm, "_get_model", lambda call_type: FakeStreamingModel())
+    monkeypatch.setattr(llm, "_schedulers", llm.weakref.WeakKeyDictionary())
+    seen = []
+
+    async def on_chunk(text):
+        seen.append(text)
+
+    report = asyncio.run(llm.gen_report_text(CONTEXTO, on_chunk=on_chunk))
+    assert len(seen) == len(NARRATIVE_CHUNKS)
+    assert seen[-1] == render_report_header(CONTEXTO) + "\n" + "".join(NARRATIVE_CHUNKS)
+    assert report == render_report(CONTEXTO, "".join(NARRATIVE_CHUNKS))
+    assert metrics.get_summary("llm.report.time_to_first_chunk_seconds")["count"] == 1
+    assert metrics.get_summary("llm.report.generation_seconds")["count"] == 1
+
+
+def test_progress_message_is_throttled():
+    message = FakeMessage()
+    progress = ReportProgressMessage(message, min_interval=60)
+
+    async def runner():
+        for idx in range(1, len(CHUNKS) + 1):
+            await progress.update("".join(CHUNKS[:idx]))
+
+    asyncio.run(runner())
+    assert len(message.edits) == 1
+    assert message.edits[0].startswith(PROCESSING_MESSAGE)
+    assert progress.first_edit_seconds is not None
+
+
+def test_progress_message_tracks_sections_and_backs_off_on_retry_after():
+    message = FakeMessage(fail_with=RetryAfter(0))
+    progress = ReportProgressMessage(message, min_interval=0)
+
+    async def runner():
+        await progress.update(CHUNKS[0])
+        for idx in range(1, len(CHUNKS) + 1):
+            await progress.update("".join(CHUNKS[:idx]))
+
+    asyncio.run(runner())
+    assert message.edits[-1].splitlines()[2:4] == ["✅ Resultados das escalas", "✍️ Análise integrada das respostas..."]
+
+
+def test_progress_reaches_every_streamed_section_and_completes_after_generation(monkeypatch):
+    monkeypatch.setattr(llm, "_get_model", lambda call_type: FakeStreamingModel())
+    monkeypatch.setattr(llm, "_schedulers", llm.weakref.WeakKeyDictionary())
+    message = FakeMessage()
+    progress = ReportProgressMessage(message, min_interval=0)
+
+    async def runner():
+        await llm.gen_report_text(CONTEXTO, on_chunk=progress.update)
+        streamed = message.edits[-1]
+        await progress.complete()
+        return streamed
+
+    streamed = asyncio.run(runner())
+    assert streamed.splitlines()[-2:] == ["✍️ Pontos de atenção...", "▫️ Recomendações e finalização"]
+    assert all(line.startswith("✅") for line in message.edits[-1].splitlines()[2:])
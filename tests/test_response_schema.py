@@ -0,0 +1,37 @@
+import json
+
+from bot import llm
+from bot.models import ClassifyOut, TriageReportOut, response_schema
+
+
+def _keys(node):
+    keys = set(node)
+    for prop in node.get("properties", {}).values():
+        keys |= _keys(prop)
+    if "items" in node:
+        keys |= _keys(node["items"])
+    return keys
+
+
+def test_response_schema_uses_gemini_subset():
+    schema = response_schema(TriageReportOut)
+    assert _keys(schema) <= {"type", "format", "enum", "items", "properties", "required"}
+    triage = schema["properties"]["triage"]
+    assert triage["properties"]["nivel_urgencia"] == {"enum": ["alta", "media", "baixa"], "type": "string", "format": "enum"}
+    assert schema["required"] == ["triage", "relatorio"]
+    assert "sinais_ansiedade" in triage["required"]
+
+
+def test_response_schema_is_accepted_by_sdk():
+    from google.generativeai.types import generation_types
+
+    for _call_type, _prompt, config in llm.CALL_TYPES:
+        converted = generation_types.to_generation_config_dict(config)
+        assert ("response_schema" in converted) == (config["response_mime_type"] == "application/json")
+
+
+def test_schema_shaped_output_validates_in_one_step():
+    schema = response_schema(ClassifyOut)
+    output = {name: {"string": "tristeza", "integer": 4, "boolean": False}[prop["type"]] for name, prop in schema["properties"].items()}
+    parsed = llm._parse_output(ClassifyOut, json.dumps(output), "classify")
+    assert parsed == ClassifyOut(emocao_principal="tristeza", intensidade=4, resposta_empatica="tristeza")
@@ -0,0 +1,72 @@
+import asyncio
+import json
+import types
+
+from bot import llm, metrics
+from bot.circuit import CircuitBreaker
+from bot.router import ModelRouter, parse_model_list
+
+
+def _feed(router, name, seconds, ok=True, count=5):
+    for _ in range(count):
+        router.record(name, seconds, ok)
+
+
+def test_parse_model_list_keeps_order_and_default():
+    assert parse_model_list(" a , b,,c ", "x") == ["a", "b", "c"]
+    assert parse_model_list("", "x") == ["x"]
+
+
+def test_router_prefers_first_until_measured_then_fastest_healthy():
+    router = ModelRouter("classify", ["flash", "lite"], rng=lambda: 1.0)
+    assert router.choose() == "flash"
+    _feed(router, "models/flash", 3.0)
+    _feed(router, "lite", 0.8)
+    assert router.choose() == "lite"
+
+    _feed(router, "lite", 0.8, ok=False, count=5)
+    assert router.choose() == "flash"
+
+
+def test_router_explores_unhealthy_and_unmeasured_candidates():
+    router = ModelRouter("report", ["flash", "pro"], rng=lambda: 0.0)
+    _feed(router, "flash", 2.0)
+    assert router.choose() == "pro"
+
+
+def test_router_records_per_model_histograms():
+    metrics.reset()
+    router = ModelRouter("triage", ["flash"])
+    router.record("flash", 0.4, ok=True)
+    router.record("flash", 9.0, ok=False)
+    router.record("desconhecido", 1.0, ok=True)
+    histogram = metrics.get_histogram("llm.model.flash.triage.latency_seconds")
+    assert histogram["le_0.5"] == 1 and histogram["le_15"] == 1
+    assert metrics.get("llm.model.flash.triage.errors") == 1
+
+
+class NamedModel:
+    def __init__(self, name, delay):
+        self.model_name = f"models/{name}"
+        self.delay = delay
+
+    async def generate_content_async(self, prompt, **kwargs):
+        await asyncio.sleep(self.delay)
+        return types.SimpleNamespace(text=json.dumps({"ok": self.model_name}), usage_metadata=None)
+
+
+def test_llm_routes_traffic_to_faster_candidate(monkeypatch):
+    router = ModelRouter("triage", ["lento", "rapido"], min_samples=2, rng=lambda: 1.0)
+    models = {"lento": NamedModel("lento", 0.05), "rapido": NamedModel("rapido", 0.0)}
+    monkeypatch.setattr(llm, "_routers", {"triage": router})
+    monkeypatch.setattr(llm, "_get_model", lambda call_type: models[router.choose()])
+    monkeypatch.setattr(llm, "_schedulers", llm.weakref.WeakKeyDictionary())
+    monkeypatch.setattr(llm, "_breaker", CircuitBreaker("llm.circuit"))
+
+    async def run():
+        _feed(router, "rapido", 0.001, count=2)
+        return [await llm._invoke_json("prompt", "triage") for _ in range(4)]
+
+    results = asyncio.run(run())
+    assert [r["ok"] for r in results[:2]] == ["models/lento"] * 2
+    assert [r["ok"] for r in results[2:]] == ["models/rapido"] * 2
@@ -0,0 +1,148 @@
+import asyncio
+import types
+
+import pytest
+
+from bot import llm, metrics, telegram_app
+from bot.cache import TTLCache
+from bot.circuit import CLOSED, CircuitBreaker
+from bot.ratelimit import PRIORITY_CRISIS
+from bot.scheduler import FairScheduler, LLMOverloaded, llm_user
+from bot.session import SessionData
+from bot.states import ConversationState
+
+
+async def _serve_order(scheduler, requests):
+    order = []
+
+    async def worker(user, label, priority):
+        async with scheduler.slot(user, priority):
+            order.append(label)
+            await asyncio.sleep(0)
+
+    await scheduler.acquire("dono")
+    tasks = []
+    for user, label, priority in requests:
+        tasks.append(asyncio.ensure_future(worker(user, label, priority)))
+        await asyncio.sleep(0)
+    scheduler.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_round_robin_across_users():
+    scheduler = FairScheduler("teste", concurrency=1, max_queue=10)
+    requests = [("a", "a1", 1), ("a", "a2", 1), ("a", "a3", 1), ("b", "b1", 1), ("c", "c1", 1)]
+    assert asyncio.run(_serve_order(scheduler, requests)) == ["a1", "b1", "c1", "a2", "a3"]
+
+
+def test_crisis_requests_go_first():
+    scheduler = FairScheduler("teste", concurrency=1, max_queue=10)
+    requests = [("a", "a1", 1), ("b", "b1", 1), ("c", "crise", PRIORITY_CRISIS)]
+    assert asyncio.run(_serve_order(scheduler, requests)) == ["crise", "a1", "b1"]
+
+
+def test_full_queue_rejects_and_cancelled_waiters_leave():
+    metrics.reset()
+    scheduler = FairScheduler("teste", concurrency=1, max_queue=1)
+
+    async def runner():
+        await scheduler.acquire("a")
+        waiter = asyncio.ensure_future(scheduler.acquire("b"))
+        await asyncio.sleep(0)
+        with pytest.raises(LLMOverloaded):
+            await scheduler.acquire("c")
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        depth = scheduler.queued
+        scheduler.release()
+        return depth
+
+    assert asyncio.run(runner()) == 0
+    assert scheduler.active == 0
+    assert metrics.get("teste.rejected") == 1
+    assert metrics.snapshot()["gauges"]["teste.queue_depth"] == 0
+
+
+def test_crisis_requests_bypass_full_queue():
+    scheduler = FairScheduler("teste", concurrency=1, max_queue=1)
+
+    async def runner():
+        await scheduler.acquire("a")
+        waiter = asyncio.ensure_future(scheduler.acquire("b"))
+        await asyncio.sleep(0)
+        crisis = asyncio.ensure_future(scheduler.acquire("c", PRIORITY_CRISIS))
+        await asyncio.sleep(0)
+        scheduler.release()
+        await crisis
+        served_first = not waiter.done()
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        return served_first
+
+    # A crise entra mesmo com a fila cheia e é atendida antes de quem já esperava
+    assert asyncio.run(runner())
+
+
+def _overloaded_llm(monkeypatch):
+    class Model:
+        async def generate_content_async(self, prompt, **kwargs):
+            await asyncio.sleep(0.05)
+            return types.SimpleNamespace(text='{"ok": true}', usage_metadata=None)
+
+    monkeypatch.setattr(llm, "_get_model", lambda call_type: Model())
+    monkeypatch.setattr(llm, "_schedulers", llm.weakref.WeakKeyDictionary())
+    monkeypatch.setattr(llm, "_concurrency_limit", 1)
+    monkeypatch.setattr(llm, "_max_queue", 0)
+    monkeypatch.setattr(llm, "_breaker", CircuitBreaker("llm.circuit", min_calls=1))
+
+
+def test_overloaded_llm_call_signals_caller_without_tripping_breaker(monkeypatch):
+    metrics.reset()
+    _overloaded_llm(monkeypatch)
+
+    async def runner():
+        llm_user.set(42)
+        return await asyncio.gather(
+            llm._invoke_json("a", "triage"), llm._invoke_json("b", "triage"), return_exceptions=True
+        )
+
+    first, second = asyncio.run(runner())
+    assert first == {"ok": True}
+    assert isinstance(second, LLMOverloaded)
+    assert metrics.get("llm.triage.overloaded") == 1
+    assert llm._breaker.state == CLOSED
+
+
+def test_public_functions_and_handler_surface_overload(monkeypatch):
+    _overloaded_llm(monkeypatch)
+    monkeypatch.setattr(llm._settings, "classify_batching", False)
+    monkeypatch.setattr(llm._settings, "triage_rules", False)
+    monkeypatch.setattr(llm, "_classify_cache", TTLCache("classify", max_size=0, ttl_seconds=0))
+    replies = []
+
+    class Message:
+        text = "estou cansada com as provas"
+
+        async def reply_text(self, text, **kwargs):
+            replies.append(text)
+
+    async def runner():
+        holder = asyncio.ensure_future(llm._invoke_json("ocupa a vaga", "triage"))
+        await asyncio.sleep(0)
+        with pytest.raises(LLMOverloaded):
+            await llm.classify_msg("estou cansada", [])
+        with pytest.raises(LLMOverloaded):
+            await llm.triage_summary({}, [1] * 9, [1] * 7, [])
+        with pytest.raises(LLMOverloaded):
+            await llm.gen_report_text({"nome": "Ana"})
+        session = SessionData(user_id=7)
+        update = types.SimpleNamespace(message=Message(), effective_user=types.SimpleNamespace(id=7))
+        state = await telegram_app.empathetic_conversation(update, types.SimpleNamespace(user_data={"session": session}))
+        await holder
+        return state, session
+
+    state, session = asyncio.run(runner())
+    assert state == ConversationState.CONVERSA
+    assert replies == [telegram_app.LLM_BUSY_MESSAGE]
+    assert session.history == [] and session.free_text == []
@@ -0,0 +1,249 @@
+import asyncio
+import socket
+
+import pytest
+from telegram import Update
+
+from bot import metrics, telegram_app
+from bot.config import Settings
+from bot.kv_server import KVServer
+from bot.models import TriageOut
+from bot.session import SessionData
+from bot.session_store import MemoryKV, RemoteKV, SessionStore, StoredSession, VersionConflict
+from bot.states import ConversationState
+from bot.telegram_app import SESSION_NOT_SAVED_MESSAGE, SESSION_UNAVAILABLE_MESSAGE, build_application
+
+
+def test_memory_kv_rejects_stale_version():
+    kv = MemoryKV()
+    assert kv.get_nowait("a") == (0, None)
+    assert kv.cas_nowait("a", 0, "x") == 1
+    assert kv.get_nowait("a") == (1, "x")
+    assert kv.get_nowait("a", known_version=1) == (1, None)
+    with pytest.raises(VersionConflict):
+        kv.cas_nowait("a", 0, "y")
+
+
+def test_two_workers_share_sessions_with_versioned_writes():
+    metrics.reset()
+
+    async def runner():
+        server = KVServer()
+        port = await server.start()
+        worker_a = SessionStore(RemoteKV("127.0.0.1", port))
+        worker_b = SessionStore(RemoteKV("127.0.0.1", port))
+
+        stored_a = await worker_a.load(1)
+        stored_a.session.personal_data["nome"] = "Maria"
+        stored_a = await worker_a.save(1, stored_a, stored_a.session, ConversationState.DADOS)
+
+        stored_b = await worker_b.load(1)
+        assert stored_b.session.personal_data == {"nome": "Maria"}
+        assert stored_b.state == ConversationState.DADOS
+
+        # Sem mudanças no servidor, a leitura devolve o objeto em cache (com a task local)
+        stored_a.session.triage_task = asyncio.get_running_loop().create_future()
+        assert await worker_a.load(1, stored_a) is stored_a
+        # Gravar o mesmo conteúdo não gera nova versão
+        assert (await worker_a.save(1, stored_a, stored_a.session, ConversationState.DADOS)).version == 1
+
+        stored_b.session.personal_data["idade"] = "20"
+        await worker_b.save(1, stored_b, stored_b.session, ConversationState.DADOS)
+        stored_a.session.personal_data["idade"] = "30"
+        with pytest.raises(VersionConflict):
+            await worker_a.save(1, stored_a, stored_a.session, ConversationState.DADOS)
+        fresh = await worker_a.load(1, stored_a)
+
+        stored_a.session.triage_task.cancel()
+        await worker_a.close()
+        await worker_b.close()
+        await server.close()
+        return fresh
+
+    fresh = asyncio.run(runner())
+    assert fresh.version == 2
+    assert fresh.session.personal_data == {"nome": "Maria", "idade": "20"}
+    assert metrics.get("sessions.store_conflicts") == 1
+    assert metrics.get("sessions.store_unchanged") == 1
+
+
+class FakeBot:
+    defaults = None
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append(text)
+
+
+def _message(update_id, text, bot):
+    data = {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1700000000,
+            "chat": {"id": 42, "type": "private"},
+            "from": {"id": 42, "is_bot": False, "first_name": "Maria"},
+            "text": text,
+        },
+    }
+    return Update.de_json(data, bot)
+
+
+def test_conversation_continues_on_another_worker(tmp_path, monkeypatch):
+    async def runner():
+        server = KVServer()
+        port = await server.start()
+        workers = []
+        for name in ("a", "b"):
+            settings = Settings(
+                telegram_token="123:abc",
+                outbox_path=str(tmp_path / f"outbox_{name}.sqlite3"),
+                session_store="kv",
+                session_kv_port=port,
+            )
+            application = build_application(settings)
+            # Sem get_me na rede: os handlers respondem pelo FakeBot das mensagens
+            monkeypatch.setattr(application, "_initialized", True)
+            workers.append(application)
+        worker_a, worker_b = workers
+
+        bot = FakeBot()
+        await worker_a.process_update(_message(1, "oi", bot))
+        await worker_b.process_update(_message(2, "Sim, vamos começar", bot))
+        await worker_a.process_update(_message(3, "Maria Silva", bot))
+
+        stored = await SessionStore(RemoteKV("127.0.0.1", port)).load(42)
+        for application in workers:
+            await application.bot_data["session_store"].close()
+            application.bot_data["outbox_worker"].outbox.close()
+        await server.close()
+        return stored, bot.sent
+
+    stored, sent = asyncio.run(runner())
+    assert stored.session.triage_active
+    assert stored.session.personal_data == {"nome": "Maria Silva"}
+    assert stored.state == ConversationState.DADOS
+    assert stored.version == 3
+    assert "Qual sua idade?" in sent
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_unavailable_store_stops_the_update(tmp_path, monkeypatch):
+    metrics.reset()
+
+    async def runner():
+        settings = Settings(
+            telegram_token="123:abc",
+            outbox_path=str(tmp_path / "outbox.sqlite3"),
+            session_store="kv",
+            session_kv_port=_free_port(),
+            session_kv_timeout=0.5,
+        )
+        application = build_application(settings)
+        monkeypatch.setattr(application, "_initialized", True)
+        bot = FakeBot()
+        await application.process_update(_message(1, "oi", bot))
+        await application.bot_data["session_store"].close()
+        application.bot_data["outbox_worker"].outbox.close()
+        return bot.sent
+
+    sent = asyncio.run(runner())
+    # O ConversationHandler não roda sem a sessão do servidor
+    assert sent == [SESSION_UNAVAILABLE_MESSAGE]
+    assert metrics.get("sessions.store_errors") == 1
+
+
+class RacingKV(MemoryKV):
+    """Outro processo grava a sessão entre a leitura e a gravação deste."""
+
+    race = False
+
+    async def cas(self, key, version, value):
+        if self.race:
+            self.race = False
+            self.cas_nowait(key, version, value.replace("Maria Silva", "Maria Souza"))
+        return await super().cas(key, version, value)
+
+
+def test_conflicting_write_asks_student_to_resend(tmp_path, monkeypatch):
+    async def runner():
+        settings = Settings(
+            telegram_token="123:abc",
+            outbox_path=str(tmp_path / "outbox.sqlite3"),
+            session_store="memory",
+        )
+        application = build_application(settings)
+        monkeypatch.setattr(application, "_initialized", True)
+        store = application.bot_data["session_store"]
+        store.kv = kv = RacingKV()
+        bot = FakeBot()
+        await application.process_update(_message(1, "oi", bot))
+        await application.process_update(_message(2, "Sim, vamos começar", bot))
+        kv.race = True
+        await application.process_update(_message(3, "Maria Silva", bot))
+        sent_after_conflict = list(bot.sent)
+        stored = await store.load(42)
+        # A mensagem seguinte parte da versão gravada pelo outro processo
+        await application.process_update(_message(4, "20", bot))
+        application.bot_data["outbox_worker"].outbox.close()
+        return sent_after_conflict, stored, application.user_data[42]["session"]
+
+    sent, stored, session = asyncio.run(runner())
+    assert sent[-1] == SESSION_NOT_SAVED_MESSAGE
+    assert stored.session.personal_data == {"nome": "Maria Souza"}
+    assert session.personal_data["nome"] == "Maria Souza"
+
+
+def test_conflict_after_the_screening_is_submitted_does_not_ask_for_a_resend(tmp_path, monkeypatch):
+    async def fake_triage(dados_pessoais, phq9_respostas, gad7_respostas, texto_livre):
+        return TriageOut(nivel_urgencia="baixa")
+
+    async def fake_report(contexto, on_chunk=None):
+        return "relatório"
+
+    monkeypatch.setattr(telegram_app, "triage_summary", fake_triage)
+    monkeypatch.setattr(telegram_app, "gen_report_text", fake_report)
+
+    async def runner():
+        settings = Settings(
+            telegram_token="123:abc",
+            outbox_path=str(tmp_path / "outbox.sqlite3"),
+            session_store="memory",
+        )
+        application = build_application(settings)
+        monkeypatch.setattr(application, "_initialized", True)
+        store = application.bot_data["session_store"]
+        store.kv = kv = RacingKV()
+        session = SessionData(user_id=42, phq9_started=True, triage_active=True)
+        session.personal_data.update(
+            {
+                "nome": "Maria Silva",
+                "idade": "20",
+                "telefone": "92999999999",
+                "matricula": "2024001",
+                "curso": "Informática",
+                "periodo": "3",
+            }
+        )
+        session.phq9_answers.extend([1] * 9)
+        session.gad7_answers.extend([1] * 7)
+        session.availability = "segunda 15h"
+        await store.save(42, StoredSession(SessionData(user_id=42), None, 0), session, ConversationState.AGENDAMENTO)
+        bot = FakeBot()
+        kv.race = True
+        await application.process_update(_message(1, "Nenhuma", bot))
+        outbox = application.bot_data["outbox_worker"].outbox
+        pending = outbox.stats().depth
+        outbox.close()
+        return bot.sent, pending
+
+    sent, pending = asyncio.run(runner())
+    assert pending == 1
+    assert SESSION_NOT_SAVED_MESSAGE not in sent
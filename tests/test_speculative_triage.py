@@ -0,0 +1,142 @@
+import asyncio
+import types
+
+from bot import telegram_app
+from bot.models import TriageOut
+from bot.session import SessionData
+from bot.states import ConversationState
+
+DADOS = {"nome": "Maria", "idade": "20", "telefone": "92999999999", "matricula": "2024001", "curso": "Informática", "periodo": "3"}
+
+
+class FakeMessage:
+    def __init__(self, text=""):
+        self.text = text
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+        return FakeMessage(text)
+
+    async def edit_text(self, text, **kwargs):
+        pass
+
+    async def delete(self):
+        pass
+
+
+class FakeOutbox:
+    def __init__(self):
+        self.payloads = []
+
+    def enqueue(self, payload):
+        self.payloads.append(payload)
+        return len(self.payloads)
+
+
+class FakeWorker(telegram_app.OutboxWorker):
+    def __init__(self):
+        self.outbox = FakeOutbox()
+
+    def wake(self):
+        pass
+
+
+def _update(text):
+    return types.SimpleNamespace(message=FakeMessage(text), effective_user=types.SimpleNamespace(id=42))
+
+
+def _context(session):
+    def create_task(coro, update=None, name=None):
+        return asyncio.ensure_future(coro)
+
+    return types.SimpleNamespace(
+        user_data={"session": session},
+        bot_data={"outbox_worker": FakeWorker()},
+        application=types.SimpleNamespace(create_task=create_task),
+    )
+
+
+def _session():
+    session = SessionData(user_id=42)
+    session.personal_data.update(DADOS)
+    session.phq9_started = True
+    session.phq9_answers.extend([1] * 9)
+    session.gad7_answers.extend([2] * 6)
+    return session
+
+
+def _fake_triage(monkeypatch, calls, delay=0.0):
+    async def fake_triage_summary(dados_pessoais, phq9_respostas, gad7_respostas, texto_livre):
+        calls.append((list(phq9_respostas), list(gad7_respostas)))
+        await asyncio.sleep(delay)
+        return TriageOut(nivel_urgencia="media")
+
+    monkeypatch.setattr(telegram_app, "triage_summary", fake_triage_summary)
+
+
+def test_triage_starts_after_last_gad7_answer(monkeypatch):
+    calls = []
+    _fake_triage(monkeypatch, calls)
+    session = _session()
+
+    async def runner():
+        context = _context(session)
+        state = await telegram_app.gad7_handler(_update("3"), context)
+        task = session.triage_task
+        result = await task
+        return state, result
+
+    state, result = asyncio.run(runner())
+    assert state == ConversationState.AGENDAMENTO
+    assert calls == [([1] * 9, [2] * 6 + [3])]
+    assert result.nivel_urgencia == "media"
+
+
+def test_finalize_screening_reuses_speculative_result(monkeypatch):
+    calls = []
+    _fake_triage(monkeypatch, calls)
+
+    async def fake_report(contexto, on_chunk=None):
+        return ""
+
+    monkeypatch.setattr(telegram_app, "gen_report_text", fake_report)
+    session = _session()
+
+    async def runner():
+        context = _context(session)
+        await telegram_app.gad7_handler(_update("3"), context)
+        session.availability = "segunda 15h"
+        await telegram_app.finalize_screening(_update("Nenhuma"), context, session)
+        return context.bot_data["outbox_worker"].outbox.payloads
+
+    payloads = asyncio.run(runner())
+    assert len(calls) == 1
+    assert session.triage_task is None
+    assert payloads[0]["analise_ia"]["nivel_urgencia"] == "media"
+
+
+def test_cancel_and_reset_stop_pending_triage(monkeypatch):
+    calls = []
+    _fake_triage(monkeypatch, calls, delay=10)
+
+    async def runner():
+        tasks = []
+        for finish in (telegram_app.cancel, None):
+            session = _session()
+            context = _context(session)
+            await telegram_app.gad7_handler(_update("3"), context)
+            task = session.triage_task
+            await asyncio.sleep(0)
+            if finish is not None:
+                await finish(_update("/cancelar"), context)
+            else:
+                telegram_app._reset_session(session)
+            await asyncio.gather(task, return_exceptions=True)
+            tasks.append((task, session.triage_task))
+        return tasks
+
+    for task, current in asyncio.run(runner()):
+        assert task.cancelled()
+        assert current is None
+    assert len(calls) == 2
@@ -0,0 +1,94 @@
+import asyncio
+import types
+
+from bot import llm, metrics, telegram_app
+from bot.models import ClassifyOut
+from bot.session import SessionData
+from bot.triage_rules import decide_triage
+
+
+def test_item9_positive_is_alta_without_model():
+    decision = decide_triage([1, 1, 0, 0, 0, 0, 0, 0, 1], [0] * 7, [])
+    assert decision.reason == "phq9_item9"
+    assert decision.triage.nivel_urgencia == "alta"
+    assert "pensamentos de morte ou autolesão" in decision.triage.sinais_depressao
+
+
+def test_severe_scores_and_risk_text_are_alta():
+    assert decide_triage([3, 3, 3, 3, 2, 2, 2, 2, 0], [0] * 7, []).reason == "escore_grave"
+    assert decide_triage([0] * 9, [3, 3, 3, 2, 2, 1, 1], []).reason == "escore_grave"
+    assert decide_triage([0] * 9, [0] * 7, ["às vezes penso em morrer"]).reason == "relato_risco"
+
+
+def test_low_scores_without_text_are_baixa():
+    decision = decide_triage([1, 0, 2, 1, 0, 0, 0, 0, 0], [1, 2, 0, 0, 0, 0, 0], ["", "  "])
+    assert decision.triage.nivel_urgencia == "baixa"
+    assert decision.triage.sinais_depressao == ["alterações no sono"]
+    assert decision.triage.sinais_ansiedade == ["preocupação difícil de controlar"]
+    assert decision.triage.fatores_protecao == []
+
+
+def test_ambiguous_cases_go_to_model():
+    assert decide_triage([2, 2, 1, 1, 1, 1, 1, 1, 0], [0] * 7, []) is None
+    assert decide_triage([0] * 9, [0] * 7, ["palavra " * 50]) is None
+    # Relato curto com risco fora dos padrões: o modelo decide, não a regra
+    assert decide_triage([0] * 9, [0] * 7, ["quero acabar com tudo, vou me machucar"]) is None
+    # Quatro itens com escore 2: sintomas persistentes, média no TRIAGE_PROMPT
+    assert decide_triage([2, 2, 2, 2, 0, 0, 0, 0, 0], [0] * 7, []) is None
+    assert decide_triage([0] * 9, [2, 2, 2, 2, 0, 0, 0], []) is None
+    assert decide_triage([0] * 8, [0] * 7, []) is None
+
+
+def test_short_neutral_text_stays_baixa_but_risky_wording_goes_to_model():
+    low = ([0] * 9, [0] * 7)
+    assert decide_triage(*low, ["ando um pouco cansada com as provas"]).reason == "escores_baixos"
+    for texto in ("não aguento mais", "nada faz sentido", "tô me sentindo sozinho", "palavra " * 30):
+        assert decide_triage(*low, [texto]) is None
+
+
+class FakeMessage:
+    def __init__(self, text):
+        self.text = text
+
+    async def reply_text(self, text, **kwargs):
+        return None
+
+
+def _free_text_after_conversation(monkeypatch, message):
+    async def fake_classify(message, history):
+        return ClassifyOut(resposta_empatica="Obrigado por contar.")
+
+    monkeypatch.setattr(telegram_app, "classify_msg", fake_classify)
+    session = SessionData(user_id=42)
+    update = types.SimpleNamespace(message=FakeMessage(message), effective_user=types.SimpleNamespace(id=42))
+    context = types.SimpleNamespace(user_data={"session": session})
+    asyncio.run(telegram_app.empathetic_conversation(update, context))
+    return session.free_text
+
+
+def test_rules_use_the_free_text_of_a_real_conversation(monkeypatch):
+    free_text = _free_text_after_conversation(monkeypatch, "Estou bem, só um pouco ansiosa com as provas")
+    assert free_text
+    assert decide_triage([1, 0, 1, 0, 0, 0, 0, 0, 0], [1, 1, 0, 0, 0, 0, 0], free_text).triage.nivel_urgencia == "baixa"
+
+    free_text = _free_text_after_conversation(monkeypatch, "Não vejo mais saída pra nada")
+    assert decide_triage([1, 0, 1, 0, 0, 0, 0, 0, 0], [1, 1, 0, 0, 0, 0, 0], free_text) is None
+
+
+def test_triage_summary_counts_avoided_calls(monkeypatch):
+    calls = []
+
+    async def fake_invoke(prompt, call_type):
+        calls.append(call_type)
+        return '{"nivel_urgencia": "media"}'
+
+    metrics.reset()
+    monkeypatch.setattr(llm, "_invoke_raw", fake_invoke)
+    fast = asyncio.run(llm.triage_summary({}, [0] * 9, [0] * 7, []))
+    slow = asyncio.run(llm.triage_summary({}, [2, 2, 1, 1, 1, 1, 1, 1, 0], [0] * 7, []))
+
+    assert fast.nivel_urgencia == "baixa"
+    assert slow.nivel_urgencia == "media"
+    assert calls == ["triage"]
+    assert metrics.get("triage.llm_calls_avoided") == 1
+    assert metrics.get("triage.llm_calls") == 1
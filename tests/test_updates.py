@@ -0,0 +1,118 @@
+import asyncio
+import random
+import time
+
+from telegram import Update
+
+from bot.updates import PerUserUpdateProcessor, update_key
+
+USERS = 500
+MESSAGES_PER_USER = 4
+HANDLER_SECONDS = 0.005
+
+
+def _update(update_id, user_id):
+    return Update.de_json(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": 1700000000,
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": user_id, "is_bot": False, "first_name": "Aluno"},
+                "text": f"mensagem {update_id}",
+            },
+        },
+        None,
+    )
+
+
+def _interleaved_updates():
+    # Rodadas embaralhadas: cada aluno manda uma mensagem por rodada, em ordem variada
+    rng = random.Random(7)
+    updates, update_id = [], 0
+    for _round in range(MESSAGES_PER_USER):
+        users = list(range(1, USERS + 1))
+        rng.shuffle(users)
+        for user_id in users:
+            updates.append(_update(update_id, user_id))
+            update_id += 1
+    return updates
+
+
+def _run(processor, updates):
+    seen = {}
+    inside = set()
+    overlaps = []
+    peak = [0, 0]
+
+    async def handle(update):
+        user_id = update.effective_user.id
+        if user_id in inside:
+            overlaps.append(user_id)
+        inside.add(user_id)
+        peak[0] += 1
+        peak[1] = max(peak[1], peak[0])
+        # Duração variável: sem o lock, a mensagem seguinte de um aluno poderia terminar antes
+        await asyncio.sleep(HANDLER_SECONDS * (1 + update.update_id % 3))
+        seen.setdefault(user_id, []).append(update.update_id)
+        peak[0] -= 1
+        inside.discard(user_id)
+
+    async def runner():
+        async with processor:
+            start = time.perf_counter()
+            # Como o Application faz: uma task por update, criadas na ordem de chegada
+            tasks = [asyncio.create_task(processor.process_update(u, handle(u))) for u in updates]
+            await asyncio.gather(*tasks)
+            return time.perf_counter() - start
+
+    elapsed = asyncio.run(runner())
+    return seen, overlaps, peak[1], elapsed
+
+
+def test_updates_run_in_order_per_user_and_concurrently_across_users():
+    updates = _interleaved_updates()
+    processor = PerUserUpdateProcessor(concurrency=64, max_pending=256)
+    seen, overlaps, peak, elapsed = _run(processor, updates)
+
+    expected = {}
+    for update in updates:
+        expected.setdefault(update.effective_user.id, []).append(update.update_id)
+    assert seen == expected
+    assert overlaps == []
+    assert 1 < peak <= 64
+    assert processor.active_keys == 0
+
+    # Sequencial levaria ~20s (2000 updates × ~10ms); em paralelo fica bem abaixo
+    sequential = sum(HANDLER_SECONDS * (1 + u.update_id % 3) for u in updates)
+    assert elapsed < sequential / 10
+
+
+def test_repeated_updates_from_one_user_do_not_block_others():
+    # Um aluno com muitas mensagens na fila não ocupa as vagas de execução dos demais
+    updates = [_update(i, 1) for i in range(20)] + [_update(100 + i, 2 + i) for i in range(3)]
+    processor = PerUserUpdateProcessor(concurrency=2, max_pending=64)
+    finished = []
+
+    async def handle(update):
+        await asyncio.sleep(0.01)
+        finished.append(update.effective_user.id)
+
+    async def runner():
+        async with processor:
+            tasks = [asyncio.create_task(processor.process_update(u, handle(u))) for u in updates]
+            await asyncio.gather(*tasks)
+
+    asyncio.run(runner())
+    assert set(finished[:8]) >= {2, 3, 4}
+
+
+def test_update_key_prefers_user_then_chat():
+    assert update_key(_update(1, 42)) == ("user", 42)
+    channel_post = Update.de_json(
+        {"update_id": 2, "channel_post": {"message_id": 1, "date": 1700000000, "chat": {"id": -5, "type": "channel"}}},
+        None,
+    )
+    assert update_key(channel_post) == ("chat", -5)
+    assert update_key(object()) == ("global",)
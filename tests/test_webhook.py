@@ -0,0 +1,79 @@
+import asyncio
+
+from aiohttp.test_utils import TestClient, TestServer
+from telegram.ext import ApplicationBuilder
+
+from bot import metrics
+from bot.webhook import HEALTH_PATH, SECRET_HEADER, build_webhook_app
+
+SECRET = "segredo"
+UPDATE = {
+    "update_id": 7,
+    "message": {
+        "message_id": 1,
+        "date": 1700000000,
+        "chat": {"id": 42, "type": "private"},
+        "from": {"id": 42, "is_bot": False, "first_name": "Ana"},
+        "text": "oi",
+    },
+}
+
+
+def _run(scenario):
+    application = ApplicationBuilder().token("123:abc").updater(None).build()
+
+    async def runner():
+        app = build_webhook_app(application, path="/telegram", secret_token=SECRET)
+        async with TestClient(TestServer(app)) as client:
+            return await scenario(client, application)
+
+    return asyncio.run(runner())
+
+
+def test_update_is_queued_and_acknowledged():
+    metrics.reset()
+
+    async def scenario(client, application):
+        response = await client.post("/telegram", json=UPDATE, headers={SECRET_HEADER: SECRET})
+        return response.status, application.update_queue.get_nowait()
+
+    status, update = _run(scenario)
+    assert status == 200
+    assert update.update_id == 7
+    assert update.effective_user.id == 42
+    assert metrics.get("webhook.updates") == 1
+
+
+def test_wrong_or_missing_secret_is_rejected():
+    metrics.reset()
+
+    async def scenario(client, application):
+        wrong = await client.post("/telegram", json=UPDATE, headers={SECRET_HEADER: "outro"})
+        missing = await client.post("/telegram", json=UPDATE)
+        return wrong.status, missing.status, application.update_queue.qsize()
+
+    assert _run(scenario) == (403, 403, 0)
+    assert metrics.get("webhook.rejected") == 2
+
+
+def test_malformed_body_returns_400():
+    async def scenario(client, application):
+        statuses = []
+        for body in ("não é json", "[1, 2]", "{}"):
+            response = await client.post("/telegram", data=body, headers={SECRET_HEADER: SECRET})
+            statuses.append(response.status)
+        return statuses, application.update_queue.qsize()
+
+    assert _run(scenario) == ([400, 400, 400], 0)
+
+
+def test_health_reports_pending_updates():
+    async def scenario(client, application):
+        await client.post("/telegram", json=UPDATE, headers={SECRET_HEADER: SECRET})
+        response = await client.get(HEALTH_PATH)
+        return response.status, await response.json()
+
+    # A Application não foi iniciada: o balanceador deve tirar a instância de rotação
+    status, body = _run(scenario)
+    assert status == 503
+    assert body == {"status": "parado", "pending_updates": 1}